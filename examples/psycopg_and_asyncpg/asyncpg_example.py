@@ -3,30 +3,32 @@ import os
 
 import asyncpg  # pip install asyncpg
 
-from sqlcanon import Canonicalizer, Config
+from sqlcanon.integrations.postgres import AsyncCanonicalConnection, StatementRewriter
 
-canon = Canonicalizer()
-cfg = Config(passes=["case_keywords", "sort_in_list", "normalise_predicates"])
-
-
-async def exec_norm(conn: asyncpg.Connection, sql: str, *args):
-    # Normalise then execute a query.
-    return await conn.execute(canon.normalise(sql, cfg), *args)
+# Equivalent statements: same shape, predicates and IN list in another order
+QUERIES = [
+    ("select 1 where 1 in ($1, $2) and 2 = $3", (3, 1, 2)),
+    ("select 1 where 2 = $1 and 1 in ($2, $3)", (2, 1, 3)),
+]
 
 
 async def main():
-    dsn = os.getenv("ASYNC_PG_DSN")
-    sql = "select 1 where 1 in (3,2,1) and 2=2"
-    print("Normalised SQL:\n", canon.normalise(sql, cfg))
+    rewriter = StatementRewriter()  # exec-safe profile, memoised per statement string
+    for sql, args in QUERIES:
+        rw = rewriter.rewrite(sql, "dollar")
+        print("Canonical SQL:", rw.text, "args:", rw.bind(args))
 
+    dsn = os.getenv("ASYNC_PG_DSN")
     if not dsn:
         print("ASYNC_PG_DSN not set; skipping DB execution.")
         return
 
-    conn = await asyncpg.connect(dsn)
+    conn = AsyncCanonicalConnection(await asyncpg.connect(dsn), rewriter=rewriter)
     try:
-        await exec_norm(conn, sql)
-        print("Executed successfully against:", dsn)
+        for _ in range(3):
+            for sql, args in QUERIES:
+                await conn.fetch(sql, *args)
+        print(f"Executed against {dsn}; plan reuse hit rate {conn.stats.hit_rate:.0%}")
     finally:
         await conn.close()
 
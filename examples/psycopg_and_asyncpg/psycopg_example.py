@@ -2,30 +2,31 @@ import os
 
 import psycopg  # pip install psycopg>=3
 
-from sqlcanon import Canonicalizer, Config
+from sqlcanon.integrations.postgres import CanonicalConnection, StatementRewriter
 
-canon = Canonicalizer()
-cfg = Config(passes=["case_keywords", "sort_in_list", "normalise_predicates"])
-
-
-def exec_norm(cur, sql, params=None):
-    # Normalise then execute a query.
-    return cur.execute(canon.normalise(sql, cfg), params or ())
+# Equivalent statements: same shape, predicates and IN list in another order
+QUERIES = [
+    ("select 1 where 1 in (%s, %s) and 2 = %s", (3, 1, 2)),
+    ("select 1 where 2 = %s and 1 in (%s, %s)", (2, 1, 3)),
+]
 
 
 def main():
-    dsn = os.getenv("POSTGRES_DSN")
-    sql = "select 1 where 1 in (3,2,1) and 2=2"
-    print("Normalised SQL:\n", canon.normalise(sql, cfg))
+    rewriter = StatementRewriter()  # exec-safe profile, memoised per statement string
+    for sql, params in QUERIES:
+        rw = rewriter.rewrite(sql, "format")
+        print("Canonical SQL:", rw.text, "params:", rw.bind(params))
 
+    dsn = os.getenv("POSTGRES_DSN")
     if not dsn:
         print("POSTGRES_DSN not set; skipping DB execution.")
         return
 
-    with psycopg.connect(dsn) as conn:
-        with conn.cursor() as cur:
-            exec_norm(cur, sql)
-            print("Executed successfully against:", dsn)
+    with CanonicalConnection(psycopg.connect(dsn), rewriter=rewriter) as conn:
+        for _ in range(3):
+            for sql, params in QUERIES:
+                conn.execute(sql, params).fetchall()
+        print(f"Executed against {dsn}; plan reuse hit rate {conn.stats.hit_rate:.0%}")
 
 
 if __name__ == "__main__":
@@ -1,31 +1,28 @@
-from sqlalchemy import create_engine, event, text
+from sqlalchemy import create_engine, text
 
-from sqlcanon import Canonicalizer, Config
+from sqlcanon import Config
+from sqlcanon.integrations.sqlalchemy import INFO_KEY, get_stats, instrument
 
 # In-memory SQLite for a zero-dependency demo
 engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
 
-canon = Canonicalizer()
-cfg_exec = Config(passes=["case_keywords", "sort_in_list", "normalize_predicates"])
-
-
-@event.listens_for(engine, "before_cursor_execute")
-def normalise_before_execute(conn, cursor, statement, parameters, context, executemany):
-    norm = canon.normalise(statement, cfg_exec)
-    if norm != statement:
-        print("— SQL normalised —")
-        print(norm)
-    return norm, parameters
+# Exec-safe profile: SQLite uses positional "?" parameters, so no reordering passes.
+# Canonical text and hash are memoised per distinct statement string.
+instrument(engine, Config(passes=["case_keywords"]), rewrite=True)
 
 
 def main():
     with engine.begin() as conn:
         conn.execute(text("CREATE TABLE t(a INTEGER, b INTEGER, c TEXT)"))
         conn.execute(text("INSERT INTO t(a,b,c) VALUES (1,1,'x'), (2,1,'y'), (3,2,'z')"))
-        # Intentionally messy SQL to show the effect
-        result = conn.execute(text("select a FROM t where b=1 and a in (3,2,1) and c='x'"))
-        rows = result.fetchall()
-        print("Rows:", rows)
+        # Intentionally messy SQL to show the effect; repeated executions hit the memo
+        for b in (1, 2, 1):
+            rows = conn.execute(text("select a FROM t where b=:b and c in ('x','z')"), {"b": b}).fetchall()
+            print("Rows:", rows)
+        print("Executed:", conn.info[INFO_KEY].text)
+        print("Shape hash:", conn.info[INFO_KEY].hash)
+    stats = get_stats(engine)
+    print(f"Memo hits={stats.hits} misses={stats.misses} saved={stats.seconds_saved * 1e6:.1f}us")
 
 
 if __name__ == "__main__":
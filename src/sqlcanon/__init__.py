@@ -1,19 +1,29 @@
 from __future__ import annotations
 
+from time import perf_counter
+
 from .config.model import Config
+from .core.engine import compile_pipeline, run_stage, run_stages, statement_features
 from .hashing.sha256_hash import Sha256Hash
+from .params import ExtractedLiteral, bind_params
 from .parsing.sqlparse_adapter import SqlParseAdapter
 from .passes.case_keywords import CaseFoldKeywords
+from .passes.normalise_identifiers import NormaliseIdentifiers
 from .passes.normalise_literals import NormaliseLiterals
 from .passes.normalise_predicates import NormalisePredicates
+from .passes.normalise_whitespace import NormaliseWhitespace
 from .passes.sort_in_list import SortInList
-from .protocols import AstNode
+from .protocols import AstNode, SqlInput
+
+__all__ = ["Canonicalizer", "Config", "ExtractedLiteral", "bind_params"]
 
 _PASS_REGISTRY = {
     "case_keywords": CaseFoldKeywords,
+    "normalise_identifiers": NormaliseIdentifiers,
     "normalise_literals": NormaliseLiterals,
     "sort_in_list": SortInList,
     "normalise_predicates": NormalisePredicates,
+    "normalise_whitespace": NormaliseWhitespace,
 }
 
 
@@ -31,12 +41,15 @@ class Canonicalizer:
         self.parser = SqlParseAdapter()  # simple factory for now
         self._default_pass_names = passes or [
             "case_keywords",
+            "normalise_identifiers",
             "normalise_literals",
             "sort_in_list",
             "normalise_predicates",
         ]
         self.hasher = Sha256Hash()
         self.hash_strategy = hash_strategy
+        # Compiled (fused) pipelines keyed by (pass names, degraded); passes are stateless.
+        self._pipelines: dict[tuple[tuple[str, ...], bool], list] = {}
 
     def _resolve_pass_name(self, name: str) -> str:
         """Resolve UK/US spellings to whatever exists in the registry."""
@@ -64,14 +77,39 @@ class Canonicalizer:
             pipeline.append(_PASS_REGISTRY[resolved]())
         return pipeline
 
-    def normalise(self, sql: str, cfg: Config | None = None) -> str:
-        cfg = cfg or Config()
+    def _compiled_pipeline(self, names: list[str], degraded: bool = False):
+        key = (tuple(names), degraded)
+        stages = self._pipelines.get(key)
+        if stages is None:
+            passes = self._build_pipeline(names)
+            if degraded:
+                # Token-local passes only: one linear scan, no clause-level rewriting
+                passes = [p for p in passes if getattr(p, "token_local", False)]
+            stages = self._pipelines[key] = compile_pipeline(passes)
+        return stages
+
+    def _run(self, ast: AstNode, cfg: Config) -> AstNode:
         pass_names = cfg.passes or self._default_pass_names
-        pipeline = self._build_pipeline(pass_names)
+        limit = cfg.max_statement_length
+        if limit is not None and len(ast.text) > limit:
+            return run_stages(self._compiled_pipeline(pass_names, degraded=True), ast, cfg)
+        stages = self._compiled_pipeline(pass_names)
+        if cfg.time_budget_ms is None:
+            return run_stages(stages, ast, cfg)
 
-        ast = self.parser.parse(sql)
-        for p in pipeline:
-            ast = p.apply(ast, cfg)
+        deadline = perf_counter() + cfg.time_budget_ms / 1000.0
+        features = statement_features(ast.text)
+        for stage in stages:
+            if not stage.token_local and perf_counter() > deadline:
+                # Over budget: finish in degraded mode from here, keeping the work already
+                # done (the token scan is never repeated) and skipping clause-level passes
+                continue
+            ast = run_stage(stage, ast, cfg, features)
+        return ast
+
+    def normalise(self, sql: SqlInput, cfg: Config | None = None) -> str:
+        cfg = cfg or Config()
+        ast = self._run(self.parser.parse(sql), cfg)
 
         result = ast.text
 
@@ -80,7 +118,41 @@ class Canonicalizer:
         #    result += "\n"
         return result
 
-    def hash(self, sql: str, cfg: Config | None = None) -> str:
+    def normalise_bytes(self, sql: SqlInput, cfg: Config | None = None) -> bytes:
+        """
+        ``normalise`` with UTF-8 bytes out. ``sql`` may be ``str`` or any bytes-like
+        object (``bytes``, ``bytearray``, ``memoryview``) holding UTF-8, as every method
+        here accepts; it is decoded once, straight from the buffer.
+        """
+        return self.normalise(sql, cfg).encode("utf-8")
+
+    def hash(self, sql: SqlInput, cfg: Config | None = None) -> str:
+        # Hashed straight from the canonical bytes; no AstNode is built for the output
+        return self.hasher.digest_bytes(self.normalise_bytes(sql, cfg))
+
+    def hash_int(self, sql: SqlInput, cfg: Config | None = None) -> int:
+        """64-bit integer form of ``hash`` (its first 16 hex digits), e.g. for shard routing."""
+        return self.hasher.digest_int_bytes(self.normalise_bytes(sql, cfg))
+
+    def normalise_with_tags(self, sql: SqlInput, cfg: Config | None = None) -> tuple[str, dict[str, str]]:
+        """
+        Normalise ``sql`` and also return the sqlcommenter key/values (e.g. ``traceparent``)
+        that ``normalise_whitespace`` stripped, so trace context survives canonicalisation.
+        """
         cfg = cfg or Config()
-        normalised = self.normalise(sql, cfg)
-        return self.hasher.digest(AstNode(normalised), cfg)
+        ast = self.parser.parse(sql)
+        ast.tags = {}
+        ast = self._run(ast, cfg)
+        return ast.text, ast.tags or {}
+
+    def parameterise(self, sql: SqlInput, cfg: Config | None = None) -> tuple[str, list[ExtractedLiteral]]:
+        """
+        Normalise ``sql`` and also return the literals ``normalise_literals`` replaced,
+        in template order (IN-list and predicate reordering is applied to them too), so
+        ``bind_params(template, params)`` yields an executable equivalent of ``sql``.
+        """
+        cfg = cfg or Config()
+        ast = self.parser.parse(sql)
+        ast.params = []
+        ast = self._run(ast, cfg)
+        return ast.text, ast.params or []
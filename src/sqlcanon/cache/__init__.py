@@ -0,0 +1,25 @@
+"""
+Result caching keyed by ``Canonicalizer.hash``, with single-flight coalescing.
+
+Keys come from an exec-safe canonical form (``RESULT_SAFE``: literals kept, keyword
+case and clause order normalised) plus any bound parameters, so equivalent statements
+share a result and different literal values never do. ``sharding`` routes statements
+to cache nodes by the same canonical hash.
+"""
+
+from .backends import CacheBackend, MemoryBackend
+from .results import RESULT_SAFE, AsyncResultCache, CacheCounters, ResultCache
+from .sharding import HashRing, JumpHashRouter, QueryRouter, jump_hash
+
+__all__ = [
+    "RESULT_SAFE",
+    "AsyncResultCache",
+    "CacheBackend",
+    "CacheCounters",
+    "HashRing",
+    "JumpHashRouter",
+    "MemoryBackend",
+    "QueryRouter",
+    "ResultCache",
+    "jump_hash",
+]
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Protocol
+
+
+class CacheBackend(Protocol):
+    """
+    Where results are stored. ``get`` returns ``None`` for a missing or expired key, so
+    ``None`` results are never cached. Methods may also be coroutines when the backend
+    is used with ``AsyncResultCache`` (e.g. a ``redis.asyncio`` adapter).
+    """
+
+    def get(self, key: str) -> Any: ...
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> Any: ...
+
+    def delete(self, key: str) -> Any: ...
+
+
+class MemoryBackend(CacheBackend):
+    """In-process store with per-entry TTL and LRU eviction beyond ``maxsize``. Thread-safe."""
+
+    def __init__(self, maxsize: int = 1024, clock: Callable[[], float] = time.monotonic):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.clock = clock
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and self.clock() >= expires:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import inspect
+import threading
+from collections.abc import Awaitable, Callable, Mapping
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, TypeVar
+
+from .. import Canonicalizer, Config
+from .backends import CacheBackend, MemoryBackend
+
+T = TypeVar("T")
+
+# Literals are kept (different values must not share a key); keyword case and clause
+# order are normalised so equivalent statements do.
+RESULT_SAFE = Config(passes=["case_keywords", "sort_in_list", "normalise_predicates"])
+
+_REORDERING = {"sort_in_list", "normalise_predicates"}
+
+
+@dataclass
+class CacheCounters:
+    hits: int = 0
+    misses: int = 0
+    # Callers that waited for another caller's in-flight computation of the same key.
+    coalesced: int = 0
+    errors: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses + self.coalesced
+        return (self.hits + self.coalesced) / total if total else 0.0
+
+
+def _params_repr(params: Any) -> str:
+    if isinstance(params, Mapping):
+        return repr(sorted(params.items()))
+    return repr(tuple(params))
+
+
+class _BaseResultCache:
+    def __init__(
+        self,
+        backend: CacheBackend | None = None,
+        *,
+        ttl: float | None = 60.0,
+        canonicalizer: Canonicalizer | None = None,
+        cfg: Config | None = None,
+        memo_size: int = 4096,
+    ):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.stats = CacheCounters()
+        self.canonicalizer = canon = canonicalizer or Canonicalizer()
+        self.cfg = cfg = cfg or RESULT_SAFE
+        names = list(cfg.passes or canon._default_pass_names)
+        if any(canon._resolve_pass_name(n) == "normalise_literals" for n in names):
+            raise ValueError("normalise_literals would give different literals one result cache key")
+        # Reordering would make "b = ? AND a = ?" and "a = ? AND b = ?" one key for the
+        # same positional parameters, so statements bound positionally skip it.
+        self._positional_cfg = replace(
+            cfg, passes=[n for n in names if canon._resolve_pass_name(n) not in _REORDERING]
+        )
+        self._statement_hash = lru_cache(maxsize=memo_size)(self._hash_statement)
+
+    def _hash_statement(self, sql: str, positional: bool) -> str:
+        cfg = self._positional_cfg if positional else self.cfg
+        if not cfg.passes:  # an empty list would mean the canonicalizer's defaults
+            return self.canonicalizer.hasher.digest(self.canonicalizer.parser.parse(sql), cfg)
+        return self.canonicalizer.hash(sql, cfg)
+
+    def key(self, sql: str, params: Any = None) -> str:
+        """
+        Cache key for ``sql`` run with ``params``: its canonical hash, combined with the
+        parameters when there are any. Statement hashes are memoised per string.
+        """
+        if not params:
+            return self._statement_hash(sql, False)
+        digest = self._statement_hash(sql, not isinstance(params, Mapping))
+        return hashlib.sha256(f"{digest}\x00{_params_repr(params)}".encode()).hexdigest()
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class ResultCache(_BaseResultCache):
+    """
+    Result store keyed by canonical hash, with single-flight coalescing across threads:
+    while one caller computes a key, concurrent callers for an equivalent statement
+    wait for its result (or exception) instead of running the query again.
+
+    >>> cache = ResultCache(ttl=30)
+    >>> rows = cache.get_or_compute(sql, params, lambda: run_query(sql, params))
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, sql: str, params: Any, compute: Callable[[], T]) -> T:
+        key = self.key(sql, params)
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.stats.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.stats.misses += 1
+            else:
+                self.stats.coalesced += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = compute()
+            if value is not None:
+                self.backend.set(key, value, self.ttl)
+            flight.value = value
+            return value
+        except BaseException as exc:
+            flight.error = exc
+            with self._lock:
+                self.stats.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def invalidate(self, sql: str, params: Any = None) -> None:
+        self.backend.delete(self.key(sql, params))
+
+
+async def _resolve(value: Any) -> Any:
+    return await value if inspect.isawaitable(value) else value
+
+
+class AsyncResultCache(_BaseResultCache):
+    """
+    asyncio variant of :class:`ResultCache`: coalesces concurrent tasks on one event
+    loop. Backend methods may be plain or coroutine functions. If the computing task is
+    cancelled, the tasks waiting on it are not: one of them takes over the computation.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._flights: dict[str, asyncio.Future] = {}
+
+    async def get_or_compute(self, sql: str, params: Any, compute: Callable[[], Awaitable[T]]) -> T:
+        key = self.key(sql, params)
+        value = await _resolve(self.backend.get(key))
+        if value is not None:
+            self.stats.hits += 1
+            return value
+
+        while True:
+            flight = self._flights.get(key)
+            if flight is None:
+                return await self._compute(key, compute)
+            self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                if not flight.cancelled():
+                    raise  # this task was cancelled, not the one computing
+                # The computing task was cancelled: retry, the first waiter back leads
+                self.stats.coalesced -= 1
+
+    async def _compute(self, key: str, compute: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights[key] = asyncio.get_running_loop().create_future()
+        # Mark the outcome retrieved so a failure nobody waited for is not logged.
+        flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.stats.misses += 1
+        try:
+            value = await compute()
+            if value is not None:
+                await _resolve(self.backend.set(key, value, self.ttl))
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as exc:
+            self.stats.errors += 1
+            flight.set_exception(exc)
+            raise
+        else:
+            flight.set_result(value)
+            return value
+        finally:
+            del self._flights[key]
+
+    async def invalidate(self, sql: str, params: Any = None) -> None:
+        await _resolve(self.backend.delete(self.key(sql, params)))
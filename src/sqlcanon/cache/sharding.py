@@ -0,0 +1,192 @@
+"""
+Routing equivalent statements to the same cache shard.
+
+Routers map a 64-bit key (``Canonicalizer.hash_int``) to a node. ``HashRing`` is a
+consistent-hash ring with virtual nodes: adding or removing a node moves only the keys
+of that node's arcs (about 1/n of them). ``JumpHashRouter`` uses jump consistent hashing,
+which needs no ring and spreads keys almost exactly evenly, but nodes can only be added
+or removed at the end of the list. ``QueryRouter`` routes SQL strings through either,
+by canonical statement hash, so equivalent statements land on the same node.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from bisect import bisect_left
+from collections.abc import Hashable, Iterable, Mapping, Sequence
+from functools import lru_cache
+from typing import Generic, Protocol, TypeVar
+
+from .. import Canonicalizer, Config
+from .results import RESULT_SAFE
+
+N = TypeVar("N", bound=Hashable)
+
+_MASK64 = (1 << 64) - 1
+
+
+class Router(Protocol[N]):
+    def route(self, key: int) -> N: ...
+
+    def route_many(self, keys: Iterable[int]) -> list[N]: ...
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach): bucket in ``range(buckets)`` for a 64-bit key."""
+    if buckets < 1:
+        raise ValueError("buckets must be at least 1")
+    key &= _MASK64
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & _MASK64
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def _point(label: str) -> int:
+    return int.from_bytes(hashlib.sha256(label.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing(Generic[N]):
+    """
+    Consistent-hash ring. Each node is placed at ``vnodes * weight`` points (derived
+    from ``str(node)``, so every process builds the same ring from the same node list);
+    a key belongs to the first point at or after it, wrapping around.
+
+    >>> ring = HashRing(["cache-a", "cache-b", "cache-c"])
+    >>> ring.route(canon.hash_int(sql, cfg))
+    """
+
+    def __init__(self, nodes: Iterable[N] | Mapping[N, float] = (), *, vnodes: int = 160):
+        if vnodes < 1:
+            raise ValueError("vnodes must be at least 1")
+        self.vnodes = vnodes
+        self._weights: dict[N, float] = {}
+        self._lock = threading.Lock()
+        self._ring: tuple[list[int], list[N]] = ([], [])
+        weights = nodes if isinstance(nodes, Mapping) else dict.fromkeys(nodes, 1.0)
+        with self._lock:
+            self._weights.update(weights)
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        points = sorted(
+            (_point(f"{node}#{i}"), str(node), node)
+            for node, weight in self._weights.items()
+            for i in range(max(1, round(self.vnodes * weight)))
+        )
+        # Swapped in as one tuple, so concurrent lookups see the old ring or the new one
+        self._ring = ([p for p, _, _ in points], [n for _, _, n in points])
+
+    @property
+    def nodes(self) -> list[N]:
+        return list(self._weights)
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def add(self, node: N, weight: float = 1.0) -> None:
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        with self._lock:
+            self._weights[node] = weight
+            self._rebuild()
+
+    def remove(self, node: N) -> None:
+        with self._lock:
+            del self._weights[node]
+            self._rebuild()
+
+    def route(self, key: int) -> N:
+        points, owners = self._ring
+        if not points:
+            raise LookupError("HashRing has no nodes")
+        i = bisect_left(points, key & _MASK64)
+        return owners[i if i < len(points) else 0]
+
+    def route_many(self, keys: Iterable[int]) -> list[N]:
+        points, owners = self._ring
+        if not points:
+            raise LookupError("HashRing has no nodes")
+        n = len(points)
+        return [owners[i if i < n else 0] for i in (bisect_left(points, k & _MASK64) for k in keys)]
+
+
+class JumpHashRouter(Generic[N]):
+    """
+    Jump-consistent-hash router over an ordered node list. Appending a node moves
+    1/(n+1) of the keys to it and nothing else; only the last node can be removed.
+    """
+
+    def __init__(self, nodes: Sequence[N] = ()):
+        self._nodes: tuple[N, ...] = tuple(nodes)
+
+    @property
+    def nodes(self) -> list[N]:
+        return list(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def add(self, node: N) -> None:
+        self._nodes = (*self._nodes, node)
+
+    def remove(self, node: N) -> None:
+        if not self._nodes or self._nodes[-1] != node:
+            raise ValueError("JumpHashRouter can only remove the last node")
+        self._nodes = self._nodes[:-1]
+
+    def route(self, key: int) -> N:
+        nodes = self._nodes
+        if not nodes:
+            raise LookupError("JumpHashRouter has no nodes")
+        return nodes[jump_hash(key, len(nodes))]
+
+    def route_many(self, keys: Iterable[int]) -> list[N]:
+        nodes = self._nodes
+        if not nodes:
+            raise LookupError("JumpHashRouter has no nodes")
+        return [nodes[jump_hash(k, len(nodes))] for k in keys]
+
+
+class QueryRouter(Generic[N]):
+    """
+    Routes SQL statements by their canonical hash. Every binding of a statement goes to
+    the same node, so single-flight coalescing and invalidation stay node-local.
+    Statement hashes are memoised per string.
+
+    >>> router = QueryRouter(HashRing(nodes))
+    >>> node = router.route(sql)
+    >>> for node, idx in router.partition(batch).items(): ...
+    """
+
+    def __init__(
+        self,
+        router: Router[N],
+        cfg: Config | None = None,
+        *,
+        canonicalizer: Canonicalizer | None = None,
+        memo_size: int = 4096,
+    ):
+        self.router = router
+        self.cfg = cfg or RESULT_SAFE
+        self.canonicalizer = canonicalizer or Canonicalizer()
+        self.hash = lru_cache(maxsize=memo_size)(self._hash)
+
+    def _hash(self, sql: str) -> int:
+        return self.canonicalizer.hash_int(sql, self.cfg)
+
+    def route(self, sql: str) -> N:
+        return self.router.route(self.hash(sql))
+
+    def route_many(self, statements: Iterable[str]) -> list[N]:
+        return self.router.route_many(self.hash(sql) for sql in statements)
+
+    def partition(self, statements: Sequence[str]) -> dict[N, list[int]]:
+        """Indices of ``statements`` grouped by node, for fanning a batch out."""
+        groups: dict[N, list[int]] = {}
+        for i, node in enumerate(self.route_many(statements)):
+            groups.setdefault(node, []).append(i)
+        return groups
@@ -1,17 +1,28 @@
 from __future__ import annotations
 
+import json
+import sys
+import time
+from dataclasses import asdict, replace
+from functools import lru_cache
 from pathlib import Path
 from typing import Literal
 
 import typer
 
 from .. import Canonicalizer, Config
-from ..config.loader import load_config_file
+from ..config.loader import load_config_cached
+from ..logs import FORMATS, LogReader, canonicalise_records
+from ..novelty import NoveltyDetector
+from ..protocols import AstNode
+from ..scan import scan as scan_tree
 
 app = typer.Typer(help="sqlcanon — SQL Query Canonicalizer")
 
 KeywordCase = Literal["upper", "lower"]
 
+_DEFAULT_CFG = Config()
+
 
 # helper to coerce/narrow a str|None into our KeywordCase|None - mypy is quite strict
 def _coerce_keyword_case(val: str | None) -> KeywordCase | None:
@@ -26,14 +37,9 @@ def _coerce_keyword_case(val: str | None) -> KeywordCase | None:
 
 
 def _load_cfg(config_path: Path | None, keyword_case: KeywordCase | None) -> Config:
-    cfg = load_config_file(config_path) if config_path else Config()
-    if keyword_case is not None:
-        cfg = Config(
-            keyword_case=keyword_case,
-            identifier_case=cfg.identifier_case,
-            passes=cfg.passes,
-            hash_strategy=cfg.hash_strategy,
-        )
+    cfg = load_config_cached(config_path) if config_path else _DEFAULT_CFG
+    if keyword_case is not None and keyword_case != cfg.keyword_case:
+        cfg = replace(cfg, keyword_case=keyword_case)
     return cfg
 
 
@@ -79,6 +85,118 @@ def hash(
     print(canon.hash(query, cfg))
 
 
+@app.command()
+def novel(
+    source: Path | None = typer.Argument(None, help="File of statements, one per line (default: stdin)"),
+    state: Path | None = typer.Option(None, "--state", "-s", help="Load/save detector state here"),
+    capacity: int = typer.Option(1_000_000, "--capacity", help="Expected number of distinct shapes"),
+    error_rate: float = typer.Option(0.001, "--error-rate", help="False-positive rate (missed new shapes)"),
+    rotate_every: float | None = typer.Option(
+        None, "--rotate-every", help="Forget shapes not seen for about this many seconds"
+    ),
+    show_hash: bool = typer.Option(False, "--show-hash", help="Prefix each shape with its hash"),
+    save_every: float = typer.Option(
+        60.0, "--save-every", help="Also save --state every this many seconds while streaming"
+    ),
+    config: Path | None = typer.Option(None, "--config", "-c", help="Path to a TOML config"),
+):
+    """Stream statements and print only the shapes never seen before."""
+    cfg = _load_cfg(config, None)
+    canon = Canonicalizer()
+    if state is not None and state.exists():
+        detector = NoveltyDetector.load(state)
+    else:
+        detector = NoveltyDetector(capacity, error_rate, rotate_every=rotate_every)
+    # Repeated statements (the common case in production logs) are canonicalised once
+    normalise = lru_cache(maxsize=65536)(lambda sql: canon.normalise(sql, cfg))
+    stream = source.open(encoding="utf-8") if source is not None else sys.stdin
+    saved_at = time.monotonic()
+    try:
+        for line in stream:
+            sql = line.strip()
+            if not sql:
+                continue
+            shape = normalise(sql)
+            key = canon.hasher.digest_int(AstNode(shape), cfg)
+            if detector.add(key):
+                print(f"{key:016x}\t{shape}" if show_hash else shape, flush=True)
+            # A periodic checkpoint, so a killed process loses at most save_every seconds
+            if state is not None and time.monotonic() - saved_at >= save_every:
+                detector.save(state)
+                saved_at = time.monotonic()
+    finally:
+        if source is not None:
+            stream.close()
+        if state is not None:
+            detector.save(state)
+
+
+@app.command()
+def scan(
+    root: Path = typer.Argument(..., exists=True, file_okay=False, help="Directory to scan"),
+    pattern: list[str] = typer.Option(["*.sql"], "--pattern", "-p", help="File name glob (repeatable)"),
+    manifest: Path | None = typer.Option(
+        None, "--manifest", "-m", help="Manifest path (default: ROOT/.sqlcanon-manifest.json)"
+    ),
+    jobs: int | None = typer.Option(None, "--jobs", "-j", help="Worker threads/processes"),
+    as_json: bool = typer.Option(False, "--json", help="Print the full result as JSON"),
+    fail_on_duplicates: bool = typer.Option(
+        False, "--fail-on-duplicates", help="Exit with status 1 if any duplicates are found"
+    ),
+    config: Path | None = typer.Option(None, "--config", "-c", help="Path to a TOML config"),
+):
+    """Canonicalise a tree of SQL files incrementally and report duplicate groups."""
+    cfg = _load_cfg(config, None)
+    started = time.perf_counter()
+    result = scan_tree(root, cfg, patterns=pattern, manifest=manifest, max_workers=jobs)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if as_json:
+        print(json.dumps(asdict(result), indent=2, sort_keys=True))
+    else:
+        print(
+            f"Scanned {len(result.files)} files in {elapsed_ms:.0f} ms "
+            f"({result.read} read, {result.canonicalised} canonicalised)"
+        )
+        for rel, error in sorted(result.errors.items()):
+            print(f"error: {rel}: {error}", file=sys.stderr)
+        for group in result.duplicates:
+            print(f"\nDuplicate group ({len(group)} files, {result.files[group[0]][:12]}):")
+            for rel in group:
+                print(f"  {rel}")
+    if fail_on_duplicates and result.duplicates:
+        raise typer.Exit(1)
+
+
+@app.command()
+def logs(
+    path: Path = typer.Argument(..., help="Log file"),
+    log_format: str = typer.Option(..., "--format", "-f", help=f"One of: {', '.join(FORMATS)}"),
+    follow: bool = typer.Option(False, "--follow", "-F", help="Keep reading as the log grows"),
+    checkpoint: Path | None = typer.Option(
+        None, "--checkpoint", help="Save the read offset here after each batch and resume from it"
+    ),
+    batch_size: int = typer.Option(1000, "--batch-size", help="Records canonicalised per batch"),
+    config: Path | None = typer.Option(None, "--config", "-c", help="Path to a TOML config"),
+):
+    """Read statements from a query log and print one JSON line per statement."""
+    if log_format not in FORMATS:
+        raise typer.BadParameter(f"format must be one of: {', '.join(FORMATS)}")
+    cfg = _load_cfg(config, None)
+    canon = Canonicalizer()
+    reader = LogReader(path, log_format, follow=follow, checkpoint=checkpoint)
+    try:
+        for batch in reader.batches(batch_size):
+            for digest, canonical, metadata in canonicalise_records(batch, cfg, canonicalizer=canon):
+                print(json.dumps({"hash": digest, "canonical": canonical, **metadata}))
+            sys.stdout.flush()
+            if checkpoint is not None:
+                reader.save_checkpoint()
+    except KeyboardInterrupt:
+        pass
+    if reader.skipped:
+        typer.echo(f"{reader.skipped} malformed log lines skipped", err=True)
+
+
 def run():
     app()
 
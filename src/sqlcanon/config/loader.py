@@ -1,10 +1,12 @@
 # SPDX-License-Identifier: Apache-2.0
 from __future__ import annotations
 
+import threading
 from collections.abc import Mapping
 from pathlib import Path
 from typing import Any
 
+from ..parsing.dialects import get_dialect
 from .model import Config
 
 # Pick a TOML module: stdlib (3.11+) or backport (3.10)
@@ -27,7 +29,16 @@ class ConfigError(ValueError):
 
 
 def _validate_table(data: Mapping[str, Any]) -> None:
-    allowed = {"keyword_case", "identifier_case", "passes", "hash_strategy"}
+    allowed = {
+        "keyword_case",
+        "identifier_case",
+        "passes",
+        "hash_strategy",
+        "dialect",
+        "keep_hints",
+        "max_statement_length",
+        "time_budget_ms",
+    }
     unknown = set(data.keys()) - allowed
     if unknown:
         raise ConfigError(f"Unknown config keys: {sorted(unknown)}")
@@ -66,9 +77,70 @@ def load_config_file(path: str | Path) -> Config:
     else:
         raise ConfigError("'passes' must be a list of strings")
 
+    dialect = table.get("dialect", "ansi")
+    if not isinstance(dialect, str):
+        raise ConfigError("'dialect' must be a string")
+    try:
+        get_dialect(dialect)
+    except KeyError as e:
+        raise ConfigError(e.args[0]) from None
+
+    keep_hints = table.get("keep_hints", True)
+    if not isinstance(keep_hints, bool):
+        raise ConfigError("'keep_hints' must be a boolean")
+
+    max_statement_length = table.get("max_statement_length")
+    if max_statement_length is not None and (
+        not isinstance(max_statement_length, int)
+        or isinstance(max_statement_length, bool)
+        or max_statement_length < 1
+    ):
+        raise ConfigError("'max_statement_length' must be a positive integer")
+
+    time_budget_ms = table.get("time_budget_ms")
+    if time_budget_ms is not None and (
+        not isinstance(time_budget_ms, int | float) or isinstance(time_budget_ms, bool) or time_budget_ms <= 0
+    ):
+        raise ConfigError("'time_budget_ms' must be a positive number")
+
     return Config(
         keyword_case=keyword_case,
         identifier_case=identifier_case,
         passes=passes,
         hash_strategy=hash_strategy,
+        dialect=dialect,
+        keep_hints=keep_hints,
+        max_statement_length=max_statement_length,
+        time_budget_ms=time_budget_ms,
     )
+
+
+# Parsed configs keyed by resolved path; an entry is reused while the file's
+# (mtime_ns, size, inode) stamp is unchanged.
+_CACHE: dict[Path, tuple[tuple[int, int, int], Config]] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def file_stamp(path: str | Path) -> tuple[int, int, int]:
+    st = Path(path).stat()
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def load_config_cached(path: str | Path) -> Config:
+    """
+    Like :func:`load_config_file`, but returns the same ``Config`` object until the
+    file changes on disk, so per-request lookups cost one ``stat``. Treat the result as
+    read-only: it is shared between callers.
+    """
+    p = Path(path).resolve()
+    if not p.exists():
+        raise FileNotFoundError(p)
+    stamp = file_stamp(p)
+    with _CACHE_LOCK:
+        hit = _CACHE.get(p)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    cfg = load_config_file(p)
+    with _CACHE_LOCK:
+        _CACHE[p] = (stamp, cfg)
+    return cfg
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from pathlib import Path
+from time import monotonic
+from typing import Any
+
+from .. import Canonicalizer
+from ..parsing.dialects import get_dialect
+from .loader import file_stamp, load_config_cached
+from .model import Config
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """
+    A config and a canonicalizer whose pipelines for it are already compiled. Snapshots
+    are never modified: a reload builds a new one and swaps the reference, so a request
+    holding a snapshot finishes on the pipeline it started with.
+    """
+
+    cfg: Config
+    canonicalizer: Canonicalizer
+    stamp: tuple[int, int, int] | None = None
+
+    def normalise(self, sql: str) -> str:
+        return self.canonicalizer.normalise(sql, self.cfg)
+
+    def hash(self, sql: str) -> str:
+        return self.canonicalizer.hash(sql, self.cfg)
+
+
+def build_snapshot(
+    cfg: Config,
+    canonicalizer_factory: Callable[[], Canonicalizer] = Canonicalizer,
+    stamp: tuple[int, int, int] | None = None,
+) -> ConfigSnapshot:
+    """Resolve and compile everything ``cfg`` needs up front (passes, dialect tables, scanners)."""
+    canon = canonicalizer_factory()
+    names = cfg.passes or canon._default_pass_names
+    get_dialect(cfg.dialect)
+    for degraded in (False, True):
+        canon._compiled_pipeline(names, degraded=degraded)
+    canon.normalise("", cfg)  # compiles and caches the token scanners for this dialect
+    return ConfigSnapshot(cfg, canon, stamp)
+
+
+class ConfigManager:
+    """
+    Serves the config from a TOML file to a long-running service, with hot reload.
+
+    ``current()`` returns the active :class:`ConfigSnapshot`. At most every
+    ``check_interval`` seconds it stats the file; if the file changed, the new config
+    is loaded and compiled *before* being swapped in, so callers never see a half-built
+    pipeline. A file that fails to load leaves the previous snapshot active and is
+    reported in ``last_error``. ``overrides`` are applied on every load (e.g. a CLI
+    ``--keyword-case``).
+
+    >>> manager = ConfigManager(".sqlcanon.toml")
+    >>> manager.current().normalise(sql)
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        check_interval: float = 1.0,
+        canonicalizer_factory: Callable[[], Canonicalizer] = Canonicalizer,
+        overrides: dict[str, Any] | None = None,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self.canonicalizer_factory = canonicalizer_factory
+        self.overrides = dict(overrides or {})
+        self.clock = clock
+        self.last_error: Exception | None = None
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._snapshot = self._load()
+        self._next_check = clock() + check_interval
+
+    def _load(self) -> ConfigSnapshot:
+        stamp = file_stamp(self.path)
+        cfg = load_config_cached(self.path)
+        if self.overrides:
+            cfg = replace(cfg, **self.overrides)
+        return build_snapshot(cfg, self.canonicalizer_factory, stamp)
+
+    def current(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        now = self.clock()
+        if now < self._next_check:
+            return snapshot
+        self._next_check = now + self.check_interval
+        try:
+            changed = file_stamp(self.path) != snapshot.stamp
+        except OSError as exc:
+            self.last_error = exc
+            return snapshot
+        if changed:
+            try:
+                return self.reload()
+            except Exception as exc:  # keep serving the last good config
+                self.last_error = exc
+        return self._snapshot
+
+    def reload(self) -> ConfigSnapshot:
+        """Load and compile the file now and swap it in; errors propagate."""
+        with self._lock:
+            snapshot = self._load()
+            self._snapshot = snapshot
+            self.reloads += 1
+            self.last_error = None
+        return snapshot
+
+    @property
+    def cfg(self) -> Config:
+        return self.current().cfg
+
+    def normalise(self, sql: str) -> str:
+        return self.current().normalise(sql)
+
+    def hash(self, sql: str) -> str:
+        return self.current().hash(sql)
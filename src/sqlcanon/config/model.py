@@ -8,3 +8,12 @@ class Config:
     identifier_case: Literal["as_is", "upper", "lower"] = "as_is"
     passes: list[str] | None = None
     hash_strategy: str = "sha256"
+    # Lexer table (quoting, placeholders, keywords): ansi, postgres, mysql, tsql or sqlite
+    dialect: str = "ansi"
+    # normalise_whitespace keeps optimizer hints (/*+ ... */) unless this is False
+    keep_hints: bool = True
+    # Large-statement safeguards: statements longer than ``max_statement_length`` characters,
+    # or whose pipeline overruns ``time_budget_ms``, are canonicalised in degraded mode
+    # (token-local passes only, e.g. keyword folding and literal scrubbing).
+    max_statement_length: int | None = None
+    time_budget_ms: float | None = None
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable, Sequence
+from functools import cache
+from typing import TYPE_CHECKING, Any
+
+from ..parsing.tokenizer import COMPOSITE_KINDS, compile_scanner
+from ..protocols import AstNode
+
+if TYPE_CHECKING:
+    from ..config.model import Config
+
+# Cheap statement features that passes declare as ``triggers``: a pass can only change a
+# statement containing all of its triggers, so the pipeline skips it otherwise. Each is a
+# substring of the lower-cased text (or a pattern), found in one C-level scan; they are
+# computed once per statement into a bitmap. Every pass keeps the triggers it does not
+# consume (e.g. collapsing whitespace never creates an "and"), so the input's bitmap stays
+# valid for the whole pipeline.
+FEATURES: dict[str, str | re.Pattern[str]] = {
+    "where": "where",
+    "and": "and",
+    "in": "in",
+    "(": "(",
+    ",": ",",
+    # Anything normalise_literals can replace: numbers and quoted/dollar-quoted strings
+    "literal": re.compile(r"[\d'\"$]"),
+}
+_BITS = {name: 1 << i for i, name in enumerate(FEATURES)}
+ALL_FEATURES = (1 << len(FEATURES)) - 1
+
+
+@cache
+def feature_mask(triggers: frozenset[str]) -> int:
+    unknown = triggers - _BITS.keys()
+    if unknown:
+        raise KeyError(f"Unknown statement features: {sorted(unknown)}")
+    return sum(_BITS[t] for t in triggers)
+
+
+def statement_features(text: str) -> int:
+    """Bitmap of the ``FEATURES`` present in ``text``."""
+    low = text.lower()
+    bits = 0
+    for name, probe in FEATURES.items():
+        if (probe in low) if isinstance(probe, str) else probe.search(low):
+            bits |= _BITS[name]
+    return bits
+
+
+def applicable(stage: Any, features: int) -> bool:
+    mask = feature_mask(stage.triggers)
+    return features & mask == mask
+
+
+def run_stages(stages: Iterable[Any], ast: AstNode, cfg: Config) -> AstNode:
+    """Run compiled stages over ``ast``, skipping passes whose triggers are absent."""
+    features = statement_features(ast.text)
+    for stage in stages:
+        ast = run_stage(stage, ast, cfg, features)
+    return ast
+
+
+def run_stage(stage: Any, ast: AstNode, cfg: Config, features: int = ALL_FEATURES) -> AstNode:
+    if isinstance(stage, FusedStage):
+        return stage.apply(ast, cfg, features)
+    return stage.apply(ast, cfg) if applicable(stage, features) else ast
+
+
+class FusedStage:
+    """
+    Runs a run of token-local passes in a single scan of the statement.
+
+    Each matched token is handed to every pass in order (a pass sees the token as the
+    previous pass rewrote it), and the results are written into one output string, so
+    no intermediate text or ``AstNode`` is built between the fused passes. Each pass's
+    ``finish_text`` then runs once on that string. Passes that are not ``enabled`` for
+    the config, or whose triggers are not among the statement's ``features``, are
+    skipped, along with the token kinds only they need.
+
+    The output is the same as running the passes one after another: a pass that does
+    not take a comment-bearing token (see ``COMPOSITE_KINDS``) rewrites the tokens
+    inside it, as its own scan of the whole text would.
+    """
+
+    token_local = True
+
+    def __init__(self, passes: Sequence[Any]):
+        self.passes = list(passes)
+        self.name = "+".join(p.name for p in self.passes)
+        self._kinds = frozenset(k for p in self.passes for k in p.token_kinds)
+        # The stage can only fire where at least one of its passes can
+        self.triggers = frozenset.intersection(*(frozenset(p.triggers) for p in self.passes))
+
+    def apply(self, ast: AstNode, cfg: Config, features: int = ALL_FEATURES) -> AstNode:
+        passes = [p for p in self.passes if p.enabled(cfg) and applicable(p, features)]
+        if not passes:
+            return ast
+        kinds = (
+            self._kinds
+            if len(passes) == len(self.passes)
+            else frozenset(k for p in passes for k in p.token_kinds)
+        )
+        scanner = compile_scanner(kinds, cfg.dialect)
+
+        def rewrite(m: re.Match) -> str:
+            kind = m.lastgroup
+            text = m.group()
+            for p in passes:
+                if kind in p.token_kinds:
+                    kind, text = p.rewrite_token(kind, text, m.start(), cfg, ast)
+                elif kind in COMPOSITE_KINDS and not text.isspace():
+                    text = _rewrite_inside(p, text, m.start(), cfg, ast)
+            return text
+
+        if ast.params is not None or ast.tags is not None:
+            out = scanner.sub(rewrite, ast.text)
+        else:
+            # Without side channels to fill, a token's rewrite depends only on its text, so
+            # repeated tokens (keywords, common literals) are looked up instead of recomputed.
+            memo: dict[str, str] = {}
+
+            def repl(m: re.Match) -> str:
+                text = m.group()
+                out = memo.get(text)
+                if out is None:
+                    out = memo[text] = rewrite(m)
+                return out
+
+            out = scanner.sub(repl, ast.text)
+
+        for p in passes:
+            out = p.finish_text(out, cfg)
+        return ast.derive(out)
+
+
+def _rewrite_inside(p: Any, text: str, start: int, cfg: Config, ast: AstNode) -> str:
+    """Run token-local pass ``p`` alone over the tokens inside a comment-bearing token."""
+
+    def rewrite(m: re.Match) -> str:
+        if m.lastgroup not in p.token_kinds:
+            return m.group()
+        return p.rewrite_token(m.lastgroup, m.group(), start + m.start(), cfg, ast)[1]
+
+    return compile_scanner(p.token_kinds, cfg.dialect).sub(rewrite, text)
+
+
+def compile_pipeline(passes: Sequence[Any]) -> list[Any]:
+    """Group consecutive token-local passes into ``FusedStage``s; other passes run as-is."""
+    stages: list[Any] = []
+    run: list[Any] = []
+    for p in passes:
+        if getattr(p, "token_local", False):
+            run.append(p)
+            continue
+        if run:
+            stages.append(FusedStage(run) if len(run) > 1 else run[0])
+            run = []
+        stages.append(p)
+    if run:
+        stages.append(FusedStage(run) if len(run) > 1 else run[0])
+    return stages
@@ -2,8 +2,22 @@ import hashlib
 
 from ..protocols import AstNode, HashComputer
 
+Buffer = bytes | bytearray | memoryview
+
 
 class Sha256Hash(HashComputer):
     def digest(self, ast: AstNode, cfg) -> str:
-        data = ast.text.encode("utf-8")  # replace with stable AST serialization later
+        # replace with stable AST serialization later
+        return self.digest_bytes(ast.text.encode("utf-8"))
+
+    def digest_bytes(self, data: Buffer) -> str:
+        """Digest of an already UTF-8 encoded canonical form (e.g. ``normalise_bytes`` output)."""
         return hashlib.sha256(data).hexdigest()
+
+    def digest_int(self, ast: AstNode, cfg) -> int:
+        """The first 64 bits of the digest as an integer (``int(digest[:16], 16)``)."""
+        return self.digest_int_bytes(ast.text.encode("utf-8"))
+
+    def digest_int_bytes(self, data: Buffer) -> int:
+        """``digest_int`` of an already UTF-8 encoded canonical form."""
+        return int.from_bytes(hashlib.sha256(data).digest()[:8], "big")
@@ -0,0 +1,123 @@
+"""
+Incremental canonicalisation of SQL documents for editors and language servers.
+
+A document is a sequence of ``;``-separated statements, each canonicalised on its own
+(the passes work on one statement: a WHERE clause runs to the end of its text). After
+an edit only the statements it touches are re-tokenized and re-canonicalised: the
+dialect's statement scanner is restarted at the separator before the edit and stops as
+soon as it lands on an old separator past it, from where the previous statements are
+reused as-is. Pass work is therefore proportional to the edited statements, not the
+document; only joining the output, hashing it and locating statements scale with the
+document, at C speed. Statements are stored by length, so the ones after an edit are
+shifted without touching them; their offsets are prefix sums, computed when needed.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from collections.abc import Iterator
+from functools import cached_property
+from itertools import accumulate
+
+from . import Canonicalizer, Config
+from .parsing.dialects import get_dialect
+from .protocols import AstNode
+
+# Separator between canonical statements in ``CanonicalDocument.canonical_text``.
+STATEMENT_SEPARATOR = ";\n"
+
+
+class CanonicalDocument:
+    """
+    The canonical form of a SQL document, updated in place of re-running on each edit.
+
+    >>> doc = CanonicalDocument("select 1; select * from t where a in (2,1)")
+    >>> doc = doc.edit(7, 1, "42")  # offset, deleted length, inserted text
+    >>> doc.canonical_text, doc.hash
+
+    Results are immutable; ``edit`` returns a new document sharing the unchanged
+    statements with this one. ``recomputed`` is the number of statements that had to be
+    canonicalised to build it.
+    """
+
+    def __init__(self, text: str, cfg: Config | None = None, *, canonicalizer: Canonicalizer | None = None):
+        self.text = text
+        self.cfg = cfg or Config()
+        self.canonicalizer = canonicalizer or Canonicalizer()
+        # Length of each statement, trailing ";" included; the last one runs to the end of
+        # the text and may be empty.
+        self._lengths: list[int] = []
+        self._canonical: list[str] = []
+        for start, end in self._segments(text, 0):
+            self._lengths.append(end - start)
+            self._canonical.append(self._canonicalise(text[start:end]))
+        self.recomputed = len(self._lengths)
+
+    def _segments(self, text: str, pos: int) -> Iterator[tuple[int, int]]:
+        scanner = get_dialect(self.cfg.dialect).statement_scanner
+        start = pos
+        for m in scanner.finditer(text, pos):
+            if m.group() == ";":
+                yield start, m.end()
+                start = m.end()
+        yield start, len(text)
+
+    def _canonicalise(self, raw: str) -> str:
+        body = raw[:-1] if raw.endswith(";") else raw
+        body = body.strip()
+        return self.canonicalizer.normalise(body, self.cfg) if body else ""
+
+    @cached_property
+    def _starts(self) -> list[int]:
+        """Offset of each statement in the text."""
+        return list(accumulate(self._lengths[:-1], initial=0))
+
+    @property
+    def statements(self) -> list[str]:
+        """Canonical form of each statement, "" for empty ones."""
+        return list(self._canonical)
+
+    @cached_property
+    def canonical_text(self) -> str:
+        return STATEMENT_SEPARATOR.join(s for s in self._canonical if s)
+
+    @cached_property
+    def hash(self) -> str:
+        return self.canonicalizer.hasher.digest(AstNode(self.canonical_text), self.cfg)
+
+    def edit(self, offset: int, deleted: int, inserted: str) -> CanonicalDocument:
+        """Apply a text edit (replace ``deleted`` characters at ``offset`` with ``inserted``)."""
+        text = self.text
+        if not 0 <= offset <= len(text) or deleted < 0 or offset + deleted > len(text):
+            raise ValueError(f"Edit ({offset}, {deleted}) outside document of length {len(text)}")
+        new_text = text[:offset] + inserted + text[offset + deleted :]
+        delta = len(inserted) - deleted
+        edit_end = offset + len(inserted)
+        starts = self._starts
+        lengths = self._lengths
+
+        # The separator before the edit still ends a statement: nothing before it changed.
+        first = bisect_right(starts, offset) - 1
+        new_lengths: list[int] = []
+        new_canonical: list[str] = []
+        resume = len(starts)
+        for start, end in self._segments(new_text, starts[first]):
+            new_lengths.append(end - start)
+            new_canonical.append(self._canonicalise(new_text[start:end]))
+            # Past the edit, a separator that was also one before it puts the scanner
+            # back in step with the old statements. (The last statement ends at the end
+            # of the text, not at a separator.)
+            if edit_end <= end - 1 and end < len(new_text):
+                k = bisect_left(starts, end - delta, first + 1)
+                if k < len(starts) and starts[k] == end - delta:
+                    resume = k
+                    break
+
+        doc = object.__new__(CanonicalDocument)
+        doc.text = new_text
+        doc.cfg = self.cfg
+        doc.canonicalizer = self.canonicalizer
+        doc._lengths = lengths[:first] + new_lengths + lengths[resume:]
+        doc._canonical = self._canonical[:first] + new_canonical + self._canonical[resume:]
+        doc.recomputed = len(new_canonical)
+        return doc
@@ -0,0 +1,166 @@
+"""
+Columnar canonicalisation for Arrow arrays and pandas Series.
+
+Query logs are dominated by a handful of repeated statements, so the column is
+dictionary-encoded first and only its distinct values are canonicalised and hashed.
+The results come back dictionary-encoded (Arrow ``DictionaryArray`` / pandas
+``Categorical``) by remapping the input's integer codes in one vectorised step; no
+per-row Python work is done.
+
+Requires the ``arrow`` or ``pandas`` extra: ``pip install 'sqlcanon[arrow]'``.
+"""
+
+from __future__ import annotations
+
+import importlib
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from .. import Canonicalizer, Config
+from ..protocols import AstNode
+
+# Below this many distinct statements a process pool costs more than it saves.
+PARALLEL_MIN_UNIQUE = 2048
+
+
+def _require(module: str, extra: str) -> Any:
+    try:
+        return importlib.import_module(module)
+    except ImportError as exc:
+        raise ImportError(
+            f"{module} is required for this function; install it with: pip install 'sqlcanon[{extra}]'"
+        ) from exc
+
+
+def _normalise_chunk(canon: Canonicalizer, cfg: Config, chunk: Sequence[str]) -> list[str]:
+    return [canon.normalise(s, cfg) for s in chunk]
+
+
+def _normalise_all(
+    values: Sequence[str], cfg: Config, canon: Canonicalizer, max_workers: int | None
+) -> list[str]:
+    if not max_workers or max_workers < 2 or len(values) < PARALLEL_MIN_UNIQUE:
+        return _normalise_chunk(canon, cfg, values)
+    size = -(-len(values) // (max_workers * 4))
+    chunks = [values[i : i + size] for i in range(0, len(values), size)]
+    with ProcessPoolExecutor(max_workers) as pool:
+        parts = pool.map(_normalise_chunk, [canon] * len(chunks), [cfg] * len(chunks), chunks)
+    return [s for part in parts for s in part]
+
+
+def canonicalise_unique(
+    values: Sequence[str],
+    cfg: Config | None = None,
+    *,
+    canonicalizer: Canonicalizer | None = None,
+    max_workers: int | None = None,
+) -> tuple[list[int], list[str], list[str]]:
+    """
+    Canonicalise and hash a sequence of (ideally distinct) statements.
+
+    Returns ``(codes, canonical, hashes)``: ``canonical`` holds each distinct canonical
+    form once, ``hashes[j]`` is the hash of ``canonical[j]`` and ``canonical[codes[i]]``
+    is the canonical form of ``values[i]``. With ``max_workers`` the statements are
+    split across a process pool (the canonicalizer and config must be picklable).
+    """
+    cfg = cfg or Config()
+    canon = canonicalizer or Canonicalizer()
+    index: dict[str, int] = {}
+    codes = [index.setdefault(form, len(index)) for form in _normalise_all(values, cfg, canon, max_workers)]
+    canonical = list(index)
+    hashes = [canon.hasher.digest(AstNode(form), cfg) for form in canonical]
+    return codes, canonical, hashes
+
+
+def canonicalise_arrow(
+    values: Any,
+    cfg: Config | None = None,
+    *,
+    canonicalizer: Canonicalizer | None = None,
+    max_workers: int | None = None,
+) -> Any:
+    """
+    Canonicalise an Arrow string column.
+
+    ``values`` may be an ``Array`` or ``ChunkedArray`` of strings or UTF-8 binary, or already
+    dictionary-encoded. Returns a ``pyarrow.Table`` with ``canonical`` and ``hash``
+    columns, both dictionary-encoded over the same indices and chunked like the input.
+    Nulls stay null.
+    """
+    pa = _require("pyarrow", "arrow")
+    pc = _require("pyarrow.compute", "arrow")
+
+    chunked = isinstance(values, pa.ChunkedArray)
+    if not pa.types.is_dictionary(values.type):
+        values = values.dictionary_encode()
+    if chunked:
+        values = values.unify_dictionaries()
+        chunks = values.chunks
+        dictionary = chunks[0].dictionary if chunks else pa.array([], pa.string())
+    else:
+        chunks = [values]
+        dictionary = values.dictionary
+
+    # A pre-encoded dictionary may itself hold nulls; their codes map to null
+    entries = dictionary.to_pylist()
+    present = [i for i, v in enumerate(entries) if v is not None]
+    codes, canonical, hashes = canonicalise_unique(
+        [entries[i] for i in present], cfg, canonicalizer=canonicalizer, max_workers=max_workers
+    )
+    lut_values: list[int | None] = [None] * len(entries)
+    for i, code in zip(present, codes):
+        lut_values[i] = code
+    lut = pa.array(lut_values, pa.int32())
+    canonical_dict = pa.array(canonical, pa.string())
+    hash_dict = pa.array(hashes, pa.string())
+
+    canonical_out, hash_out = [], []
+    for chunk in chunks:
+        indices = pc.take(lut, chunk.indices)
+        canonical_out.append(pa.DictionaryArray.from_arrays(indices, canonical_dict))
+        hash_out.append(pa.DictionaryArray.from_arrays(indices, hash_dict))
+    dict_type = pa.dictionary(pa.int32(), pa.string())
+    return pa.table(
+        {
+            "canonical": pa.chunked_array(canonical_out, dict_type),
+            "hash": pa.chunked_array(hash_out, dict_type),
+        }
+    )
+
+
+def canonicalise_series(
+    series: Any,
+    cfg: Config | None = None,
+    *,
+    canonicalizer: Canonicalizer | None = None,
+    max_workers: int | None = None,
+) -> Any:
+    """
+    Canonicalise a pandas Series of statements.
+
+    Returns a DataFrame on the same index with ``canonical`` and ``hash`` columns as
+    ``Categorical``\\ s sharing one set of codes. Missing values stay missing. A
+    categorical input is used as-is rather than factorised again.
+    """
+    pd = _require("pandas", "pandas")
+    np = _require("numpy", "pandas")
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        raw_codes, uniques = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        raw_codes, uniques = pd.factorize(series)
+
+    codes, canonical, hashes = canonicalise_unique(
+        list(uniques), cfg, canonicalizer=canonicalizer, max_workers=max_workers
+    )
+    # A trailing -1 maps the missing-value code (-1) back to itself.
+    lut = np.asarray([*codes, -1], dtype=np.int64)
+    new_codes = lut[raw_codes]
+    return pd.DataFrame(
+        {
+            "canonical": pd.Categorical.from_codes(new_codes, categories=pd.Index(canonical, dtype=object)),
+            "hash": pd.Categorical.from_codes(new_codes, categories=pd.Index(hashes, dtype=object)),
+        },
+        index=series.index,
+    )
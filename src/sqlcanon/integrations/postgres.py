@@ -0,0 +1,293 @@
+"""
+psycopg 3 / asyncpg wrappers that execute the canonical form of each statement as a
+server-side prepared statement.
+
+Statements are canonicalised with the exec-safe profile, so equivalent statements (IN
+lists or AND terms in another order, different keyword case) become the same text and
+share one prepared statement and plan. Positional parameters (``%s`` / ``$n``) are
+renumbered in order of appearance after canonicalisation and the arguments permuted to
+match, so reordering never misbinds them.
+
+Each wrapped connection keeps an LRU from canonical hash to prepared statement and
+reports its hit rate (``conn.stats``). The wrappers only use the drivers' public
+methods and need neither driver installed to import.
+"""
+
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+from .. import Canonicalizer, Config
+from ..parsing.tokenizer import compile_scanner
+from ..protocols import AstNode
+
+# Keyword case and clause ordering only: literals stay in place, so output is executable.
+EXEC_SAFE = Config(passes=["case_keywords", "sort_in_list", "normalise_predicates"], dialect="postgres")
+
+# Strings, identifiers, comments and placeholders of the postgres lexer table, plus
+# psycopg's "%%" escape so "%%s" is not read as a placeholder.
+_SCANNER = re.compile(r"(?P<pct>%%)|" + compile_scanner(("comment",), "postgres").pattern)
+
+
+@dataclass
+class PlanStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class PreparedStatementCache:
+    """LRU from canonical hash to a driver's prepared statement, with reuse counters."""
+
+    def __init__(self, maxsize: int = 256):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.stats = PlanStats()
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            stmt = self._entries.get(key)
+            if stmt is None:
+                self.stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return stmt
+
+    def put(self, key: str, stmt: Any) -> Any | None:
+        """Store ``stmt``; return the evicted statement, if any."""
+        with self._lock:
+            self._entries[key] = stmt
+            if len(self._entries) <= self.maxsize:
+                return None
+            self.stats.evictions += 1
+            return self._entries.popitem(last=False)[1]
+
+
+class Rewritten(NamedTuple):
+    text: str
+    hash: str
+    # For positional placeholders: order[i] is the index of the original argument bound
+    # to the i-th placeholder of ``text``; None when arguments need no reordering.
+    order: tuple[int, ...] | None
+    # Number of positional arguments the original statement takes
+    nargs: int = 0
+
+    def bind(self, args: Any) -> Any:
+        if args is None or isinstance(args, Mapping):
+            return args
+        if len(args) != self.nargs:
+            raise ValueError(f"Statement has {self.nargs} placeholders but {len(args)} arguments were passed")
+        if self.order is None:
+            return args
+        return [args[i] for i in self.order]
+
+
+class StatementRewriter:
+    """Canonicalise driver statements, memoised per raw statement string."""
+
+    def __init__(
+        self,
+        cfg: Config | None = None,
+        *,
+        canonicalizer: Canonicalizer | None = None,
+        memo_size: int = 1024,
+    ):
+        self.canonicalizer = canonicalizer or Canonicalizer()
+        self.cfg = replace(cfg or EXEC_SAFE, dialect="postgres")
+        self.rewrite = lru_cache(maxsize=memo_size)(self._rewrite)
+
+    def _rewrite(self, sql: str, style: str) -> Rewritten:
+        # 1. Give psycopg's "%s" placeholders numbers so they can be followed through
+        #    reordering ("$n" placeholders already have them).
+        seen = 0
+
+        def number(m: re.Match) -> str:
+            nonlocal seen
+            if m.lastgroup == "param" and m.group() == "%s":
+                seen += 1
+                return f"${seen}"
+            return m.group()
+
+        numbered = _SCANNER.sub(number, sql) if style == "format" else sql
+        canonical = self.canonicalizer.normalise(numbered, self.cfg)
+
+        # 2. Renumber "$n" in order of appearance and record the argument permutation.
+        order: list[int] = []
+        new_number: dict[str, int] = {}
+
+        def renumber(m: re.Match) -> str:
+            text = m.group()
+            if m.lastgroup != "param" or not text.startswith("$"):
+                return text
+            if text not in new_number:
+                order.append(int(text[1:]) - 1)
+                new_number[text] = len(order)
+            return "%s" if style == "format" else f"${new_number[text]}"
+
+        text = _SCANNER.sub(renumber, canonical)
+        digest = self.canonicalizer.hasher.digest(AstNode(text), self.cfg)
+        identity = order == list(range(len(order)))
+        return Rewritten(text, digest, None if identity else tuple(order), max(order, default=-1) + 1)
+
+
+class CanonicalCursor:
+    """A psycopg cursor that runs canonical statements with ``prepare=True``."""
+
+    def __init__(self, conn: CanonicalConnection, cursor: Any):
+        self.connection = conn
+        self._cursor = cursor
+
+    def execute(self, query: str, params: Any = None, **kwargs: Any) -> CanonicalCursor:
+        if params is None:
+            # Without parameters psycopg sends the query as a script, which may hold several
+            # statements or DDL that cannot be prepared: pass it through.
+            self._cursor.execute(query, **kwargs)
+            return self
+        rw = self.connection._statement(query)
+        kwargs.setdefault("prepare", True)
+        self._cursor.execute(rw.text, rw.bind(params), **kwargs)
+        return self
+
+    def executemany(self, query: str, params_seq: Any, **kwargs: Any) -> None:
+        rw = self.connection._statement(query)
+        self._cursor.executemany(rw.text, [rw.bind(p) for p in params_seq], **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self) -> CanonicalCursor:
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._cursor.close()
+
+
+class CanonicalConnection:
+    """
+    Wrap a psycopg 3 connection. psycopg keys its prepared statements by query text,
+    so this tracks canonical hashes in an LRU of the same size as psycopg's
+    ``prepared_max``; a hit is an execution that reuses an already prepared plan.
+    """
+
+    def __init__(
+        self,
+        conn: Any,
+        cfg: Config | None = None,
+        *,
+        canonicalizer: Canonicalizer | None = None,
+        maxsize: int = 256,
+        rewriter: StatementRewriter | None = None,
+    ):
+        self._conn = conn
+        self.rewriter = rewriter or StatementRewriter(cfg, canonicalizer=canonicalizer)
+        self.plans = PreparedStatementCache(maxsize)
+        if hasattr(conn, "prepared_max"):
+            conn.prepared_max = maxsize
+
+    @property
+    def stats(self) -> PlanStats:
+        return self.plans.stats
+
+    def _statement(self, query: str) -> Rewritten:
+        rw = self.rewriter.rewrite(query, "format")
+        if self.plans.get(rw.hash) is None:
+            self.plans.put(rw.hash, rw.text)
+        return rw
+
+    def cursor(self, *args: Any, **kwargs: Any) -> CanonicalCursor:
+        return CanonicalCursor(self, self._conn.cursor(*args, **kwargs))
+
+    def execute(self, query: str, params: Any = None, **kwargs: Any) -> CanonicalCursor:
+        return self.cursor().execute(query, params, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
+
+    def __enter__(self) -> CanonicalConnection:
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any) -> Any:
+        return self._conn.__exit__(*exc)
+
+
+class AsyncCanonicalConnection:
+    """
+    Wrap an asyncpg connection. Canonical statements are prepared once with
+    ``conn.prepare`` and the ``PreparedStatement`` objects kept in the per-connection
+    LRU; evicted ones are released to asyncpg, which closes them server-side.
+    """
+
+    def __init__(
+        self,
+        conn: Any,
+        cfg: Config | None = None,
+        *,
+        canonicalizer: Canonicalizer | None = None,
+        maxsize: int = 256,
+        rewriter: StatementRewriter | None = None,
+    ):
+        self._conn = conn
+        self.rewriter = rewriter or StatementRewriter(cfg, canonicalizer=canonicalizer)
+        self.plans = PreparedStatementCache(maxsize)
+
+    @property
+    def stats(self) -> PlanStats:
+        return self.plans.stats
+
+    async def prepare(self, query: str) -> tuple[Any, Rewritten]:
+        rw = self.rewriter.rewrite(query, "dollar")
+        stmt = self.plans.get(rw.hash)
+        if stmt is None:
+            stmt = await self._conn.prepare(rw.text)
+            self.plans.put(rw.hash, stmt)
+        return stmt, rw
+
+    async def fetch(self, query: str, *args: Any, timeout: float | None = None) -> list:
+        stmt, rw = await self.prepare(query)
+        return await stmt.fetch(*rw.bind(args), timeout=timeout)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: float | None = None) -> Any:
+        stmt, rw = await self.prepare(query)
+        return await stmt.fetchrow(*rw.bind(args), timeout=timeout)
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: float | None = None) -> Any:
+        stmt, rw = await self.prepare(query)
+        return await stmt.fetchval(*rw.bind(args), column=column, timeout=timeout)
+
+    async def execute(self, query: str, *args: Any, timeout: float | None = None) -> str:
+        if not args:
+            # asyncpg runs an argument-less execute as a simple-protocol script, which may
+            # hold several statements or DDL that cannot be prepared: pass it through.
+            return await self._conn.execute(query, timeout=timeout)
+        stmt, rw = await self.prepare(query)
+        await stmt.fetch(*rw.bind(args), timeout=timeout)
+        return stmt.get_statusmsg()
+
+    async def executemany(self, query: str, args: Sequence[Sequence[Any]], *, timeout: float | None = None):
+        stmt, rw = await self.prepare(query)
+        return await stmt.executemany([rw.bind(a) for a in args], timeout=timeout)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._conn, name)
@@ -0,0 +1,163 @@
+"""
+SQLAlchemy integration: canonicalise statements in ``before_cursor_execute`` with a
+per-engine memo.
+
+SQLAlchemy's compiled cache hands the same statement string to the cursor on every
+execution, so canonical text and hash are computed once per distinct string and kept in
+a bounded LRU. Memos live in a weak mapping keyed by engine and go away with it.
+
+Requires the ``sqlalchemy`` extra: ``pip install 'sqlcanon[sqlalchemy]'``.
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Any, NamedTuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .. import Canonicalizer, Config
+from ..protocols import AstNode
+
+# Passes whose output is not executable (placeholders replace literals), and passes that
+# reorder text and so would misbind positional ("?" / "%s") parameters.
+_NOT_EXEC_SAFE = {"normalise_literals"}
+_REORDERING = {"sort_in_list", "normalise_predicates"}
+
+# Key under which the last statement's CanonicalStatement is left in ``Connection.info``.
+INFO_KEY = "sqlcanon"
+
+
+class CanonicalStatement(NamedTuple):
+    text: str
+    hash: str
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Time spent canonicalising on misses; hits are assumed to save the mean miss cost.
+    canonicalise_seconds: float = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        return self.hits * self.canonicalise_seconds / self.misses if self.misses else 0.0
+
+
+class StatementCache:
+    """Bounded LRU of statement string -> :class:`CanonicalStatement`. Thread-safe."""
+
+    def __init__(self, canonicalizer: Canonicalizer, cfg: Config, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.canonicalizer = canonicalizer
+        self.cfg = cfg
+        self.maxsize = maxsize
+        self.stats = CacheStats()
+        self._entries: OrderedDict[str, CanonicalStatement] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, statement: str) -> CanonicalStatement:
+        with self._lock:
+            entry = self._entries.get(statement)
+            if entry is not None:
+                self._entries.move_to_end(statement)
+                self.stats.hits += 1
+                return entry
+
+        t0 = perf_counter()
+        text = self.canonicalizer.normalise(statement, self.cfg)
+        entry = CanonicalStatement(text, self.canonicalizer.hasher.digest(AstNode(text), self.cfg))
+        elapsed = perf_counter() - t0
+
+        with self._lock:
+            self.stats.misses += 1
+            self.stats.canonicalise_seconds += elapsed
+            self._entries[statement] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class _Installed(NamedTuple):
+    cache: StatementCache
+    listener: Any
+
+
+_ENGINES: weakref.WeakKeyDictionary[Engine, _Installed] = weakref.WeakKeyDictionary()
+
+
+def _check_exec_safe(canon: Canonicalizer, cfg: Config, positional: bool) -> None:
+    names = {canon._resolve_pass_name(n) for n in cfg.passes or canon._default_pass_names}
+    unsafe = names & (_NOT_EXEC_SAFE | (_REORDERING if positional else set()))
+    if unsafe:
+        raise ValueError(
+            f"Passes {sorted(unsafe)} cannot rewrite executed SQL on this engine"
+            + (" (positional paramstyle)" if positional else "")
+        )
+
+
+def instrument(
+    engine: Engine,
+    cfg: Config | None = None,
+    *,
+    canonicalizer: Canonicalizer | None = None,
+    rewrite: bool = False,
+    maxsize: int = 1024,
+) -> StatementCache:
+    """
+    Install the canonicalising hook on ``engine`` and return its statement cache.
+
+    Every execution leaves the statement's :class:`CanonicalStatement` in
+    ``connection.info[INFO_KEY]`` (for tagging metrics and traces). With ``rewrite``
+    the canonical text is executed in place of the original; ``cfg`` must then be
+    exec-safe: no ``normalise_literals``, and no reordering passes when the driver uses
+    positional parameters. Instrumenting an engine again replaces its hook.
+    """
+    canon = canonicalizer or Canonicalizer()
+    cfg = cfg or Config()
+    if rewrite:
+        _check_exec_safe(canon, cfg, engine.dialect.positional)
+    uninstrument(engine)
+    cache = StatementCache(canon, cfg, maxsize)
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        entry = cache.lookup(statement)
+        conn.info[INFO_KEY] = entry
+        return (entry.text if rewrite else statement), parameters
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute, retval=True)
+    _ENGINES[engine] = _Installed(cache, before_cursor_execute)
+    return cache
+
+
+def uninstrument(engine: Engine) -> None:
+    """Remove the hook installed by :func:`instrument` (no-op if there is none)."""
+    installed = _ENGINES.pop(engine, None)
+    if installed is not None:
+        event.remove(engine, "before_cursor_execute", installed.listener)
+
+
+def get_stats(engine: Engine) -> CacheStats | None:
+    installed = _ENGINES.get(engine)
+    return installed.cache.stats if installed is not None else None
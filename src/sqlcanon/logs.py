@@ -0,0 +1,543 @@
+"""
+Streaming readers for database query logs.
+
+Each reader turns a log file into ``LogRecord(statement, metadata)`` records:
+
+* ``postgres-csv``: Postgres ``csvlog`` (any version; quoted multi-line fields)
+* ``postgres-json``: Postgres ``jsonlog`` (15+)
+* ``mysql-slow``: the MySQL / MariaDB slow query log (multi-line statements, split on
+  entry headers)
+* ``pg-stat-statements``: a CSV dump of ``pg_stat_statements`` with a header row
+
+Postgres messages are read for ``statement:`` and ``execute <name>:`` lines (with the
+``duration:`` prefix of ``log_min_duration_statement``); ``parse``/``bind`` lines, which
+repeat the ``execute``, are skipped.
+
+``LogReader`` reads the file as bytes, line by line, so it always knows the byte offset
+just past the last complete record. With ``checkpoint=`` that offset (and the file's
+identity) can be saved, and a restarted reader resumes there. With ``follow=True`` it
+waits for new lines at the end of the file like ``tail -F``: when the file is rotated
+(renamed and recreated) it finishes the old file and reopens the new one, and when it is
+truncated in place it starts again from the top. Lines that do not parse (a torn
+write, a corrupt entry) are skipped and counted in ``LogReader.skipped`` rather than
+ending the stream.
+
+``canonicalise_records`` feeds a batch of records through the batch path
+(``integrations.columnar.canonicalise_unique``).
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Iterator, Sequence
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from . import Canonicalizer, Config
+from .integrations.columnar import canonicalise_unique
+
+
+class LogRecord(NamedTuple):
+    statement: str
+    metadata: dict[str, Any]
+
+
+def _number(value: str) -> Any:
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except ValueError:
+            pass
+    return value
+
+
+class _Parser(ABC):
+    """
+    Turns complete lines into records. ``pending`` is true mid-record. ``feed`` raises
+    ``ValueError`` for a line that does not parse; records dropped without an exception
+    (e.g. malformed rows inside a multi-line chunk) are counted in ``skipped``.
+    """
+
+    header = False  # the first record is a header, needed again on resume
+    skipped = 0
+
+    @abstractmethod
+    def feed(self, line: str) -> list[LogRecord]: ...
+
+    def flush(self) -> list[LogRecord]:
+        """Records still buffered at the end of a file that will not grow."""
+        return []
+
+    def idle(self) -> list[LogRecord]:
+        """Buffered records known to be complete while a followed file has no more lines."""
+        return []
+
+    @property
+    def pending(self) -> bool:
+        return False
+
+    def state(self) -> dict[str, Any]:
+        """Context carried from one record to the next, saved with a checkpoint."""
+        return {}
+
+    def restore(self, state: dict[str, Any]) -> None:
+        pass
+
+
+class _CsvRows(_Parser):
+    """
+    Reassembles CSV rows whose quoted fields span lines. A torn line with an unbalanced
+    quote makes the following rows buffer together until the count evens out: every row
+    in the chunk is parsed, and ones ``row`` rejects are counted in ``skipped``. A chunk
+    that grows past ``max_record`` characters is discarded and its lines counted.
+    """
+
+    max_record = 16 * 1024 * 1024
+
+    def __init__(self) -> None:
+        self._buf: list[str] = []
+        self._size = 0
+        self._quotes = 0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._buf)
+
+    def feed(self, line: str) -> list[LogRecord]:
+        self._buf.append(line)
+        self._size += len(line)
+        # Quotes inside fields are doubled, so the row is complete when the count is even
+        self._quotes += line.count('"')
+        if self._quotes % 2 == 0:
+            return self._rows()
+        if self._size > self.max_record:
+            self.skipped += len(self._buf)
+            self._reset()
+        return []
+
+    def _rows(self) -> list[LogRecord]:
+        text = "".join(self._buf)
+        self._reset()
+        try:
+            rows = list(csv.reader(io.StringIO(text, newline="")))
+        except csv.Error:
+            self.skipped += 1
+            return []
+        out: list[LogRecord] = []
+        for row in rows:
+            if not row:
+                continue
+            try:
+                out += self.row(row)
+            except ValueError:
+                self.skipped += 1
+        return out
+
+    def _reset(self) -> None:
+        self._buf.clear()
+        self._size = 0
+        self._quotes = 0
+
+    @abstractmethod
+    def row(self, row: list[str]) -> list[LogRecord]:
+        """Records for one CSV row; raises ``ValueError`` if it is not one of the format's."""
+
+
+# "statement: ..." / "execute S_1: ...", optionally after "duration: 1.2 ms  "
+_PG_MESSAGE = re.compile(r"(?:duration: (?P<duration>[\d.]+) ms\s+)?(?:statement|execute [^:\n]*): ")
+
+
+def _postgres_record(message: str, metadata: dict[str, Any]) -> list[LogRecord]:
+    m = _PG_MESSAGE.match(message)
+    if m is None:
+        return []
+    if m.group("duration"):
+        metadata["duration_ms"] = float(m.group("duration"))
+    return [LogRecord(message[m.end() :], {k: v for k, v in metadata.items() if v not in ("", None)})]
+
+
+class PostgresCsvParser(_CsvRows):
+    COLUMNS = (
+        "log_time",
+        "user_name",
+        "database_name",
+        "process_id",
+        "connection_from",
+        "session_id",
+        "session_line_num",
+        "command_tag",
+        "session_start_time",
+        "virtual_transaction_id",
+        "transaction_id",
+        "error_severity",
+        "sql_state_code",
+        "message",
+        "detail",
+        "hint",
+        "internal_query",
+        "internal_query_pos",
+        "context",
+        "query",
+        "query_pos",
+        "location",
+        "application_name",
+        "backend_type",  # 13+
+        "leader_pid",  # 14+
+        "query_id",  # 14+
+    )
+    # Column counts written by Postgres 12 and earlier, 13, and 14+
+    WIDTHS = frozenset({23, 24, 26})
+
+    def row(self, row: list[str]) -> list[LogRecord]:
+        if len(row) not in self.WIDTHS:
+            raise ValueError(f"csvlog row with {len(row)} columns")
+        fields = dict(zip(self.COLUMNS, row))
+        metadata = {
+            "log_time": fields.get("log_time"),
+            "user": fields.get("user_name"),
+            "database": fields.get("database_name"),
+            "pid": _number(fields.get("process_id", "")),
+            "session_id": fields.get("session_id"),
+            "application": fields.get("application_name"),
+            "detail": fields.get("detail"),
+            "query_id": fields.get("query_id"),
+        }
+        return _postgres_record(fields.get("message", ""), metadata)
+
+
+class PostgresJsonParser(_Parser):
+    def feed(self, line: str) -> list[LogRecord]:
+        if not line.strip():
+            return []
+        entry = json.loads(line)
+        if not isinstance(entry, dict):
+            raise ValueError("not a jsonlog entry")
+        metadata = {
+            "log_time": entry.get("timestamp"),
+            "user": entry.get("user"),
+            "database": entry.get("dbname"),
+            "pid": entry.get("pid"),
+            "session_id": entry.get("session_id"),
+            "application": entry.get("application_name"),
+            "detail": entry.get("detail"),
+            "query_id": entry.get("query_id"),
+        }
+        return _postgres_record(entry.get("message", ""), metadata)
+
+
+class PgStatStatementsParser(_CsvRows):
+    header = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.columns: list[str] | None = None
+
+    def row(self, row: list[str]) -> list[LogRecord]:
+        if self.columns is None:
+            self.columns = row
+            return []
+        if len(row) != len(self.columns):
+            raise ValueError(f"row with {len(row)} columns, header has {len(self.columns)}")
+        fields = dict(zip(self.columns, row))
+        statement = fields.pop("query", "")
+        return [LogRecord(statement, {k: _number(v) for k, v in fields.items()})]
+
+
+class MySqlSlowLogParser(_Parser):
+    """
+    Entries are split on their ``# Time:`` / ``# User@Host:`` / ``# Query_time:``
+    headers, not on a line ending in ``;``, which may fall inside a string literal or a
+    procedure body.
+    """
+
+    _entry_start = ("# Time:", "# User@Host:", "# Query_time:")
+
+    _user_host = re.compile(
+        r"# User@Host: (?P<user>[^\[\s]*)\[[^\]]*\] @ (?P<host>\S*) \[(?P<ip>[^\]]*)\]"
+        r"(?:\s+Id:\s+(?P<id>\d+))?"
+    )
+    _pairs = re.compile(r"(\w+): (\S+)")
+    _use = re.compile(r"use `?([^`;]+)`?;", re.IGNORECASE)
+    # Written when the server (re)opens the log
+    _preamble = re.compile(r"\S+, Version: .* started with:|Tcp port: |Time\s+Id\s+Command\s+Argument")
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+        self._meta: dict[str, Any] = {}
+        self._database: str | None = None
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._lines or self._meta)
+
+    def state(self) -> dict[str, Any]:
+        # "use db" lines are only logged when the database changes
+        return {"database": self._database}
+
+    def restore(self, state: dict[str, Any]) -> None:
+        self._database = state.get("database")
+
+    def _emit(self) -> list[LogRecord]:
+        statement = "".join(self._lines).strip()
+        if statement.endswith(";"):
+            statement = statement[:-1].rstrip()
+        metadata = dict(self._meta)
+        if self._database is not None:
+            metadata["database"] = self._database
+        self._lines.clear()
+        self._meta = {}
+        return [LogRecord(statement, metadata)] if statement else []
+
+    def feed(self, line: str) -> list[LogRecord]:
+        s = line.rstrip("\r\n")
+        out: list[LogRecord] = []
+        if s.startswith(self._entry_start) and self._lines:
+            out = self._emit()  # the previous entry's statement ends where this one starts
+        if not self._lines:
+            if s.startswith("# Time:"):
+                self._meta["time"] = s[len("# Time:") :].strip()
+                return out
+            if s.startswith("# User@Host:"):
+                m = self._user_host.match(s)
+                if m:
+                    self._meta.update(user=m["user"], host=m["host"] or m["ip"])
+                    if m["id"]:
+                        self._meta["connection_id"] = int(m["id"])
+                return out
+            if s.startswith("#"):
+                self._meta.update((k.lower(), _number(v)) for k, v in self._pairs.findall(s))
+                return out
+            if s.startswith("SET timestamp=") and s.endswith(";"):
+                self._meta["timestamp"] = _number(s[len("SET timestamp=") : -1])
+                return out
+            m = self._use.fullmatch(s.strip())
+            if m:
+                self._database = m.group(1)
+                return out
+            if not s.strip() or self._preamble.match(s):
+                return out
+        self._lines.append(line)
+        return out
+
+    def flush(self) -> list[LogRecord]:
+        return self._emit() if self._lines else []
+
+    def idle(self) -> list[LogRecord]:
+        # The server writes a whole entry at a time, so when a followed log goes quiet
+        # on a line ending in ";" the last statement is complete
+        if self._lines and self._lines[-1].rstrip().endswith(";"):
+            return self._emit()
+        return []
+
+
+FORMATS: dict[str, type[_Parser]] = {
+    "postgres-csv": PostgresCsvParser,
+    "postgres-json": PostgresJsonParser,
+    "mysql-slow": MySqlSlowLogParser,
+    "pg-stat-statements": PgStatStatementsParser,
+}
+
+
+def _identity(st: os.stat_result) -> list[int]:
+    return [st.st_dev, st.st_ino]
+
+
+class LogReader:
+    """
+    Reads ``LogRecord``s from a log file.
+
+    >>> reader = LogReader("postgresql.csv", "postgres-csv", follow=True, checkpoint="pg.ckpt")
+    >>> for batch in reader.batches(1000):
+    ...     process(batch)
+    ...     reader.save_checkpoint()  # a restart resumes after this batch
+
+    ``offset`` is the byte offset just past the last record returned (or past lines
+    that hold no record), i.e. where a resumed reader would start.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        format: str,
+        *,
+        follow: bool = False,
+        poll_interval: float = 0.5,
+        checkpoint: str | Path | None = None,
+    ):
+        if format not in FORMATS:
+            raise KeyError(f"Unknown log format: {format!r} (known: {sorted(FORMATS)})")
+        self.path = Path(path)
+        self.format = format
+        self.follow = follow
+        self.poll_interval = poll_interval
+        self.checkpoint = Path(checkpoint) if checkpoint is not None else None
+        self.offset = 0
+        self.skipped = 0  # lines that did not parse
+        self._identity: list[int] | None = None
+        self._state: dict[str, Any] = {}  # the parser's state() at ``offset``
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Make a following reader return once it has read to the end of the file."""
+        self._stop.set()
+
+    def _resume(self, st: os.stat_result) -> tuple[int, dict[str, Any]]:
+        if self.checkpoint is None or not self.checkpoint.exists():
+            return 0, {}
+        try:
+            saved = json.loads(self.checkpoint.read_text(encoding="utf-8"))
+        except ValueError:
+            return 0, {}
+        if saved.get("identity") != _identity(st) or saved.get("offset", 0) > st.st_size:
+            return 0, {}  # rotated or truncated since: the saved offset is for another file
+        return int(saved["offset"]), saved.get("parser", {})
+
+    def save_checkpoint(self) -> None:
+        if self.checkpoint is None:
+            raise ValueError("LogReader was created without a checkpoint path")
+        data = json.dumps(
+            {"path": str(self.path), "identity": self._identity, "offset": self.offset, "parser": self._state}
+        )
+        target = self.checkpoint
+        fd, tmp = tempfile.mkstemp(prefix=target.name, suffix=".tmp", dir=target.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _open(self, resume: bool) -> tuple[Any, _Parser]:
+        f = open(self.path, "rb")  # closed by _records
+        st = os.fstat(f.fileno())
+        self._identity = _identity(st)
+        parser = FORMATS[self.format]()
+        start, state = self._resume(st) if resume else (0, {})
+        if start:
+            if parser.header:
+                self._feed(parser, f.readline())
+            parser.restore(state)
+        f.seek(start)
+        self.offset = start
+        self._state = parser.state()
+        return f, parser
+
+    def _feed(self, parser: _Parser, line: bytes) -> list[LogRecord]:
+        before = parser.skipped
+        try:
+            return parser.feed(line.decode("utf-8", errors="replace"))
+        except (ValueError, csv.Error):
+            self.skipped += 1
+            return []
+        finally:
+            self.skipped += parser.skipped - before
+
+    def _flush(self, parser: _Parser) -> list[LogRecord]:
+        before = parser.skipped
+        records = parser.flush()
+        self.skipped += parser.skipped - before
+        return records
+
+    def _rotated(self, f: Any) -> str | None:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None  # between rename and re-create: keep waiting
+        if _identity(st) != self._identity:
+            return "rotated"
+        if st.st_size < f.tell():
+            return "truncated"
+        return None
+
+    def _records(self) -> Iterator[LogRecord | None]:
+        """Records, with ``None`` each time the end of the file is reached."""
+        f, parser = self._open(resume=True)
+        partial = b""
+        try:
+            while True:
+                line = f.readline()
+                if line.endswith(b"\n") or (line and not self.follow):
+                    line, partial = partial + line, b""
+                    end = f.tell()
+                    records = self._feed(parser, line)
+                    if not parser.pending:
+                        self.offset = end
+                        self._state = parser.state()
+                    elif records:  # records that ended where this line (a new one) starts
+                        self.offset = end - len(line)
+                        self._state = parser.state()
+                    yield from records
+                    continue
+                partial += line  # at the end of the file, possibly mid-line
+                if not self.follow:
+                    records = self._flush(parser)
+                    if records:
+                        self.offset = f.tell()
+                        self._state = parser.state()
+                    yield from records
+                    return
+                records = parser.idle()
+                if records:
+                    self.offset = f.tell() - len(partial)
+                    self._state = parser.state()
+                    yield from records
+                yield None
+                change = self._rotated(f)
+                if change is not None:
+                    if change == "rotated":
+                        # Finish the old file: lines written since the last poll, then
+                        # a last unterminated one (its writer has moved on)
+                        rest = partial + f.read()
+                        for line in rest.splitlines(keepends=True):
+                            yield from self._feed(parser, line)
+                        yield from self._flush(parser)
+                    f.close()
+                    f, parser = self._open(resume=False)
+                    partial = b""
+                    continue
+                if self._stop.wait(self.poll_interval):
+                    return
+        finally:
+            f.close()
+
+    def __iter__(self) -> Iterator[LogRecord]:
+        return (r for r in self._records() if r is not None)
+
+    def batches(self, size: int = 1000) -> Iterator[list[LogRecord]]:
+        """Lists of up to ``size`` records; a following reader also yields what it has when idle."""
+        batch: list[LogRecord] = []
+        for record in self._records():
+            if record is not None:
+                batch.append(record)
+                if len(batch) < size:
+                    continue
+            if batch:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def canonicalise_records(
+    records: Sequence[LogRecord],
+    cfg: Config | None = None,
+    *,
+    canonicalizer: Canonicalizer | None = None,
+    max_workers: int | None = None,
+) -> list[tuple[str, str, dict[str, Any]]]:
+    """``(hash, canonical, metadata)`` per record; each distinct statement is canonicalised once."""
+    # Logs repeat statements verbatim, so dictionary-encode them first (as the columnar path does)
+    index: dict[str, int] = {}
+    raw_codes = [index.setdefault(r.statement, len(index)) for r in records]
+    codes, canonical, hashes = canonicalise_unique(
+        list(index), cfg, canonicalizer=canonicalizer, max_workers=max_workers
+    )
+    return [(hashes[codes[i]], canonical[codes[i]], r.metadata) for i, r in zip(raw_codes, records)]
@@ -0,0 +1,243 @@
+"""
+First-seen detection of query shapes in bounded memory.
+
+``NoveltyDetector`` remembers canonical hashes in Bloom filters instead of a set, so
+memory is fixed by the expected number of shapes and the false-positive rate (about
+1.8 bytes per shape at 0.1%). A false positive means a new shape is missed, never that
+a known one is reported again. Two modes:
+
+* scalable (default): when a filter reaches its capacity a larger one with a tighter
+  error rate is added, so the overall false-positive rate stays under ``error_rate``
+  and nothing is forgotten;
+* rotating (``rotate_every`` seconds): the newest of ``generations`` generations takes
+  inserts and the oldest is dropped at each rotation, so a shape is reported again
+  once it has not been seen for a whole window. Rotation is by time only: a generation
+  that fills up grows like a scalable detector rather than rotating early, so a burst
+  of new shapes never shortens the window.
+
+State can be saved to and loaded from a single file.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+MAGIC = b"SQLCNOV1"
+_LEN = struct.Struct("<I")
+_MASK64 = (1 << 64) - 1
+
+# Scalable mode: each new filter holds GROWTH times more shapes at TIGHTENING times the
+# error rate of the previous one, so the error rates sum to at most ``error_rate``.
+GROWTH = 2
+TIGHTENING = 0.5
+
+
+def _key(shape: int | str) -> int:
+    """A 64-bit key: ``Canonicalizer.hash_int`` output, or a hex ``Canonicalizer.hash``."""
+    if isinstance(shape, str):
+        return int(shape[:16], 16)
+    return shape & _MASK64
+
+
+class BloomFilter:
+    """A Bloom filter over 64-bit keys, sized for ``capacity`` keys at ``error_rate``."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _probe(self, key: int) -> tuple[int, int]:
+        # Double hashing (Kirsch & Mitzenmacher): probe i is start + i * step (mod size).
+        # Keys are already uniform hash bits, so they are used as they are.
+        size = self.size
+        return key % size, (((key >> 32) | (key << 32)) & _MASK64 | 1) % size or 1
+
+    def __contains__(self, key: int) -> bool:
+        bits, size = self.bits, self.size
+        pos, step = self._probe(key)
+        for _ in range(self.hashes):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+            pos += step
+            if pos >= size:
+                pos -= size
+        return True
+
+    def add(self, key: int) -> bool:
+        """Insert ``key``; return whether it was (probably) absent."""
+        bits, size = self.bits, self.size
+        pos, step = self._probe(key)
+        new = False
+        for _ in range(self.hashes):
+            byte, bit = pos >> 3, 1 << (pos & 7)
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                new = True
+            pos += step
+            if pos >= size:
+                pos -= size
+        if new:
+            self.count += 1
+        return new
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+
+class NoveltyDetector:
+    """
+    Reports the shapes (canonical hashes) it has not seen before.
+
+    >>> novelty = NoveltyDetector(capacity=1_000_000, error_rate=0.001)
+    >>> if novelty.add(canon.hash_int(sql)):
+    ...     alert(sql)
+    >>> novelty.save("novelty.bin")
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1_000_000,
+        error_rate: float = 0.001,
+        *,
+        rotate_every: float | None = None,
+        generations: int = 2,
+        clock: Callable[[], float] = time.time,
+    ):
+        if rotate_every is not None and rotate_every <= 0:
+            raise ValueError("rotate_every must be positive")
+        if generations < 1:
+            raise ValueError("generations must be at least 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rotate_every = rotate_every
+        self.generations = generations
+        self.clock = clock
+        self._lock = threading.Lock()
+        # Generations, oldest first, each a scalable series of filters (the scalable mode
+        # is a single generation that is never rotated).
+        self._generations: list[list[BloomFilter]] = [[self._new_filter(0)]]
+        self.rotated_at = clock()
+
+    @property
+    def filters(self) -> list[BloomFilter]:
+        """Every filter, oldest generation first."""
+        return [f for gen in self._generations for f in gen]
+
+    def _new_filter(self, index: int) -> BloomFilter:
+        # Each generation's filters share its error budget: the rates sum to at most that
+        budget = self.error_rate if self.rotate_every is None else self.error_rate / self.generations
+        return BloomFilter(self.capacity * GROWTH**index, budget * (1 - TIGHTENING) * TIGHTENING**index)
+
+    def _maybe_rotate(self) -> None:
+        if self.rotate_every is not None:
+            # Catch up on every window that has passed (e.g. after an idle gap or a load)
+            steps = int((self.clock() - self.rotated_at) // self.rotate_every)
+            if steps > 0:
+                fresh = [[self._new_filter(0)] for _ in range(min(steps, self.generations))]
+                self._generations = [*self._generations, *fresh][-self.generations :]
+                self.rotated_at += steps * self.rotate_every
+        current = self._generations[-1]
+        if current[-1].full:
+            current.append(self._new_filter(len(current)))
+
+    def __contains__(self, shape: int | str) -> bool:
+        key = _key(shape)
+        return any(key in f for f in self.filters)
+
+    def add(self, shape: int | str) -> bool:
+        """Record ``shape``; return True if it had not been seen before."""
+        with self._lock:
+            return self._add(_key(shape))
+
+    def _add(self, key: int) -> bool:
+        self._maybe_rotate()
+        current = self._generations[-1]
+        newest = current[-1]
+        if any(key in f for f in self.filters if f is not newest):
+            if self.rotate_every is not None and not any(key in f for f in current):
+                newest.add(key)  # keep it alive past the next rotation
+            return False
+        return newest.add(key)
+
+    def add_many(self, shapes: Iterable[int | str]) -> list[bool]:
+        """Bulk ``add`` (e.g. the hashes of ``integrations.columnar.canonicalise_unique``)."""
+        with self._lock:
+            return [self._add(_key(s)) for s in shapes]
+
+    def __len__(self) -> int:
+        """Approximate number of distinct shapes remembered."""
+        return sum(f.count for f in self.filters)
+
+    def save(self, path: str | Path) -> None:
+        """Write the state to ``path`` atomically."""
+        path = Path(path)
+        with self._lock:
+            header = {
+                "capacity": self.capacity,
+                "error_rate": self.error_rate,
+                "rotate_every": self.rotate_every,
+                "generations": self.generations,
+                "rotated_at": self.rotated_at,
+                "filters": [[[f.capacity, f.error_rate, f.count] for f in gen] for gen in self._generations],
+            }
+            blobs = [bytes(f.bits) for f in self.filters]
+        meta = json.dumps(header).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC + _LEN.pack(len(meta)) + meta)
+                for blob in blobs:
+                    f.write(blob)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    @classmethod
+    def load(cls, path: str | Path, *, clock: Callable[[], float] = time.time) -> NoveltyDetector:
+        data = Path(path).read_bytes()
+        if data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a novelty detector state file")
+        (meta_len,) = _LEN.unpack_from(data, len(MAGIC))
+        pos = len(MAGIC) + _LEN.size
+        header = json.loads(data[pos : pos + meta_len])
+        pos += meta_len
+        detector = cls(
+            header["capacity"],
+            header["error_rate"],
+            rotate_every=header["rotate_every"],
+            generations=header["generations"],
+            clock=clock,
+        )
+        detector.rotated_at = header["rotated_at"]
+        detector._generations = []
+        for gen in header["filters"]:
+            filters = []
+            for capacity, error_rate, count in gen:
+                bloom = BloomFilter(capacity, error_rate)
+                end = pos + len(bloom.bits)
+                if end > len(data):
+                    raise ValueError(f"{path} is truncated")
+                bloom.bits[:] = data[pos:end]
+                bloom.count = count
+                filters.append(bloom)
+                pos = end
+            detector._generations.append(filters)
+        return detector
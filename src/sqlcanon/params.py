@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Literal
+
+# Placeholders emitted by the literal-normalisation pass, in template order.
+PLACEHOLDER_RE = re.compile(r"'__STR__'|\b__NUM__\b")
+
+
+@dataclass(frozen=True)
+class ExtractedLiteral:
+    """A literal lifted out of a statement by ``normalise_literals``.
+
+    ``text`` is the literal exactly as written (quotes and escapes included), and
+    ``start``/``end`` are its offsets in the text the pass scanned. With the default
+    profile only length-preserving passes run first, so these are offsets into the
+    original statement.
+    """
+
+    kind: Literal["str", "num"]
+    text: str
+    start: int
+    end: int
+
+    @property
+    def value(self) -> str | int | float:
+        """The decoded value. Doubled quotes are unescaped; backslash escapes
+        (MySQL strings, Postgres ``E'...'``) are left as written."""
+        if self.kind == "num":
+            return float(self.text) if "." in self.text else int(self.text)
+        t = self.text
+        if t.startswith("$"):  # Postgres $tag$...$tag$
+            tag = t[: t.index("$", 1) + 1]
+            closed = len(t) >= 2 * len(tag) and t.endswith(tag)
+            return t[len(tag) : -len(tag) if closed else None]
+        if t[0] not in "'\"":  # E'...' / N'...' prefixes
+            t = t[1:]
+        q = t[0]
+        return t[1:-1].replace(q + q, q)
+
+
+def count_placeholders(text: str) -> int:
+    return sum(1 for _ in PLACEHOLDER_RE.finditer(text))
+
+
+def permute_params(
+    params: list[ExtractedLiteral],
+    base: int,
+    counts: Sequence[int],
+    order: Sequence[int],
+) -> None:
+    """Reorder ``params`` in place to follow a reordering of text segments.
+
+    ``base`` is the number of placeholders before the first segment, ``counts`` the
+    number of placeholders inside each segment (in original order) and ``order`` the
+    new segment order, as indices into ``counts``.
+    """
+    offsets = []
+    pos = base
+    for n in counts:
+        offsets.append(pos)
+        pos += n
+    reordered: list[ExtractedLiteral] = []
+    for i in order:
+        reordered.extend(params[offsets[i] : offsets[i] + counts[i]])
+    params[base:pos] = reordered
+
+
+def bind_params(template: str, params: Sequence[ExtractedLiteral]) -> str:
+    """Substitute ``params`` back into the placeholders of ``template``, in order.
+
+    >>> t, ps = Canonicalizer().parameterise("select * from t where a = 1")
+    >>> bind_params(t, ps)
+    'SELECT * FROM t WHERE a = 1'
+    """
+    it = iter(params)
+
+    def repl(m: re.Match) -> str:
+        try:
+            return next(it).text
+        except StopIteration:
+            raise ValueError("Template has more placeholders than parameters") from None
+
+    out = PLACEHOLDER_RE.sub(repl, template)
+    if next(it, None) is not None:
+        raise ValueError("Template has fewer placeholders than parameters")
+    return out
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import cache, cached_property
+
+KEYWORDS = frozenset(
+    {
+        "select",
+        "from",
+        "where",
+        "and",
+        "or",
+        "in",
+        "join",
+        "on",
+        "as",
+        "group",
+        "by",
+        "order",
+        "limit",
+    }
+)
+
+# Reserved words (SQL:2016 plus common dialect ones) that stay quoted when used as
+# identifiers, since unquoting them would change how the statement parses.
+RESERVED_WORDS = KEYWORDS | frozenset(
+    {
+        "all",
+        "alter",
+        "asc",
+        "between",
+        "case",
+        "cast",
+        "check",
+        "column",
+        "constraint",
+        "create",
+        "cross",
+        "current_date",
+        "current_time",
+        "current_timestamp",
+        "current_user",
+        "default",
+        "delete",
+        "desc",
+        "distinct",
+        "drop",
+        "else",
+        "end",
+        "except",
+        "exists",
+        "false",
+        "fetch",
+        "for",
+        "foreign",
+        "full",
+        "grant",
+        "having",
+        "index",
+        "inner",
+        "insert",
+        "intersect",
+        "into",
+        "is",
+        "key",
+        "left",
+        "like",
+        "natural",
+        "not",
+        "null",
+        "offset",
+        "outer",
+        "primary",
+        "references",
+        "right",
+        "rows",
+        "session_user",
+        "set",
+        "table",
+        "then",
+        "to",
+        "true",
+        "union",
+        "unique",
+        "update",
+        "user",
+        "using",
+        "values",
+        "when",
+        "with",
+    }
+)
+
+# Comments: "--" to end of line, or "/* ... */" (an unterminated one runs to the end, so the
+# lazy match never fails and rescans). Optimizer hints are block comments starting "/*+".
+COMMENT = r"--[^\n]*|/\*[\s\S]*?(?:\*/|\Z)"
+
+# Quoted forms. Each is unrolled (runs of ordinary characters between escapes) so an attempt
+# is a single linear pass. A doubled quote is an escaped quote everywhere; the "_BS" forms
+# also accept backslash escapes.
+SINGLE_QUOTED = r"'[^']*(?:''[^']*)*'"
+SINGLE_QUOTED_BS = r"'[^'\\]*(?:(?:''|\\[\s\S])[^'\\]*)*'"
+DOUBLE_QUOTED = r'"[^"]*(?:""[^"]*)*"'
+DOUBLE_QUOTED_BS = r'"[^"\\]*(?:(?:""|\\[\s\S])[^"\\]*)*"'
+BACKTICK_QUOTED = r"`[^`]*(?:``[^`]*)*`"
+BRACKET_QUOTED = r"\[[^\]]*(?:\]\][^\]]*)*\]"
+# A dollar quote cannot follow an identifier character (Postgres reads "a$b$" as one name).
+# Like a comment, an unterminated one runs to the end, so a failed search for its closing
+# tag is never repeated from each later opener.
+DOLLAR_QUOTED = r"(?<!\w)\$(?P<dq>(?:[A-Za-z_]\w*)?)\$[\s\S]*?(?:\$(?P=dq)\$|\Z)"
+
+# Opening delimiter of each quoted form (prefixed forms such as E'' end with one of these).
+_OPENERS = {
+    SINGLE_QUOTED: "'",
+    SINGLE_QUOTED_BS: "'",
+    DOUBLE_QUOTED: '"',
+    DOUBLE_QUOTED_BS: '"',
+    BACKTICK_QUOTED: "`",
+    BRACKET_QUOTED: r"\[",
+    DOLLAR_QUOTED: r"(?<!\w)\$(?:[A-Za-z_]\w*)?\$",
+}
+
+# DB-API "pyformat" placeholders. Drivers for any database may use them (SQLAlchemy
+# compiles bind parameters to them), and a name such as %(order)s is not a keyword.
+PYFORMAT = r"%\(\w+\)s"
+
+# Used by the clause-level passes: an unterminated single quote swallows the rest of the text
+# (their historical behaviour) instead of being passed through.
+SINGLE_QUOTED_TO_END = r"'[^']*(?:''[^']*)*(?:'|\Z)"
+
+
+@dataclass(frozen=True)
+class Dialect:
+    """
+    Lexer table for one SQL dialect: quoting rules, bind-placeholder syntax, comment
+    forms, the keyword set folded by ``case_keywords`` and the case the database folds
+    unquoted identifiers to. Token patterns and compiled scanners are derived once per
+    dialect and cached.
+    """
+
+    name: str
+    strings: tuple[str, ...] = (SINGLE_QUOTED,)
+    identifiers: tuple[str, ...] = (DOUBLE_QUOTED,)
+    placeholders: tuple[str, ...] = (r"\?", r"(?<![:\w]):(?:[A-Za-z_]\w*|\d+)", PYFORMAT)
+    comments: tuple[str, ...] = (COMMENT,)
+    keywords: frozenset[str] = KEYWORDS
+    # "lower" or "upper": a quoted identifier already in this case means the same unquoted
+    identifier_fold: str = "lower"
+
+    @cached_property
+    def token_patterns(self) -> dict[str, str]:
+        """
+        Token patterns in match priority order. Strings, quoted identifiers, placeholders
+        and comments come first so nothing inside them is mistaken for code; the \\b guards
+        keep digits inside identifiers out of "num". "space" (a run of whitespace and
+        comments) is tried before "comment", and "keyword" before "word", so a scanner
+        wanting both sees whole runs/keywords.
+        """
+        comment = "|".join(self.comments)
+        return {
+            "str": "|".join(self.strings),
+            "ident": "|".join(self.identifiers),
+            "param": "|".join(self.placeholders),
+            "space": r"(?:\s+|" + comment + r")+",
+            "comment": comment,
+            "num": r"\b\d+(?:\.\d+)?\b",
+            "keyword": r"(?i:\b(?:" + "|".join(sorted(self.keywords)) + r")\b)",
+            "word": r"\b\w+\b",
+        }
+
+    @cached_property
+    def comment_re(self) -> re.Pattern[str]:
+        return re.compile("|".join(self.comments))
+
+    @cached_property
+    def statement_scanner(self) -> re.Pattern[str]:
+        """
+        Scanner whose ``;`` matches are statement separators. Quoted forms and comments
+        are skipped, and an unterminated quote runs to the end of the text, so whether a
+        ``;`` separates statements never depends on the text after it.
+        """
+        quoted = [*self.strings, *self.identifiers]
+        openers = dict.fromkeys(o for k, o in _OPENERS.items() for p in quoted if p.endswith(k))
+        unterminated = [o + r"[\s\S]*" for o in openers]
+        return re.compile("|".join([*quoted, *self.comments, *unterminated, ";"]))
+
+    @cached_property
+    def quoted(self) -> str:
+        """Alternation of every quoted form, for the clause-level passes' own scanners."""
+        extra = [p for p in (*self.strings, *self.identifiers) if p != SINGLE_QUOTED]
+        return "|".join([*extra, SINGLE_QUOTED_TO_END])
+
+
+ANSI = Dialect("ansi")
+
+DIALECTS: dict[str, Dialect] = {
+    d.name: d
+    for d in (
+        ANSI,
+        Dialect(
+            "postgres",
+            strings=(r"(?<!\w)[eE]" + SINGLE_QUOTED_BS, SINGLE_QUOTED, DOLLAR_QUOTED),
+            placeholders=(r"\$\d+", PYFORMAT, r"%s"),
+            keywords=KEYWORDS | {"ilike", "offset", "returning"},
+        ),
+        Dialect(
+            "mysql",
+            strings=(SINGLE_QUOTED_BS, DOUBLE_QUOTED_BS),
+            identifiers=(BACKTICK_QUOTED,),
+            placeholders=(r"\?", PYFORMAT, r"%s"),
+            comments=(COMMENT, r"#[^\n]*"),
+            keywords=KEYWORDS | {"offset", "straight_join"},
+        ),
+        Dialect(
+            "tsql",
+            strings=(r"(?<!\w)[nN]" + SINGLE_QUOTED, SINGLE_QUOTED),
+            identifiers=(BRACKET_QUOTED, DOUBLE_QUOTED),
+            placeholders=(r"@@?[A-Za-z_]\w*", r"\?", PYFORMAT),
+            keywords=KEYWORDS | {"top"},
+        ),
+        Dialect(
+            "sqlite",
+            identifiers=(DOUBLE_QUOTED, BACKTICK_QUOTED, BRACKET_QUOTED),
+            placeholders=(r"\?\d*", r"[:@$][A-Za-z_]\w*"),
+            keywords=KEYWORDS | {"glob", "offset"},
+        ),
+    )
+}
+
+_ALIASES = {
+    "postgresql": "postgres",
+    "pg": "postgres",
+    "mariadb": "mysql",
+    "mssql": "tsql",
+    "sqlserver": "tsql",
+}
+
+
+@cache
+def get_dialect(name: str) -> Dialect:
+    """Resolve a dialect name (case-insensitive; a few common aliases accepted)."""
+    key = name.strip().lower()
+    key = _ALIASES.get(key, key)
+    if key not in DIALECTS:
+        raise KeyError(f"Unknown SQL dialect: {name!r} (known: {sorted(DIALECTS)})")
+    return DIALECTS[key]
+
+
+@cache
+def compile_quoted_scanner(dialect: Dialect, extra: str) -> re.Pattern[str]:
+    """Scanner for the clause-level passes: any quoted form of ``dialect``, or ``extra``."""
+    return re.compile(dialect.quoted + "|" + extra)
@@ -1,7 +1,11 @@
-from ..protocols import AstNode, QueryParser
+from ..protocols import AstNode, QueryParser, SqlInput
 
 
 class SqlParseAdapter(QueryParser):
-    def parse(self, sql: str) -> AstNode:
+    def parse(self, sql: SqlInput) -> AstNode:
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8")
+        elif not isinstance(sql, str):
+            sql = str(sql, "utf-8")  # decoded from the buffer, no intermediate bytes copy
         # placeholder: real impl would build/attach AST
         return AstNode(sql)
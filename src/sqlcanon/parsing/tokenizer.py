@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+from functools import cache
+
+from .dialects import get_dialect
+
+# Kinds every scanner matches, so their contents are never scanned as code. Comments are
+# not among them: literals inside a comment are scrubbed like any other (they are as likely
+# to hold PII), unless a pass asks for "comment"/"space" tokens to handle them itself.
+ALWAYS_MATCHED = frozenset({"str", "ident", "param"})
+
+# Kinds whose text can hold other tokens: a comment's body is scanned as code by any
+# scanner that does not match comments, so a pass that does not take these kinds still
+# rewrites the tokens inside them.
+COMPOSITE_KINDS = frozenset({"space", "comment"})
+
+
+@cache
+def _compile(dialect: str, kinds: tuple[str, ...]) -> re.Pattern[str]:
+    patterns = get_dialect(dialect).token_patterns
+    return re.compile("|".join(f"(?P<{k}>{patterns[k]})" for k in kinds))
+
+
+def compile_scanner(kinds: Iterable[str], dialect: str = "ansi") -> re.Pattern[str]:
+    """
+    Return a regex matching only the token kinds in ``kinds`` (plus strings, quoted
+    identifiers and placeholders, which are always matched) using the lexer
+    table of ``dialect``. The match's ``lastgroup`` is the token kind; text between
+    matches is passed through untouched. Scanners are cached per dialect and kind set.
+    """
+    patterns = get_dialect(dialect).token_patterns
+    wanted = set(kinds) | ALWAYS_MATCHED
+    unknown = wanted - patterns.keys()
+    if unknown:
+        raise KeyError(f"Unknown token kinds: {sorted(unknown)}")
+    return _compile(dialect, tuple(k for k in patterns if k in wanted))
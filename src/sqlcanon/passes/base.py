@@ -1,9 +1,47 @@
 from ..config.model import Config
+from ..core.engine import FusedStage
 from ..protocols import AstNode
 
 
 class BasePass:
     name = "base"
 
+    # Token-local passes only rewrite individual tokens of the kinds listed in
+    # ``token_kinds`` (see parsing.tokenizer), so the pipeline can fuse neighbouring ones
+    # into a single scan. They implement ``rewrite_token`` instead of ``apply``.
+    token_local = False
+    token_kinds: frozenset[str] = frozenset()
+
+    # Statement features (see core.engine.FEATURES) that must all be present for the pass
+    # to change anything; the pipeline skips it on statements lacking one.
+    triggers: frozenset[str] = frozenset()
+
+    def enabled(self, cfg: Config) -> bool:
+        """Whether a token-local pass does anything under ``cfg``; fused stages leave
+        disabled passes (and the token kinds only they need) out of the scan."""
+        return True
+
+    def rewrite_token(
+        self,
+        kind: str,
+        text: str,
+        start: int,
+        cfg: Config,
+        ast: AstNode,
+    ) -> tuple[str, str]:
+        """
+        Return the (kind, text) to emit in place of the token at ``start`` of ``ast``.
+        Apart from filling ``ast``'s side channels (``params``, ``tags``), the result must
+        depend only on ``kind``, ``text`` and ``cfg``; fused stages memoise rewrites by
+        token text.
+        """
+        return kind, text
+
+    def finish_text(self, text: str, cfg: Config) -> str:
+        """Whole-output fix-up run once after a scan (e.g. trimming); must not move tokens."""
+        return text
+
     def apply(self, ast: AstNode, cfg: Config) -> AstNode:
+        if self.token_local:
+            return FusedStage([self]).apply(ast, cfg)
         return ast
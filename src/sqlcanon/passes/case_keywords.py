@@ -1,32 +1,21 @@
-import re
-
 from ..config.model import Config
+from ..parsing.dialects import KEYWORDS
 from ..protocols import AstNode
 from .base import BasePass
 
 
 class CaseFoldKeywords(BasePass):
     name = "case_keywords"
-    SQL_KEYWORDS = {
-        "select",
-        "from",
-        "where",
-        "and",
-        "or",
-        "in",
-        "join",
-        "on",
-        "as",
-        "group",
-        "by",
-        "order",
-        "limit",
-    }
-
-    def apply(self, ast: AstNode, cfg: Config) -> AstNode:
-        def repl(m):
-            kw = m.group(0)
-            return kw.upper() if cfg.keyword_case == "upper" else kw.lower()
+    token_local = True
+    token_kinds = frozenset({"keyword"})
+    SQL_KEYWORDS = KEYWORDS
 
-        pattern = r"\b(" + "|".join(self.SQL_KEYWORDS) + r")\b"
-        return AstNode(re.sub(pattern, repl, ast.text, flags=re.IGNORECASE))
+    def rewrite_token(
+        self,
+        kind: str,
+        text: str,
+        start: int,
+        cfg: Config,
+        ast: AstNode,
+    ) -> tuple[str, str]:
+        return kind, text.upper() if cfg.keyword_case == "upper" else text.lower()
@@ -0,0 +1,59 @@
+import re
+
+from ..config.model import Config
+from ..parsing.dialects import RESERVED_WORDS, get_dialect
+from ..protocols import AstNode
+from .base import BasePass
+
+
+class NormaliseIdentifiers(BasePass):
+    """
+    Folds unquoted identifiers to ``cfg.identifier_case`` and drops quotes that are
+    redundant under the dialect's own folding of unquoted names (lower case for
+    postgres): ``"users"`` becomes ``users`` (``USERS`` when folding to upper case), but
+    ``"Users"``, ``"user id"`` and quoted reserved words keep their quotes. Keywords and
+    other reserved words are left as written (``case_keywords`` handles the former).
+    Does nothing when ``identifier_case`` is ``"as_is"``, and is then left out of the
+    scan entirely.
+    """
+
+    name = "normalise_identifiers"
+    token_local = True
+    token_kinds = frozenset({"word", "ident"})
+
+    _plain_re = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+    def enabled(self, cfg: Config) -> bool:
+        return cfg.identifier_case != "as_is"
+
+    def rewrite_token(
+        self,
+        kind: str,
+        text: str,
+        start: int,
+        cfg: Config,
+        ast: AstNode,
+    ) -> tuple[str, str]:
+        fold = str.upper if cfg.identifier_case == "upper" else str.lower
+        dialect = get_dialect(cfg.dialect)
+        if kind == "word":
+            # Numbers and hex literals scanned as words, and normalise_literals' placeholder
+            if text[0].isdigit() or text == "__NUM__":
+                return kind, text
+            low = text.lower()
+            if low in RESERVED_WORDS or low in dialect.keywords:
+                return kind, text
+            return kind, fold(text)
+        if kind == "ident":
+            name = text[1:-1]
+            # Only a name the database would fold to itself means the same unquoted: on
+            # postgres "b" is b, but "B" is not B (that is b).
+            native = str.upper if dialect.identifier_fold == "upper" else str.lower
+            if (
+                self._plain_re.fullmatch(name)
+                and native(name) == name
+                and name.lower() not in RESERVED_WORDS
+                and name.lower() not in dialect.keywords
+            ):
+                return "word", fold(name)
+        return kind, text
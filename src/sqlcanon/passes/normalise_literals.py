@@ -1,24 +1,29 @@
-import re
-
 from ..config.model import Config
+from ..params import ExtractedLiteral
 from ..protocols import AstNode
 from .base import BasePass
 
 
 class NormaliseLiterals(BasePass):
     name = "normalize_literals"
+    # Single-quoted SQL strings (handling escaped '' inside) and integer/float numbers
+    # not inside identifiers; see parsing.tokenizer for the patterns.
+    token_local = True
+    token_kinds = frozenset({"str", "num"})
+    triggers = frozenset({"literal"})
 
-    # Single-quoted SQL strings, handling escaped '' inside.
-    _string_re = re.compile(r"'(?:''|[^'])*'")
-    # Integer/float numbers not inside identifiers
-    _number_re = re.compile(r"\b\d+(?:\.\d+)?\b")
-
-    def apply(self, ast: AstNode, cfg: Config) -> AstNode:
-        text = ast.text
-
-        # Replace strings first so numbers inside strings are untouched
-        text = self._string_re.sub("'__STR__'", text)
-        # Replace standalone numbers
-        text = self._number_re.sub("__NUM__", text)
-
-        return AstNode(text)
+    def rewrite_token(
+        self,
+        kind: str,
+        text: str,
+        start: int,
+        cfg: Config,
+        ast: AstNode,
+    ) -> tuple[str, str]:
+        if ast.params is not None:
+            ast.params.append(
+                ExtractedLiteral("str" if kind == "str" else "num", text, start, start + len(text))
+            )
+        if kind == "str":
+            return "str", "'__STR__'"
+        return "word", "__NUM__"
@@ -1,12 +1,16 @@
 import re
+from collections.abc import Iterator
 
 from ..config.model import Config
+from ..params import count_placeholders, permute_params
+from ..parsing.dialects import ANSI, Dialect, compile_quoted_scanner, get_dialect
 from ..protocols import AstNode
 from .base import BasePass
 
 
 class NormalisePredicates(BasePass):
     name = "normalise_predicates"
+    triggers = frozenset({"where", "and"})
 
     # Markers that typically end a WHERE clause
     _terminators = re.compile(
@@ -14,60 +18,38 @@ class NormalisePredicates(BasePass):
         flags=re.IGNORECASE,
     )
 
-    def _contains_or_top_level(self, s: str) -> bool:
-        # Detect ' OR ' not inside quotes/parentheses
-        in_str = False
+    # Quoted strings/identifiers come from the dialect table (an unterminated single quote
+    # swallows the rest of the clause). The patterns never backtrack, so each scan is O(n)
+    # with Python-level work only per quoted token, parenthesis run or separator. (No named
+    # groups: they stop the regex engine from skipping ahead to candidate first characters.)
+    _or_sep = r"\(\(*|\)\)*| [oO][rR](?= )"
+    _and_sep = r"\(\(*|\)\)*| [aA][nN][dD] "
+
+    def _top_level_separators(self, scanner: re.Pattern, s: str) -> Iterator[re.Match]:
+        # Yield separator matches that are outside quotes and parentheses
         depth = 0
-        i = 0
-        while i < len(s):
-            ch = s[i]
-            if ch == "'" and not in_str:
-                in_str = True
-            elif ch == "'" and in_str:
-                if i + 1 < len(s) and s[i + 1] == "'":
-                    i += 1  # skip escaped quote
-                else:
-                    in_str = False
-            elif ch == "(" and not in_str:
-                depth += 1
-            elif ch == ")" and not in_str and depth > 0:
-                depth -= 1
-            # Check for OR at top level
-            if depth == 0 and not in_str and s[i : i + 4].lower() == " or ":
-                return True
-            i += 1
-        return False
+        for m in scanner.finditer(s):
+            ch = s[m.start()]
+            if ch == " ":
+                if depth == 0:
+                    yield m
+            elif ch == "(":
+                depth += m.end() - m.start()
+            elif ch == ")":
+                depth = max(0, depth - (m.end() - m.start()))
+
+    def _contains_or_top_level(self, s: str, dialect: Dialect = ANSI) -> bool:
+        # Detect ' OR ' not inside quotes/parentheses
+        scanner = compile_quoted_scanner(dialect, self._or_sep)
+        return next(self._top_level_separators(scanner, s), None) is not None
 
-    def _split_and_top_level(self, s: str) -> list[str]:
+    def _split_and_top_level(self, s: str, dialect: Dialect = ANSI) -> list[str]:
         parts: list[str] = []
-        buf: list[str] = []
-        in_str = False
-        depth = 0
-        i = 0
-        lower = s.lower()
-        while i < len(s):
-            if not in_str and depth == 0 and lower[i : i + 5] == " and ":
-                parts.append("".join(buf).strip())
-                buf = []
-                i += 5
-                continue
-            ch = s[i]
-            if ch == "'" and not in_str:
-                in_str = True
-            elif ch == "'" and in_str:
-                if i + 1 < len(s) and s[i + 1] == "'":
-                    buf.append("''")
-                    i += 1
-                else:
-                    in_str = False
-            elif ch == "(" and not in_str:
-                depth += 1
-            elif ch == ")" and not in_str and depth > 0:
-                depth -= 1
-            buf.append(ch)
-            i += 1
-        if buf:
-            parts.append("".join(buf).strip())
+        last = 0
+        for m in self._top_level_separators(compile_quoted_scanner(dialect, self._and_sep), s):
+            parts.append(s[last : m.start()].strip())
+            last = m.end()
+        parts.append(s[last:].strip())
         return [p for p in parts if p != ""]
 
     def apply(self, ast: AstNode, cfg: Config) -> AstNode:
@@ -85,15 +67,21 @@ class NormalisePredicates(BasePass):
         where_body = tail[:end]
 
         # Skip if OR appears at top level (to avoid changing semantics)
-        if self._contains_or_top_level(" " + where_body + " "):
+        dialect = get_dialect(cfg.dialect)
+        if self._contains_or_top_level(" " + where_body + " ", dialect):
             return ast
 
-        terms = self._split_and_top_level(" " + where_body + " ")
+        terms = self._split_and_top_level(" " + where_body + " ", dialect)
         if len(terms) <= 1:
             return ast
 
-        terms_sorted = sorted(terms, key=lambda s: s.lower())
-        new_where = " AND ".join(terms_sorted)
+        order = sorted(range(len(terms)), key=lambda i: terms[i].lower())
+        new_where = " AND ".join(terms[i] for i in order)
+
+        params = ast.params
+        if params is not None:
+            counts = [count_placeholders(t) for t in terms]
+            permute_params(params, count_placeholders(text[:start]), counts, order)
 
         new_text = text[:start] + " " + new_where + tail[end:]
-        return AstNode(new_text)
+        return ast.derive(new_text)
@@ -0,0 +1,53 @@
+import re
+from urllib.parse import unquote
+
+from ..config.model import Config
+from ..parsing.dialects import get_dialect
+from ..protocols import AstNode
+from .base import BasePass
+
+
+class NormaliseWhitespace(BasePass):
+    """
+    Strips comments and collapses each run of whitespace/comments to a single space,
+    trimming the statement ends. Optimizer hints (``/*+ ... */``) are kept unless
+    ``cfg.keep_hints`` is false, and sqlcommenter-style comments
+    (``/*key='value',...*/``) are decoded into ``ast.tags`` when it is a dict.
+    """
+
+    name = "normalise_whitespace"
+    token_local = True
+    token_kinds = frozenset({"space"})
+
+    _pair = r"([^=,'\s]+)='((?:[^'\\]|\\.)*)'"
+    _pair_re = re.compile(_pair)
+    _sqlcommenter_re = re.compile(r"\s*" + _pair + r"(?:\s*,\s*" + _pair + r")*\s*")
+
+    def _collect_tags(self, body: str, tags: dict[str, str]) -> None:
+        if not self._sqlcommenter_re.fullmatch(body):
+            return
+        for key, value in self._pair_re.findall(body):
+            tags[unquote(key)] = unquote(re.sub(r"\\(.)", r"\1", value))
+
+    def rewrite_token(
+        self,
+        kind: str,
+        text: str,
+        start: int,
+        cfg: Config,
+        ast: AstNode,
+    ) -> tuple[str, str]:
+        kept = []
+        for m in get_dialect(cfg.dialect).comment_re.finditer(text):
+            comment = m.group()
+            if comment.startswith("/*+"):
+                if cfg.keep_hints:
+                    kept.append(comment)
+            elif ast.tags is not None and comment.startswith("/*") and comment.endswith("*/"):
+                self._collect_tags(comment[2:-2], ast.tags)
+        if kept:
+            return kind, " " + " ".join(kept) + " "
+        return kind, " "
+
+    def finish_text(self, text: str, cfg: Config) -> str:
+        return text.strip()
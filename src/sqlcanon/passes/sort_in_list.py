@@ -1,41 +1,28 @@
 import re
 
 from ..config.model import Config
+from ..params import count_placeholders, permute_params
+from ..parsing.dialects import ANSI, Dialect, compile_quoted_scanner, get_dialect
 from ..protocols import AstNode
 from .base import BasePass
 
 
 class SortInList(BasePass):
     name = "sort_in_list"
+    # Sorting needs "IN (" and at least two items
+    triggers = frozenset({"in", "(", ","})
     _in_clause_re = re.compile(r"\bIN\s*\(([^()]*)\)", flags=re.IGNORECASE)
 
-    def _split_args(self, s: str) -> list[str]:
-        # Split on commas not inside single quotes
+    def _split_args(self, s: str, dialect: Dialect = ANSI) -> list[str]:
+        # Split on commas not inside quoted strings/identifiers (see parsing.dialects);
+        # the scan never backtracks.
         args = []
-        buf = []
-        in_str = False
-        i = 0
-        while i < len(s):
-            ch = s[i]
-            if ch == "'" and not in_str:
-                in_str = True
-                buf.append(ch)
-            elif ch == "'" and in_str:
-                # Handle escaped '' inside strings
-                if i + 1 < len(s) and s[i + 1] == "'":
-                    buf.append("''")
-                    i += 1
-                else:
-                    in_str = False
-                    buf.append(ch)
-            elif ch == "," and not in_str:
-                args.append("".join(buf).strip())
-                buf = []
-            else:
-                buf.append(ch)
-            i += 1
-        if buf:
-            args.append("".join(buf).strip())
+        last = 0
+        for m in compile_quoted_scanner(dialect, ",").finditer(s):
+            if s[m.start()] == ",":
+                args.append(s[last : m.start()].strip())
+                last = m.end()
+        args.append(s[last:].strip())
         return [a for a in args if a != ""]
 
     def _sort_key(self, token: str):
@@ -51,12 +38,25 @@ class SortInList(BasePass):
             return (2, t.lower())
 
     def apply(self, ast: AstNode, cfg: Config) -> AstNode:
+        text = ast.text
+        params = ast.params
+        dialect = get_dialect(cfg.dialect)
+        # Placeholders seen so far, so extracted params can follow the IN-list permutation
+        seen = 0
+        last = 0
+
         def repl(m: re.Match) -> str:
-            inside = m.group(1)
-            items = self._split_args(inside)
+            nonlocal seen, last
+            items = self._split_args(m.group(1), dialect)
+            order = sorted(range(len(items)), key=lambda i: self._sort_key(items[i]))
+            if params is not None:
+                seen += count_placeholders(text[last : m.start(1)])
+                last = m.end(1)
+                counts = [count_placeholders(item) for item in items]
+                permute_params(params, seen, counts, order)
+                seen += sum(counts)
             if len(items) <= 1:
                 return m.group(0)
-            items_sorted = sorted(items, key=self._sort_key)
-            return f"IN ({', '.join(items_sorted)})"
+            return f"IN ({', '.join(items[i] for i in order)})"
 
-        return AstNode(self._in_clause_re.sub(repl, ast.text))
+        return ast.derive(self._in_clause_re.sub(repl, text))
@@ -2,15 +2,32 @@ from typing import TYPE_CHECKING, Protocol
 
 if TYPE_CHECKING:
     from .config.model import Config
+    from .params import ExtractedLiteral
+
+# SQL as text, or as UTF-8 bytes straight from a driver or queue (any bytes-like object).
+SqlInput = str | bytes | bytearray | memoryview
 
 
 class AstNode:  # simple placeholder
-    def __init__(self, text: str):
+    def __init__(
+        self,
+        text: str,
+        params: "list[ExtractedLiteral] | None" = None,
+        tags: "dict[str, str] | None" = None,
+    ):
         self.text = text
+        # Side channels: set to a list/dict to ask normalise_literals to record what it
+        # replaces, or normalise_whitespace to collect sqlcommenter key/values.
+        self.params = params
+        self.tags = tags
+
+    def derive(self, text: str) -> "AstNode":
+        """A node with new text that shares this node's side channels."""
+        return AstNode(text, self.params, self.tags)
 
 
 class QueryParser(Protocol):
-    def parse(self, sql: str) -> AstNode: ...
+    def parse(self, sql: SqlInput) -> AstNode: ...
 
 
 class NormalizationPass(Protocol):
@@ -19,3 +36,7 @@ class NormalizationPass(Protocol):
 
 class HashComputer(Protocol):
     def digest(self, ast: AstNode, cfg: "Config") -> str: ...
+
+    def digest_bytes(self, data: bytes | bytearray | memoryview) -> str: ...
+
+    def digest_int_bytes(self, data: bytes | bytearray | memoryview) -> int: ...
@@ -0,0 +1,208 @@
+"""
+Incremental canonicalisation of SQL file trees (dbt models, migrations) for CI.
+
+``scan`` walks a directory and canonicalises each matching file as a document of
+``;``-separated statements (see ``incremental.CanonicalDocument``), then groups files
+whose canonical hashes are equal. A JSON manifest remembers, per file, its stat
+signature and content hash, and per content hash the canonical hash, so a later scan:
+
+* skips files whose size and mtime are unchanged (one ``stat`` each);
+* reads and hashes files whose stat changed (e.g. after a fresh checkout), but only
+  canonicalises those whose content hash is new.
+
+Changed files are read on a thread pool and, past ``PARALLEL_MIN_FILES``, canonicalised
+on a process pool. The manifest is tied to the config, the canonicalizer's passes and
+hasher, and the sqlcanon version; a change to any of them starts it afresh.
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import os
+import tempfile
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from importlib import metadata
+from pathlib import Path
+
+from . import Canonicalizer, Config
+from .incremental import CanonicalDocument
+
+MANIFEST_NAME = ".sqlcanon-manifest.json"
+MANIFEST_VERSION = 1
+
+# Below this many files to canonicalise a process pool costs more than it saves.
+PARALLEL_MIN_FILES = 256
+
+
+@dataclass
+class ScanResult:
+    # Relative path (with "/" separators) -> canonical hash
+    files: dict[str, str]
+    # Groups of two or more files with the same canonical hash, largest first
+    duplicates: list[list[str]]
+    read: int = 0  # files whose content was read and hashed
+    canonicalised: int = 0  # files run through the pipeline
+    removed: int = 0  # manifest entries for files that no longer exist
+    # Relative path (directories end with "/") -> error reading it
+    errors: dict[str, str] = field(default_factory=dict)
+
+
+def _fingerprint(cfg: Config, canon: Canonicalizer) -> str:
+    try:
+        version = metadata.version("sqlcanon")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+    # cfg.passes overrides the canonicalizer's defaults, but those apply when it is unset
+    identity = [
+        f"{type(canon).__module__}.{type(canon).__qualname__}",
+        canon._default_pass_names,
+        f"{type(canon.hasher).__module__}.{type(canon.hasher).__qualname__}",
+        canon.hash_strategy,
+    ]
+    return f"{MANIFEST_VERSION}:{version}:{cfg!r}:{identity!r}"
+
+
+def _walk(root: Path, patterns: Sequence[str]) -> tuple[dict[str, os.stat_result], dict[str, str]]:
+    """
+    Stat every matching file under ``root``, skipping hidden files and directories.
+    Returns the stats and the errors met on the way (unreadable directories, files
+    removed mid-walk); the rest of the tree is still walked.
+    """
+    found: dict[str, os.stat_result] = {}
+    errors: dict[str, str] = {}
+    pending = [("", str(root))]
+    while pending:
+        prefix, directory = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):  # also keeps the manifest out
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append((prefix + entry.name + "/", entry.path))
+                        elif any(fnmatch.fnmatch(entry.name, p) for p in patterns):
+                            found[prefix + entry.name] = entry.stat()
+                    except OSError as exc:
+                        errors[prefix + entry.name] = str(exc)
+        except OSError as exc:
+            errors[prefix or "./"] = str(exc)
+    return found, errors
+
+
+def _read(path: Path) -> tuple[str, str] | OSError:
+    """(content hash, text) of a file, or the error reading it."""
+    try:
+        data = path.read_bytes()
+    except OSError as exc:
+        return exc
+    return hashlib.sha256(data).hexdigest(), data.decode("utf-8", errors="replace")
+
+
+def _canonicalise_chunk(canon: Canonicalizer, cfg: Config, texts: Sequence[str]) -> list[str]:
+    return [CanonicalDocument(text, cfg, canonicalizer=canon).hash for text in texts]
+
+
+def _load_manifest(path: Path, fingerprint: str) -> tuple[dict[str, list], dict[str, str]]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}, {}
+    if not isinstance(data, dict) or data.get("fingerprint") != fingerprint:
+        return {}, {}
+    return data.get("files", {}), data.get("contents", {})
+
+
+def _save_manifest(path: Path, fingerprint: str, files: dict[str, list], contents: dict[str, str]) -> None:
+    data = {"fingerprint": fingerprint, "files": files, "contents": contents}
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"), sort_keys=True)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def scan(
+    root: str | Path,
+    cfg: Config | None = None,
+    *,
+    patterns: Sequence[str] = ("*.sql",),
+    manifest: str | Path | None = None,
+    canonicalizer: Canonicalizer | None = None,
+    max_workers: int | None = None,
+) -> ScanResult:
+    """
+    Canonicalise the files under ``root`` matching ``patterns`` and report duplicates,
+    reusing the manifest (default ``root/.sqlcanon-manifest.json``) for files that did
+    not change. The manifest is rewritten at the end of a scan that changed it.
+    """
+    root = Path(root)
+    cfg = cfg or Config()
+    canon = canonicalizer or Canonicalizer()
+    manifest_path = Path(manifest) if manifest is not None else root / MANIFEST_NAME
+    fingerprint = _fingerprint(cfg, canon)
+    old_files, old_contents = _load_manifest(manifest_path, fingerprint)
+
+    stats, walk_errors = _walk(root, patterns)
+    files: dict[str, list] = {}
+    stale: list[str] = []
+    for rel, st in stats.items():
+        entry = old_files.get(rel)
+        if entry is not None and entry[:2] == [st.st_mtime_ns, st.st_size] and entry[2] in old_contents:
+            files[rel] = entry
+        else:
+            stale.append(rel)
+
+    removed = len(old_files.keys() - stats.keys())
+    result = ScanResult(files={}, duplicates=[], removed=removed, errors=walk_errors)
+    contents = {files[rel][2]: old_contents[files[rel][2]] for rel in files}
+    todo: dict[str, str] = {}  # content hash -> text, for contents never canonicalised
+    if stale:
+        with ThreadPoolExecutor(max_workers) as pool:
+            reads = list(zip(stale, pool.map(lambda rel: _read(root / rel), stale)))
+        failed = 0
+        for rel, outcome in reads:
+            if isinstance(outcome, OSError):
+                result.errors[rel] = str(outcome)
+                failed += 1
+                continue
+            digest, text = outcome
+            st = stats[rel]
+            files[rel] = [st.st_mtime_ns, st.st_size, digest]
+            if digest in old_contents:
+                contents[digest] = old_contents[digest]
+            elif digest not in contents:
+                todo[digest] = text
+        result.read = len(reads) - failed
+
+    if todo:
+        digests = list(todo)
+        texts = [todo[d] for d in digests]
+        if max_workers and max_workers > 1 and len(texts) >= PARALLEL_MIN_FILES:
+            size = -(-len(texts) // (max_workers * 4))
+            chunks = [texts[i : i + size] for i in range(0, len(texts), size)]
+            with ProcessPoolExecutor(max_workers) as procs:
+                parts = procs.map(_canonicalise_chunk, [canon] * len(chunks), [cfg] * len(chunks), chunks)
+                hashes = [h for part in parts for h in part]
+        else:
+            hashes = _canonicalise_chunk(canon, cfg, texts)
+        contents.update(zip(digests, hashes))
+        result.canonicalised = len(digests)
+
+    if stale or result.removed or contents.keys() != old_contents.keys():
+        _save_manifest(manifest_path, fingerprint, files, contents)
+
+    groups: dict[str, list[str]] = {}
+    for rel in sorted(files):
+        canonical = contents[files[rel][2]]
+        result.files[rel] = canonical
+        groups.setdefault(canonical, []).append(rel)
+    result.duplicates = sorted((g for g in groups.values() if len(g) > 1), key=lambda g: (-len(g), g))
+    return result
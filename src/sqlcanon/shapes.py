@@ -0,0 +1,273 @@
+"""
+Shape registry: interns canonical forms to compact, stable integer IDs.
+
+A shape's ID is derived from the SHA-256 of its canonical text (63 bits, so it fits a
+signed BIGINT), so every process and node assigns the same ID to the same shape with no
+coordination, and merging registries is a union. Hot paths log the ID; the registry
+keeps the text once.
+
+Registries persist to a single file that is memory-mapped for lookups, so many
+processes can share one without loading it:
+
+    magic  b"SQLCSHP1"
+    count  u64
+    index  count x (id u64, offset u64, length u32), sorted by id
+    texts  UTF-8, concatenated (offsets are relative to the start of this block)
+
+All integers are little-endian. New shapes are kept in memory until ``save()``, which
+rewrites the file atomically (write to a temporary file, then ``os.replace``). Saves
+hold an exclusive lock on a sidecar ``<path>.lock`` file while they merge and replace,
+so concurrent saves from several processes do not drop each other's shapes.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+MAGIC = b"SQLCSHP1"
+_HEADER = struct.Struct("<8sQ")
+_ENTRY = struct.Struct("<QQI")
+
+
+class ShapeCollisionError(ValueError):
+    """Two different canonical forms mapped to the same shape ID."""
+
+
+def shape_id(canonical: str) -> int:
+    """Stable 63-bit ID of a canonical form."""
+    digest = hashlib.sha256(canonical.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
+
+
+class _MappedFile:
+    """Read-only view of a registry file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        st = path.stat()
+        self.stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._mm)
+        magic, self.count = _HEADER.unpack_from(self._mm, 0) if size >= _HEADER.size else (b"", 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path} is not a shape registry file")
+        self._blob = _HEADER.size + self.count * _ENTRY.size
+        if self._blob > size:
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+
+    def _entry(self, i: int) -> tuple[int, int, int]:
+        return _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._blob + offset
+        if start + length > len(self._mm):
+            raise ValueError(f"{self.path} is truncated")
+        return self._mm[start : start + length].decode("utf-8")
+
+    def get(self, sid: int) -> str | None:
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, offset, length = self._entry(mid)
+            if key == sid:
+                return self._text(offset, length)
+            if key < sid:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def items(self) -> Iterator[tuple[int, str]]:
+        for i in range(self.count):
+            key, offset, length = self._entry(i)
+            yield key, self._text(offset, length)
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+@contextmanager
+def _locked(path: Path) -> Iterator[None]:
+    """Hold an exclusive inter-process lock on ``path``'s sidecar lock file."""
+    with open(path.with_name(path.name + ".lock"), "a+b") as f:
+        if sys.platform == "win32":
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _write(path: Path, items: Iterable[tuple[int, str]]) -> None:
+    entries = sorted(items)
+    index = bytearray()
+    blob = bytearray()
+    for sid, text in entries:
+        data = text.encode("utf-8")
+        index += _ENTRY.pack(sid, len(blob), len(data))
+        blob += data
+    fd, tmp = tempfile.mkstemp(prefix=path.name, suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, len(entries)))
+            f.write(index)
+            f.write(blob)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ShapeRegistry:
+    """
+    Interns canonical forms and resolves IDs back to them.
+
+    >>> registry = ShapeRegistry("shapes.bin")
+    >>> sid = registry.intern(canon.normalise(sql))   # log sid instead of the text
+    >>> registry.save()
+    >>> registry[sid]
+
+    Lookups check shapes interned since the last save, then the memory-mapped file.
+    ``refresh()`` remaps the file if another process saved it. Saving merges whatever
+    is on disk first, so shapes saved by another process are not lost. Lookups take no
+    lock: a remap swaps in a new map and leaves the old one to be closed once no reader
+    holds it.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path is not None else None
+        self._pending: dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._file: _MappedFile | None = None
+        if self.path is not None and self.path.exists():
+            self._file = _MappedFile(self.path)
+
+    def _get(self, sid: int) -> str | None:
+        text = self._pending.get(sid)
+        file = self._file
+        if text is None and file is not None:
+            text = file.get(sid)
+        return text
+
+    def intern(self, canonical: str) -> int:
+        sid = shape_id(canonical)
+        known = self._get(sid)
+        if known is None:
+            with self._lock:
+                self._pending.setdefault(sid, canonical)
+        elif known != canonical:
+            raise ShapeCollisionError(f"Shape ID {sid} already maps to a different canonical form")
+        return sid
+
+    def lookup(self, sid: int) -> str | None:
+        return self._get(sid)
+
+    def __getitem__(self, sid: int) -> str:
+        text = self._get(sid)
+        if text is None:
+            raise KeyError(sid)
+        return text
+
+    def __contains__(self, sid: object) -> bool:
+        return isinstance(sid, int) and self._get(sid) is not None
+
+    def items(self) -> Iterator[tuple[int, str]]:
+        """All (ID, canonical form) pairs, saved ones in ID order, then unsaved ones."""
+        pending = dict(self._pending)
+        file = self._file
+        if file is not None:
+            for sid, text in file.items():
+                pending.pop(sid, None)
+                yield sid, text
+        yield from pending.items()
+
+    def __len__(self) -> int:
+        file = self._file
+        if file is None:
+            return len(self._pending)
+        return file.count + sum(1 for sid in list(self._pending) if file.get(sid) is None)
+
+    @property
+    def unsaved(self) -> int:
+        return len(self._pending)
+
+    def merge(self, other: ShapeRegistry | str | Path) -> int:
+        """Add the shapes of another registry (or registry file); return how many were new."""
+        source = other if isinstance(other, ShapeRegistry) else ShapeRegistry(other)
+        added = 0
+        for sid, text in source.items():
+            known = self._get(sid)
+            if known is None:
+                with self._lock:
+                    self._pending[sid] = text
+                added += 1
+            elif known != text:
+                raise ShapeCollisionError(f"Shape ID {sid} maps to different canonical forms")
+        if source is not other:
+            source.close()
+        return added
+
+    def export(self, path: str | Path) -> None:
+        """Write every shape (saved or not) to a registry file, e.g. to ship to another node."""
+        _write(Path(path), self.items())
+
+    def refresh(self) -> bool:
+        """Remap the file if it changed on disk; return whether it did."""
+        if self.path is None or not self.path.exists():
+            return False
+        st = self.path.stat()
+        if self._file is not None and self._file.stamp == (st.st_mtime_ns, st.st_size, st.st_ino):
+            return False
+        file = _MappedFile(self.path)
+        with self._lock:
+            # Not closed here: readers may still hold the old map, which closes when freed
+            self._file = file
+            self._pending = {k: v for k, v in self._pending.items() if file.get(k) is None}
+        return True
+
+    def save(self, path: str | Path | None = None) -> None:
+        """Persist to the registry's own file (or export to ``path``) and map the result."""
+        if path is not None and Path(path) != self.path:
+            self.export(path)
+            return
+        if self.path is None:
+            raise ValueError("No path to save the registry to")
+        with _locked(self.path):
+            self.refresh()  # pick up shapes another process saved meanwhile
+            _write(self.path, self.items())
+            self.refresh()  # maps the new file and drops the pending shapes it now holds
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> ShapeRegistry:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
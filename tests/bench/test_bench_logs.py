@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from sqlcanon.logs import LogReader, canonicalise_records
+
+RECORDS = 5000
+
+_STATEMENTS = [
+    "select * from orders where id in (3, 2, 1) and status = 'new'",
+    "select id, name\nfrom users\nwhere lower(email) = 'a@x.com'",
+    "update t set a = 1 where b = 2",
+]
+
+
+def _postgres_csv(i: int, sql: str) -> str:
+    message = ("duration: 0.5 ms  statement: " + sql).replace('"', '""')
+    return (
+        f'2024-05-01 10:00:00.{i % 1000:03d} UTC,"app","shop",{i},"10.0.0.1:5000",6632a1.1,{i},"SELECT",'
+        f'2024-05-01 09:59:00 UTC,3/{i},0,LOG,00000,"{message}",,,,,,,,,"psql",client backend,,0\n'
+    )
+
+
+def _postgres_json(i: int, sql: str) -> str:
+    return (
+        json.dumps({"timestamp": "2024-05-01 10:00:00 UTC", "pid": i, "message": "statement: " + sql}) + "\n"
+    )
+
+
+def _mysql_slow(i: int, sql: str) -> str:
+    return (
+        f"# Time: 2024-05-01T10:00:00.{i:06d}Z\n# User@Host: app[app] @ web1 [10.0.0.2]  Id: {i}\n"
+        f"# Query_time: 0.5  Lock_time: 0.0 Rows_sent: 1  Rows_examined: 10\n"
+        f"SET timestamp=1714557600;\n{sql};\n"
+    )
+
+
+def _pg_stat_statements(i: int, sql: str) -> str:
+    header = "queryid,calls,total_exec_time,query\n" if i == 0 else ""
+    return header + f'{i},{i % 50},{i * 0.25},"{sql.replace(chr(34), chr(34) * 2)}"\n'
+
+
+WRITERS = {
+    "postgres-csv": _postgres_csv,
+    "postgres-json": _postgres_json,
+    "mysql-slow": _mysql_slow,
+    "pg-stat-statements": _pg_stat_statements,
+}
+
+
+@pytest.mark.parametrize("log_format", list(WRITERS))
+def test_bench_read_log(benchmark, tmp_path, log_format):
+    """Records/s for reading alone: divide RECORDS by the mean."""
+    write = WRITERS[log_format]
+    path = tmp_path / "query.log"
+    path.write_text("".join(write(i, _STATEMENTS[i % len(_STATEMENTS)]) for i in range(RECORDS)))
+
+    def run():
+        return sum(1 for _ in LogReader(path, log_format))
+
+    assert benchmark(run) == RECORDS
+
+
+def test_bench_read_and_canonicalise(benchmark, tmp_path):
+    path = tmp_path / "query.log"
+    path.write_text("".join(_postgres_json(i, _STATEMENTS[i % len(_STATEMENTS)]) for i in range(RECORDS)))
+
+    def run():
+        return sum(len(canonicalise_records(b)) for b in LogReader(path, "postgres-json").batches(1000))
+
+    assert benchmark(run) == RECORDS
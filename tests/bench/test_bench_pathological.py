@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+from time import perf_counter
+
+import pytest
+
+from sqlcanon import Canonicalizer, Config
+
+# Machine-generated shapes that used to hit slow paths: long unterminated strings, unclosed
+# IN lists, deep parentheses, very long AND chains and Postgres dollar-quote openers that
+# are never closed.
+PATHOLOGICAL = {
+    "unterminated_string": lambda n: "select * from t where a = '" + "x" * n,
+    "many_quotes": lambda n: "select " + "x'" * (n // 2),
+    "unclosed_in_list": lambda n: "select * from t where a in (" + "1, " * (n // 3),
+    "deep_parens": lambda n: "select * from t where " + "(" * (n // 2) + "a=1" + ")" * (n // 2),
+    "long_and_chain": lambda n: "select * from t where " + " and ".join(f"c{i}={i}" for i in range(n // 10)),
+    "big_in_list": lambda n: "select * from t where a in (" + ", ".join("'x'" for _ in range(n // 5)) + ")",
+    "unclosed_dollar_quotes": lambda n: "select " + " ".join(f"$t{i}$" for i in range(n // 8)),
+}
+
+# Shapes that only bite under a particular dialect's lexer table
+DIALECT = {"unclosed_dollar_quotes": "postgres"}
+
+
+def _config(shape: str, **kwargs) -> Config:
+    return Config(dialect=DIALECT.get(shape, "ansi"), **kwargs)
+
+
+def _best_of(c: Canonicalizer, sql: str, cfg: Config, runs: int = 3) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = perf_counter()
+        c.normalise(sql, cfg)
+        best = min(best, perf_counter() - t0)
+    return best
+
+
+@pytest.mark.parametrize("shape", sorted(PATHOLOGICAL))
+def test_bench_pathological_default(benchmark, shape: str):
+    c = Canonicalizer()
+    sql = PATHOLOGICAL[shape](50_000)
+    benchmark(c.normalise, sql, _config(shape))
+
+
+@pytest.mark.skipif(
+    not os.environ.get("SQLCANON_TIMING_TESTS"),
+    reason="wall-clock ratios flake on loaded machines; set SQLCANON_TIMING_TESTS=1 to run",
+)
+@pytest.mark.parametrize("shape", sorted(PATHOLOGICAL))
+def test_pathological_scales_linearly(shape: str):
+    c = Canonicalizer()
+    cfg = _config(shape)
+    small = _best_of(c, PATHOLOGICAL[shape](25_000), cfg)
+    large = _best_of(c, PATHOLOGICAL[shape](100_000), cfg)
+    # 4x the input should cost ~4x; quadratic behaviour would be ~16x
+    assert large < small * 10, f"{shape}: {small * 1000:.1f} ms -> {large * 1000:.1f} ms"
+
+
+def test_bench_pathological_size_budget(benchmark):
+    c = Canonicalizer()
+    cfg = Config(max_statement_length=10_000)
+    sql = PATHOLOGICAL["unclosed_in_list"](100_000)
+    benchmark(c.normalise, sql, cfg)
@@ -0,0 +1 @@
+SELECT a FROM t /* user __NUM__ email='__STR__' */ WHERE b = __NUM__ -- id=__NUM__
\ No newline at end of file
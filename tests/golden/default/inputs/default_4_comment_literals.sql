@@ -0,0 +1 @@
+SELECT a FROM t /* user 12345 email='bob@x.com' */ WHERE b = 1 -- id=42
\ No newline at end of file
@@ -5,7 +5,10 @@ import re
 from hypothesis import given
 from hypothesis import strategies as st
 
-from sqlcanon import Canonicalizer, Config
+from sqlcanon import Canonicalizer, Config, bind_params
+from sqlcanon.incremental import CanonicalDocument
+from sqlcanon.parsing.tokenizer import compile_scanner
+from sqlcanon.protocols import AstNode
 
 
 def _norm(c: Canonicalizer, sql: str, cfg: Config | None = None) -> str:
@@ -77,6 +80,20 @@ def _select_query() -> st.SearchStrategy[str]:
     )
 
 
+def _commented_query() -> st.SearchStrategy[str]:
+    # Optimizer hints, plain comments and sqlcommenter tags, whose bodies hold literals
+    hint = st.sampled_from(["", "/*+ SET_VAR(sort_buffer_size=16) */ ", "/*+ set(work_mem '64MB') */ "])
+    note = st.sampled_from(["", " -- and 5 in (2, 1)\n", " /* user 42 'x' */ "])
+    tags = st.sampled_from(["", " /*route='%2Fusers',traceparent='00-ab-cd-01'*/", "/*id='7'*/"])
+
+    def build(h: str, q: str, n: str, t: str) -> str:
+        # hint after the first keyword, note before WHERE, tags at the end
+        q = q.replace(" ", " " + h, 1)
+        return re.sub(r"(?i)\s+where\b", lambda m: n + m.group(), q, count=1) + t
+
+    return st.builds(build, hint, _select_query(), note, tags)
+
+
 def _upper_only_keywords(sql: str) -> str:
     # Upper-case only SQL keywords; leave identifiers & literals alone.
     KW = r"\b(select|from|where|and|or|in|group|by|order|limit|join|on|as)\b"
@@ -118,3 +135,53 @@ def test_in_list_sorted_for_exec_profile(nums):
     got = [x.strip() for x in m.group(1).split(",") if x.strip()]
     want = [str(x) for x in sorted(nums)]
     assert got == want
+
+
+@given(_select_query())
+def test_parameterise_bind_roundtrip(query: str):
+    c = Canonicalizer()
+    template, params = c.parameterise(query)
+    assert template == _norm(c, query)
+    # binding and re-extracting gives back the same template and values in the same order
+    template2, params2 = c.parameterise(bind_params(template, params))
+    assert template2 == template
+    assert [p.text for p in params2] == [p.text for p in params]
+
+
+@given(
+    _commented_query(),
+    st.permutations(["case_keywords", "normalise_literals", "normalise_whitespace", "sort_in_list"]),
+)
+def test_fused_pipeline_matches_sequential(query: str, names: list[str]):
+    # Reference without FusedStage: each token-local pass is a plain re.sub of its own kinds
+    c = Canonicalizer()
+    cfg = Config(passes=[*names, "normalise_predicates"])
+    text, tags = query, {}
+    for p in c._build_pipeline(cfg.passes or []):
+        if not p.token_local:
+            text = p.apply(AstNode(text, tags=tags), cfg).text
+            continue
+
+        def rewrite(m: re.Match, p=p, ast=AstNode(text, tags=tags)) -> str:
+            if m.lastgroup not in p.token_kinds:  # always-matched kinds pass through
+                return m.group()
+            return p.rewrite_token(m.lastgroup, m.group(), m.start(), cfg, ast)[1]
+
+        text = p.finish_text(compile_scanner(p.token_kinds, cfg.dialect).sub(rewrite, text), cfg)
+    assert c.normalise_with_tags(query, cfg) == (text, tags)
+
+
+_DOC_PIECES = st.sampled_from([";", " ", "\n", "'", '"', "x;y", "--c;\n", "/*", "*/", " and b=2", " in(1)"])
+
+
+@given(
+    st.lists(_select_query(), min_size=1, max_size=4).map("; ".join),
+    st.lists(st.tuples(st.floats(0, 1), st.integers(0, 6), st.lists(_DOC_PIECES, max_size=3)), max_size=6),
+)
+def test_incremental_edits_match_full_recanonicalisation(text: str, edits):
+    doc = CanonicalDocument(text)
+    for where, deleted, pieces in edits:
+        offset = int(where * len(doc.text))
+        doc = doc.edit(offset, min(deleted, len(doc.text) - offset), "".join(pieces))
+        fresh = CanonicalDocument(doc.text)
+        assert doc.statements == fresh.statements
@@ -0,0 +1,93 @@
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+import sqlcanon
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.config.loader import ConfigError, load_config_file
+from sqlcanon.core.engine import FusedStage
+
+Q = "select * from t where b=1 and a in (3,2,1) and c='x'"
+
+
+def test_budget_size_limit_degrades_to_token_passes():
+    c = Canonicalizer()
+    out = c.normalise(Q, Config(max_statement_length=10))
+    # keywords folded and literals scrubbed, but no IN/AND reordering
+    assert out == "SELECT * FROM t WHERE b=__NUM__ AND a IN (__NUM__,__NUM__,__NUM__) AND c='__STR__'"
+
+
+def test_budget_size_limit_not_reached():
+    c = Canonicalizer()
+    assert c.normalise(Q, Config(max_statement_length=len(Q))) == c.normalise(Q)
+
+
+def test_budget_exec_profile_degrades_without_scrubbing():
+    c = Canonicalizer()
+    cfg = Config(passes=["case_keywords", "sort_in_list", "normalise_predicates"], max_statement_length=10)
+    assert c.normalise(Q, cfg) == "SELECT * FROM t WHERE b=1 AND a IN (3,2,1) AND c='x'"
+
+
+def test_budget_time_overrun_degrades():
+    c = Canonicalizer()
+    out = c.normalise(Q, Config(time_budget_ms=1e-9))
+    assert out == c.normalise(Q, Config(max_statement_length=10))
+
+
+def test_budget_time_generous_matches_full_pipeline():
+    c = Canonicalizer()
+    assert c.normalise(Q, Config(time_budget_ms=60_000)) == c.normalise(Q)
+
+
+def test_budget_degraded_parameterise_keeps_source_order():
+    c = Canonicalizer()
+    template, params = c.parameterise(Q, Config(time_budget_ms=1e-9))
+    assert template.count("__NUM__") == 4
+    assert [p.text for p in params] == ["1", "3", "2", "1", "'x'"]
+
+
+def test_budget_time_overrun_keeps_work_done(monkeypatch: pytest.MonkeyPatch):
+    c = Canonicalizer()
+    clock = iter([0.0, 1.0, 1.0])  # over budget once the token scan is done
+    monkeypatch.setattr(sqlcanon, "perf_counter", lambda: next(clock))
+    scans = []
+    apply = FusedStage.apply
+    monkeypatch.setattr(FusedStage, "apply", lambda self, *a: scans.append(1) or apply(self, *a))
+    out = c.normalise(Q, Config(time_budget_ms=1))
+    assert out == "SELECT * FROM t WHERE b=__NUM__ AND a IN (__NUM__,__NUM__,__NUM__) AND c='__STR__'"
+    assert len(scans) == 1
+
+
+@pytest.mark.parametrize("cfg", [{"max_statement_length": 1000}, {"time_budget_ms": 1}])
+def test_budget_bounds_pathological_postgres_input(cfg: dict):
+    c = Canonicalizer()
+    sql = "select " + " ".join(f"$t{i}$" for i in range(8000))  # ~63 KB of unclosed dollar quotes
+    t0 = perf_counter()
+    out = c.normalise(sql, Config(dialect="postgres", **cfg))
+    assert perf_counter() - t0 < 0.5
+    assert out == "SELECT '__STR__'"
+
+
+def test_predicates_keep_escaped_quotes_intact():
+    c = Canonicalizer(passes=["normalise_predicates"])
+    out = c.normalise("select * from t where b='it''s' and a=1")
+    assert out == "select * from t where a=1 AND b='it''s'"
+
+
+def test_load_config_budget_keys(tmp_path: Path):
+    p = tmp_path / "budget.toml"
+    p.write_text("max_statement_length = 100000\ntime_budget_ms = 2.5\n", encoding="utf-8")
+    cfg = load_config_file(p)
+    assert cfg.max_statement_length == 100000
+    assert cfg.time_budget_ms == 2.5
+
+
+@pytest.mark.parametrize(
+    "body", ["max_statement_length = 0", "max_statement_length = 1.5", "time_budget_ms = -1"]
+)
+def test_load_config_budget_bad_values(tmp_path: Path, body: str):
+    p = tmp_path / "bad.toml"
+    p.write_text(body + "\n", encoding="utf-8")
+    with pytest.raises(ConfigError):
+        load_config_file(p)
@@ -0,0 +1,240 @@
+import asyncio
+import threading
+
+import pytest
+
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.cache import AsyncResultCache, MemoryBackend, ResultCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRemoteBackend:
+    """Stand-in for an external store (e.g. Redis): async methods, records every call."""
+
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+
+    async def get(self, key):
+        self.calls.append(("get", key))
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl=None):
+        self.calls.append(("set", key, ttl))
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.calls.append(("delete", key))
+        self.data.pop(key, None)
+
+
+def test_equivalent_statements_share_a_result_but_literals_do_not():
+    cache = ResultCache()
+    runs = []
+
+    def run(tag):
+        return lambda: runs.append(tag) or [tag]
+
+    assert cache.get_or_compute("select a from t where b=1 and a in (3,2,1)", None, run("x")) == ["x"]
+    assert cache.get_or_compute("SELECT a FROM t WHERE a IN (1,2,3) AND b=1", None, run("y")) == ["x"]
+    assert cache.get_or_compute("select a from t where b=2 and a in (3,2,1)", None, run("z")) == ["z"]
+    assert runs == ["x", "z"]
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    q = "select a from t where b=1"
+    assert cache.key(q) == Canonicalizer().hash(q, cache.cfg)
+
+
+def test_key_includes_params_and_keeps_positional_order():
+    cache = ResultCache()
+    assert cache.key("select * from t where a = :a and b = :b", {"a": 1, "b": 2}) == cache.key(
+        "select * from t where b = :b and a = :a", {"b": 2, "a": 1}
+    )
+    assert cache.key("select * from t where a = ?", (1,)) != cache.key("select * from t where a = ?", (2,))
+    # positional: swapping the predicates changes which value binds to which column
+    assert cache.key("select * from t where b = ? and a = ?", (1, 2)) != cache.key(
+        "select * from t where a = ? and b = ?", (1, 2)
+    )
+    assert cache.key("SELECT * FROM t WHERE a = ?", [1]) == cache.key("select * from t where a = ?", (1,))
+
+
+def test_rejects_literal_scrubbing_profile():
+    with pytest.raises(ValueError, match="normalise_literals"):
+        ResultCache(cfg=Config(passes=["normalize_literals"]))
+    with pytest.raises(ValueError):
+        ResultCache(cfg=Config())  # default passes scrub literals
+
+
+def test_memory_backend_ttl_and_lru():
+    clock = Clock()
+    backend = MemoryBackend(maxsize=2, clock=clock)
+    cache = ResultCache(backend, ttl=10)
+    cache.get_or_compute("select 1", None, lambda: "one")
+    clock.now = 11
+    assert cache.get_or_compute("select 1", None, lambda: "again") == "again"
+    backend.set("a", 1)
+    backend.set("b", 2)
+    assert backend.get("select 1") is None and backend.evictions == 1
+    assert len(backend) == 2
+    cache.invalidate("select 1")
+    backend.delete("a")
+    assert backend.get("a") is None and backend.get("b") == 2
+    backend.clear()
+    assert len(backend) == 0
+    with pytest.raises(ValueError):
+        MemoryBackend(0)
+
+
+def test_none_results_are_not_cached():
+    cache = ResultCache()
+    assert cache.get_or_compute("select 1", None, lambda: None) is None
+    assert cache.get_or_compute("select 1", None, lambda: 5) == 5
+
+
+def test_concurrent_threads_coalesce_into_one_computation():
+    cache = ResultCache()
+    release = threading.Event()
+    runs = []
+
+    def compute():
+        runs.append(1)
+        release.wait(5)
+        return "rows"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda q=q: results.append(cache.get_or_compute(q, None, compute)))
+        for q in ["select a from t where x=1 and y=2", "select a from t where y=2 and x=1"] * 4
+    ]
+    for t in threads:
+        t.start()
+    while cache.stats.misses + cache.stats.coalesced < len(threads):
+        pass
+    release.set()
+    for t in threads:
+        t.join()
+    assert results == ["rows"] * 8 and runs == [1]
+    assert (cache.stats.misses, cache.stats.coalesced) == (1, 7)
+    assert cache.stats.hit_rate == pytest.approx(7 / 8)
+
+
+def test_thread_followers_see_the_leaders_exception():
+    cache = ResultCache()
+    started, release = threading.Event(), threading.Event()
+    errors = []
+
+    def boom():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("db down")
+
+    def call():
+        try:
+            cache.get_or_compute("select 1", None, boom)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    while cache.stats.coalesced < 1:
+        pass
+    release.set()
+    leader.join()
+    follower.join()
+    assert errors == ["db down", "db down"]
+    assert cache.stats.errors == 1
+
+
+def test_async_tasks_coalesce_with_async_backend():
+    backend = FakeRemoteBackend()
+    cache = AsyncResultCache(backend, ttl=5)
+    runs = []
+
+    async def compute():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return ["row"]
+
+    async def main():
+        qs = ["select * from t where a in (1,2)", "select * from t where a in (2,1)"] * 3
+        out = await asyncio.gather(*(cache.get_or_compute(q, None, compute) for q in qs))
+        again = await cache.get_or_compute("SELECT * FROM t WHERE a IN (2, 1)", None, compute)
+        await cache.invalidate(qs[0])
+        return out, again
+
+    out, again = asyncio.run(main())
+    assert out == [["row"]] * 6 and again == ["row"] and runs == [1]
+    assert (cache.stats.misses, cache.stats.coalesced, cache.stats.hits) == (1, 5, 1)
+    assert [c[0] for c in backend.calls].count("set") == 1 and backend.data == {}
+    assert ("set", cache.key("select * from t where a in (1,2)"), 5) in backend.calls
+
+
+def test_async_failures_and_cancellation_propagate():
+    cache = AsyncResultCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise KeyError("x")
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def main():
+        res = await asyncio.gather(
+            *(cache.get_or_compute("select 1", None, fail) for _ in range(3)), return_exceptions=True
+        )
+        task = asyncio.ensure_future(cache.get_or_compute("select 2", None, slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_compute("select 2", None, slow))
+        await asyncio.sleep(0)
+        follower.cancel()  # a cancelled waiter leaves the computation running
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        assert not task.done()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return res
+
+    res = asyncio.run(main())
+    assert all(isinstance(r, KeyError) for r in res)
+    assert cache.stats.errors == 1 and cache.stats.coalesced == 3
+    assert cache._flights == {}
+
+
+def test_async_waiters_take_over_from_a_cancelled_leader():
+    cache = AsyncResultCache()
+    calls = []
+
+    async def compute(delay, value):
+        calls.append(value)
+        await asyncio.sleep(delay)
+        return value
+
+    async def main():
+        leader = asyncio.ensure_future(cache.get_or_compute("select 3", None, lambda: compute(10, "a")))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(cache.get_or_compute("select 3", None, lambda v=v: compute(0.01, v)))
+            for v in ("b", "c")
+        ]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*waiters)
+
+    # the first waiter back computes, the second coalesces onto it
+    assert asyncio.run(main()) == ["b", "b"]
+    assert calls == ["a", "b"]
+    assert (cache.stats.misses, cache.stats.coalesced) == (2, 1)
+    assert cache._flights == {}
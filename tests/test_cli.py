@@ -1,6 +1,9 @@
+import json
+
 from typer.testing import CliRunner
 
 from sqlcanon.cli.main import app
+from sqlcanon.novelty import NoveltyDetector
 
 runner = CliRunner()
 
@@ -21,3 +24,52 @@ def test_cli_keyword_case_bad_value():
     res = runner.invoke(app, ["normalise", "-k", "Mixed", "select 1"])
     assert res.exit_code != 0
     assert "keyword-case must be 'upper' or 'lower'" in (res.stdout + res.stderr)
+
+
+def test_cli_novel_streams_only_new_shapes(tmp_path):
+    state = tmp_path / "novelty.bin"
+    stream = "select 1\nselect 2\n\nselect a from t\n"
+    res = runner.invoke(app, ["novel", "--state", str(state)], input=stream)
+    assert res.exit_code == 0
+    assert res.stdout.splitlines() == ["SELECT __NUM__", "SELECT a FROM t"]
+    res = runner.invoke(app, ["novel", "-s", str(state), "--show-hash"], input="select 3\nselect b from t\n")
+    assert res.exit_code == 0
+    [line] = res.stdout.splitlines()
+    assert line.endswith("\tSELECT b FROM t") and len(line.split("\t")[0]) == 16
+
+
+def test_cli_novel_saves_state_periodically(tmp_path, monkeypatch):
+    saves = []
+    monkeypatch.setattr(NoveltyDetector, "save", lambda self, path: saves.append(path))
+    state = tmp_path / "novelty.bin"
+    res = runner.invoke(app, ["novel", "-s", str(state), "--save-every", "0"], input="select 1\nselect 2\n")
+    assert res.exit_code == 0
+    assert len(saves) == 3  # after each statement, then on exit
+
+
+def test_cli_scan_reports_duplicates(tmp_path):
+    (tmp_path / "a.sql").write_text("select a from t where b = 1")
+    (tmp_path / "b.sql").write_text("SELECT a FROM t WHERE b = 2")
+    res = runner.invoke(app, ["scan", str(tmp_path), "--fail-on-duplicates"])
+    assert res.exit_code == 1
+    assert "2 read, 2 canonicalised" in res.stdout and "  a.sql\n  b.sql" in res.stdout
+    res = runner.invoke(app, ["scan", str(tmp_path), "--json"])
+    assert res.exit_code == 0
+    assert '"canonicalised": 0' in res.stdout
+
+
+def test_cli_logs_prints_json_lines_and_checkpoints(tmp_path):
+    log = tmp_path / "slow.log"
+    log.write_text("# Query_time: 0.5\nselect * from t where a in (2, 1);\n# Query_time: 0.1\nselect 1;\n")
+    ckpt = tmp_path / "slow.ckpt"
+    res = runner.invoke(app, ["logs", str(log), "--format", "mysql-slow", "--checkpoint", str(ckpt)])
+    assert res.exit_code == 0
+    first, second = (json.loads(line) for line in res.stdout.splitlines())
+    assert (
+        first["canonical"] == "SELECT * FROM t WHERE a IN (__NUM__, __NUM__)" and first["query_time"] == 0.5
+    )
+    assert second["canonical"] == "SELECT __NUM__"
+    res = runner.invoke(app, ["logs", str(log), "-f", "mysql-slow", "--checkpoint", str(ckpt)])
+    assert res.exit_code == 0 and res.stdout == ""
+    res = runner.invoke(app, ["logs", str(log), "-f", "oracle"])
+    assert res.exit_code != 0
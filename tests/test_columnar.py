@@ -0,0 +1,92 @@
+import pytest
+
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.integrations import columnar
+
+ROWS = [
+    "select * from t where a in (3,1,2)",
+    "select * from t where a in (2,1,3)",
+    None,
+    "select * from t where b = 'x' and a = 1",
+    "select * from t where a in (3,1,2)",
+]
+
+
+def _expected(rows, cfg=None):
+    c = Canonicalizer()
+    return [None if r is None else c.normalise(r, cfg) for r in rows], [
+        None if r is None else c.hash(r, cfg) for r in rows
+    ]
+
+
+def test_canonicalise_unique_dedupes_canonical_forms():
+    codes, canonical, hashes = columnar.canonicalise_unique(ROWS[:2] + ROWS[3:4])
+    assert codes == [0, 0, 1]
+    assert len(canonical) == len(hashes) == 2
+    assert hashes[0] == Canonicalizer().hash(ROWS[0])
+
+
+def test_canonicalise_arrow_matches_row_by_row():
+    pa = pytest.importorskip("pyarrow")
+    out = columnar.canonicalise_arrow(pa.array(ROWS))
+    canonical, hashes = _expected(ROWS)
+    assert out.column("canonical").to_pylist() == canonical
+    assert out.column("hash").to_pylist() == hashes
+    assert pa.types.is_dictionary(out.column("canonical").type)
+    # both equivalent IN-list spellings collapse to one dictionary entry
+    assert len(out.column("canonical").chunk(0).dictionary) == 2
+
+
+def test_canonicalise_arrow_binary_column():
+    pa = pytest.importorskip("pyarrow")
+    raw = [None if r is None else r.encode("utf-8") for r in ROWS]
+    out = columnar.canonicalise_arrow(pa.array(raw, pa.binary()))
+    assert out.column("canonical").to_pylist() == _expected(ROWS)[0]
+
+
+def test_canonicalise_arrow_chunked_and_pre_encoded():
+    pa = pytest.importorskip("pyarrow")
+    cfg = Config(passes=["case_keywords"])
+    chunked = pa.chunked_array([ROWS[:2], ROWS[2:]])
+    out = columnar.canonicalise_arrow(chunked, cfg)
+    assert out.column("canonical").num_chunks == 2
+    assert out.column("canonical").to_pylist() == _expected(ROWS, cfg)[0]
+    encoded = columnar.canonicalise_arrow(pa.array(ROWS).dictionary_encode(), cfg)
+    assert encoded.column("hash").to_pylist() == _expected(ROWS, cfg)[1]
+    assert columnar.canonicalise_arrow(pa.chunked_array([], pa.string())).num_rows == 0
+
+
+def test_canonicalise_arrow_null_in_dictionary():
+    pa = pytest.importorskip("pyarrow")
+    # A null dictionary entry (not a null index) is a null row too
+    values = pa.DictionaryArray.from_arrays(pa.array([0, 1, 1, 0]), pa.array([ROWS[0], None]))
+    out = columnar.canonicalise_arrow(values)
+    assert out.column("canonical").to_pylist() == _expected([ROWS[0], None, None, ROWS[0]])[0]
+
+
+def test_canonicalise_series_matches_row_by_row():
+    pd = pytest.importorskip("pandas")
+    s = pd.Series(ROWS, index=list("abcde"))
+    out = columnar.canonicalise_series(s)
+    canonical, hashes = _expected(ROWS)
+    assert list(out.index) == list("abcde")
+    assert [None if pd.isna(v) else v for v in out["canonical"]] == canonical
+    assert [None if pd.isna(v) else v for v in out["hash"]] == hashes
+    assert len(out["canonical"].cat.categories) == 2
+    cat = columnar.canonicalise_series(s.astype("category"))
+    assert (cat["hash"].cat.codes == out["hash"].cat.codes).all()
+
+
+def test_parallel_workers_match_serial(monkeypatch):
+    monkeypatch.setattr(columnar, "PARALLEL_MIN_UNIQUE", 1)
+    rows = [f"select * from t{i % 7} where a in ({i}, 1)" for i in range(40)]
+    assert columnar.canonicalise_unique(rows, max_workers=2) == columnar.canonicalise_unique(rows)
+
+
+def test_missing_extra_has_install_hint(monkeypatch):
+    def fail(name):
+        raise ImportError(name)
+
+    monkeypatch.setattr(columnar.importlib, "import_module", fail)
+    with pytest.raises(ImportError, match=r"sqlcanon\[arrow\]"):
+        columnar.canonicalise_arrow([])
@@ -0,0 +1,99 @@
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from sqlcanon.config.loader import ConfigError, load_config_cached
+from sqlcanon.config.manager import ConfigManager, build_snapshot
+from sqlcanon.config.model import Config
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _write(p: Path, text: str, bump: int = 0) -> None:
+    p.write_text(text, encoding="utf-8")
+    st = p.stat()
+    # make the change visible even on filesystems with coarse mtimes
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+
+def test_load_config_cached_reuses_until_file_changes(tmp_path: Path):
+    p = tmp_path / "c.toml"
+    _write(p, 'keyword_case = "lower"\n')
+    first = load_config_cached(p)
+    assert load_config_cached(str(p)) is first
+    _write(p, 'keyword_case = "upper"\n', bump=1)
+    second = load_config_cached(p)
+    assert second is not first and second.keyword_case == "upper"
+    with pytest.raises(FileNotFoundError):
+        load_config_cached(tmp_path / "missing.toml")
+
+
+def test_manager_hot_reloads_and_keeps_old_snapshot_for_in_flight(tmp_path: Path):
+    p = tmp_path / "c.toml"
+    _write(p, 'passes = ["case_keywords"]\n')
+    clock = Clock()
+    manager = ConfigManager(p, check_interval=5, clock=clock)
+    old = manager.current()
+    assert old.normalise("select * from t where a in (2,1)") == "SELECT * FROM t WHERE a IN (2,1)"
+
+    _write(p, 'passes = ["case_keywords", "sort_in_list"]\nkeyword_case = "lower"\n', bump=1)
+    assert manager.current() is old  # not due for a check yet
+    clock.now = 5
+    new = manager.current()
+    assert new is not old and manager.reloads == 1
+    assert manager.normalise("SELECT * FROM t WHERE a IN (2,1)") == "select * from t where a IN (1, 2)"
+    # a request that grabbed the old snapshot finishes on the old pipeline
+    assert old.normalise("select * from t where a in (2,1)") == "SELECT * FROM t WHERE a IN (2,1)"
+    assert manager.hash("select 1") == new.canonicalizer.hash("select 1", new.cfg)
+
+
+def test_manager_keeps_last_good_config_on_bad_reload(tmp_path: Path):
+    p = tmp_path / "c.toml"
+    _write(p, 'keyword_case = "lower"\n')
+    clock = Clock()
+    manager = ConfigManager(p, check_interval=0, clock=clock, overrides={"keyword_case": "upper"})
+    good = manager.current()
+    assert good.cfg.keyword_case == "upper"
+
+    _write(p, "bogus = 1\n", bump=1)
+    assert manager.current() is good
+    assert isinstance(manager.last_error, ConfigError)
+    with pytest.raises(ConfigError):
+        manager.reload()
+
+    p.unlink()
+    assert manager.cfg is good.cfg
+    assert isinstance(manager.last_error, FileNotFoundError)
+
+
+def test_snapshot_precompiles_pipelines_and_swaps_atomically(tmp_path: Path):
+    snap = build_snapshot(Config(passes=["normalise_whitespace", "case_keywords"], dialect="mysql"))
+    assert snap.canonicalizer._pipelines  # compiled before first use
+    assert snap.normalise("select 1 # c\n") == "SELECT 1"
+
+    p = tmp_path / "c.toml"
+    _write(p, 'keyword_case = "lower"\n')
+    manager = ConfigManager(p, check_interval=0)
+    seen = set()
+
+    def reader():
+        for _ in range(200):
+            seen.add(manager.current().cfg.keyword_case)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(1, 6):
+        _write(p, f'keyword_case = "{"upper" if i % 2 else "lower"}"\n', bump=i)
+        manager.reload()
+    for t in threads:
+        t.join()
+    assert seen <= {"upper", "lower"} and manager.last_error is None
@@ -0,0 +1,79 @@
+from pathlib import Path
+
+import pytest
+
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.config.loader import ConfigError, load_config_file
+from sqlcanon.parsing.dialects import get_dialect
+from sqlcanon.parsing.tokenizer import compile_scanner
+
+
+def _norm(sql: str, dialect: str, passes: list[str] | None = None) -> str:
+    return Canonicalizer().normalise(sql, Config(dialect=dialect, passes=passes))
+
+
+def test_ansi_quoted_identifiers_and_placeholders_untouched():
+    q = 'select "from", "col 1" from t where a = :id and b = ? and c = 5'
+    assert _norm(q, "ansi") == 'SELECT "from", "col 1" FROM t WHERE a = :id AND b = ? AND c = __NUM__'
+
+
+def test_postgres_dollar_quotes_escape_strings_and_positional_params():
+    q = "select $$it's 12$$, $fn$ select 1 $fn$, E'a\\'b' from t where a = $1 and b::int = 2"
+    out = _norm(q, "postgres", ["case_keywords", "normalise_literals"])
+    assert out == "SELECT '__STR__', '__STR__', '__STR__' FROM t WHERE a = $1 AND b::int = __NUM__"
+
+
+def test_postgres_unterminated_dollar_quote_runs_to_end_and_needs_a_boundary():
+    out = _norm("select a$b$c, $x$ 1 from t where $y$ 2", "postgres", ["normalise_literals"])
+    assert out == "select a$b$c, '__STR__'"
+    c = Canonicalizer()
+    _, params = c.parameterise("select $t$it's", Config(dialect="postgres"))
+    assert [p.value for p in params] == ["it's"]
+
+
+def test_mysql_backticks_double_quoted_strings_and_hash_comments():
+    q = "select `order`, \"a 'b' 1\" from t where a = 'it\\'s' and b = %s # 5"
+    out = _norm(q, "mysql", ["case_keywords", "normalise_literals"])
+    assert out == "SELECT `order`, '__STR__' FROM t WHERE a = '__STR__' AND b = %s # __NUM__"
+
+
+def test_tsql_brackets_unicode_strings_and_at_params():
+    q = "select top 5 [select], N'x' from t where a = @p1 and b = @@rowcount"
+    out = _norm(q, "tsql", ["case_keywords", "normalise_literals"])
+    assert out == "SELECT TOP __NUM__ [select], '__STR__' FROM t WHERE a = @p1 AND b = @@rowcount"
+
+
+def test_sqlite_numbered_and_named_placeholders():
+    q = "select [from] from t where a = ?1 and b = :n and c = @x and d = $y and e = 2"
+    out = _norm(q, "sqlite", ["case_keywords", "normalise_literals"])
+    assert out == "SELECT [from] FROM t WHERE a = ?1 AND b = :n AND c = @x AND d = $y AND e = __NUM__"
+
+
+def test_dialect_quoting_respected_by_in_list_and_predicates():
+    q = "select * from t where b = $$x and y$$ and a in ($$b,c$$, $$a$$)"
+    out = _norm(q, "postgres", ["sort_in_list", "normalise_predicates"])
+    assert out == "select * from t where a IN ($$a$$, $$b,c$$) AND b = $$x and y$$"
+
+
+def test_dialect_literal_values_decoded():
+    c = Canonicalizer()
+    _, params = c.parameterise("select N'a''b', [q]]] from t", Config(dialect="tsql"))
+    assert [p.value for p in params] == ["a'b"]
+    _, params = c.parameterise("select $t$it's$t$, E'x' from t", Config(dialect="postgres"))
+    assert [p.value for p in params] == ["it's", "x"]
+
+
+def test_dialect_aliases_and_tables_are_cached():
+    assert get_dialect("PostgreSQL") is get_dialect("postgres")
+    assert compile_scanner({"num"}, "mssql") is compile_scanner({"num"}, "mssql")
+    with pytest.raises(KeyError):
+        get_dialect("oracle-ish")
+
+
+def test_load_config_dialect(tmp_path: Path):
+    p = tmp_path / "d.toml"
+    p.write_text('dialect = "mysql"\n', encoding="utf-8")
+    assert load_config_file(p).dialect == "mysql"
+    p.write_text('dialect = "nope"\n', encoding="utf-8")
+    with pytest.raises(ConfigError):
+        load_config_file(p)
@@ -0,0 +1,126 @@
+from pathlib import Path
+
+import pytest
+
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.core.engine import (
+    ALL_FEATURES,
+    FusedStage,
+    compile_pipeline,
+    feature_mask,
+    run_stages,
+    statement_features,
+)
+from sqlcanon.parsing.tokenizer import compile_scanner
+from sqlcanon.protocols import AstNode
+
+GOLDEN = Path(__file__).parent / "golden"
+
+
+def _sequential(c: Canonicalizer, sql: str, names: list[str], cfg: Config | None = None) -> str:
+    """
+    Reference: each pass on its own over the whole text, a token-local one as a plain
+    ``re.sub`` with a scanner for its own token kinds. No ``FusedStage`` (so no shared
+    scan, memo or trigger skipping) is involved.
+    """
+    return _sequential_with_tags(c, sql, names, cfg)[0]
+
+
+def _sequential_with_tags(
+    c: Canonicalizer, sql: str, names: list[str], cfg: Config | None = None
+) -> tuple[str, dict[str, str]]:
+    cfg = cfg or Config()
+    text, tags = sql, {}
+    for p in c._build_pipeline(names):
+        if not p.token_local:
+            text = p.apply(AstNode(text, tags=tags), cfg).text
+            continue
+        if not p.enabled(cfg):
+            continue
+
+        def rewrite(m, p=p, ast=AstNode(text, tags=tags)):
+            if m.lastgroup not in p.token_kinds:  # always-matched kinds pass through
+                return m.group()
+            return p.rewrite_token(m.lastgroup, m.group(), m.start(), cfg, ast)[1]
+
+        text = p.finish_text(compile_scanner(p.token_kinds, cfg.dialect).sub(rewrite, text), cfg)
+    return text, tags
+
+
+def test_compile_pipeline_fuses_token_local_runs():
+    c = Canonicalizer()
+    stages = compile_pipeline(
+        c._build_pipeline(["case_keywords", "normalise_literals", "sort_in_list", "normalise_predicates"])
+    )
+    assert isinstance(stages[0], FusedStage)
+    assert stages[0].name == "case_keywords+normalize_literals"
+    assert [s.name for s in stages[1:]] == ["sort_in_list", "normalise_predicates"]
+
+
+def test_compile_pipeline_keeps_single_token_pass_unfused():
+    c = Canonicalizer()
+    stages = compile_pipeline(c._build_pipeline(["case_keywords", "sort_in_list", "normalise_literals"]))
+    assert [s.name for s in stages] == ["case_keywords", "sort_in_list", "normalize_literals"]
+
+
+@pytest.mark.parametrize("in_path", sorted(GOLDEN.glob("*/inputs/*.sql")), ids=lambda p: p.name)
+def test_fused_matches_sequential_on_golden_inputs(in_path: Path):
+    c = Canonicalizer()
+    names = ["case_keywords", "normalise_literals", "sort_in_list", "normalise_predicates"]
+    sql = in_path.read_text(encoding="utf-8")
+    assert c.normalise(sql) == _sequential(c, sql, names)
+
+
+def test_fused_leaves_string_contents_alone():
+    c = Canonicalizer(passes=["normalise_literals", "case_keywords"])
+    q = "select 'select 1' from t where a1 = 1.5 and b in (x2, 3)"
+    out = c.normalise(q)
+    assert out == "SELECT '__STR__' FROM t WHERE a1 = __NUM__ AND b IN (x2, __NUM__)"
+    assert out == _sequential(c, q, ["normalise_literals", "case_keywords"])
+
+
+@pytest.mark.parametrize(
+    "names",
+    [
+        ["normalise_whitespace", "normalise_literals"],
+        ["normalise_whitespace", "sort_in_list", "normalise_literals"],
+        ["normalise_literals", "case_keywords", "normalise_whitespace"],
+        ["normalise_literals", "sort_in_list", "normalise_whitespace"],
+    ],
+)
+def test_fused_matches_sequential_on_comments_and_hints(names: list[str]):
+    c = Canonicalizer()
+    q = "select /*+ SET_VAR(sort_buffer_size=16) */ a -- where 2\nfrom t /*route='%2Fusers',id='7'*/"
+    assert c.normalise_with_tags(q, Config(passes=names)) == _sequential_with_tags(c, q, names)
+
+
+def test_fused_stage_skips_disabled_passes():
+    c = Canonicalizer()
+    stage = compile_pipeline(c._build_pipeline(["case_keywords", "normalise_identifiers"]))[0]
+    q = "select A from T where x = 'Y'"
+    assert stage.apply(AstNode(q), Config()).text == "SELECT A FROM T WHERE x = 'Y'"
+    cfg = Config(identifier_case="lower")
+    assert stage.apply(AstNode(q), cfg).text == "SELECT a FROM t WHERE x = 'Y'"
+    assert c.normalise(q, cfg) == "SELECT a FROM t WHERE x = '__STR__'"
+
+
+def test_statement_features_bitmap():
+    assert statement_features("SELECT a FROM t WHERE a IN (1, 2) AND b = 'x'") == ALL_FEATURES
+    orm = statement_features("SELECT t.id FROM t WHERE t.email = %s")
+    assert orm == feature_mask(frozenset({"where"}))
+    with pytest.raises(KeyError):
+        feature_mask(frozenset({"nope"}))
+
+
+def test_passes_skipped_when_triggers_absent(monkeypatch: pytest.MonkeyPatch):
+    c = Canonicalizer()
+    stages = c._compiled_pipeline(c._default_pass_names)
+    assert stages[0].triggers == frozenset()
+    calls = []
+    for stage in stages[1:]:
+        monkeypatch.setattr(stage, "apply", lambda ast, cfg, s=stage: calls.append(s.name) or ast)
+    q = "select t.id from t where t.email = %s"
+    assert run_stages(stages, AstNode(q), Config()).text == "SELECT t.id FROM t WHERE t.email = %s"
+    assert calls == []
+    run_stages(stages, AstNode("select a from t where b = 1 and a in (2, 1)"), Config())
+    assert calls == ["sort_in_list", "normalise_predicates"]
@@ -0,0 +1,52 @@
+import pytest
+
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.incremental import CanonicalDocument
+
+DOC = "select * from t where b=1 and a in (3,2,1);\nselect 'x;y' from u; -- done;\n"
+
+
+def test_document_canonicalises_each_statement():
+    doc = CanonicalDocument(DOC)
+    c = Canonicalizer()
+    assert doc.statements == [
+        c.normalise("select * from t where b=1 and a in (3,2,1)"),
+        c.normalise("select 'x;y' from u"),
+        "-- done;",  # ";" inside a comment is not a separator
+    ]
+    assert doc.canonical_text == ";\n".join(doc.statements)
+    assert doc.hash == c.hash(doc.canonical_text, Config(passes=["case_keywords"]))
+
+
+def test_edit_recomputes_only_touched_statements():
+    text = "".join(f"select * from t{i} where b={i} and a in ({i}, 1);\n" for i in range(2000))
+    doc = CanonicalDocument(text)
+    offset = text.index("t1000 ")
+    edited = doc.edit(offset, 5, "u1000")
+    assert edited.recomputed == 1
+    assert edited.text == text[:offset] + "u1000" + text[offset + 5 :]
+    assert edited.canonical_text == CanonicalDocument(edited.text).canonical_text
+    assert doc.canonical_text != edited.canonical_text  # the original is unchanged
+    # joining two statements, then splitting them again
+    semi = text.index(";")
+    joined = doc.edit(semi, 1, "")
+    assert joined.recomputed == 1 and len(joined.statements) == len(doc.statements) - 1
+    assert joined.edit(semi, 0, ";").canonical_text == doc.canonical_text
+
+
+def test_unterminated_quote_swallows_following_statements_until_closed():
+    cfg = Config(dialect="postgres")
+    doc = CanonicalDocument("select 1; select 2; select 3", cfg)
+    opened = doc.edit(len("select 1; select "), 0, "$$")
+    assert len(opened.statements) == 2 and opened.recomputed == 1
+    closed = opened.edit(len(opened.text), 0, "$$")
+    assert closed.statements[1] == "SELECT '__STR__'"
+    assert closed.canonical_text == CanonicalDocument(closed.text, cfg).canonical_text
+
+
+def test_edit_bounds_are_checked():
+    doc = CanonicalDocument("select 1")
+    for bad in [(-1, 0), (9, 0), (5, 4), (0, -1)]:
+        with pytest.raises(ValueError):
+            doc.edit(*bad, "")
+    assert CanonicalDocument("").edit(0, 0, "select 1;").statements == ["SELECT __NUM__", ""]
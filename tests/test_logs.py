@@ -0,0 +1,272 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from sqlcanon.logs import LogReader, PostgresCsvParser, canonicalise_records
+
+PG_CSV = (
+    '2024-05-01 10:00:00.000 UTC,"app","shop",4242,"10.0.0.1:5000",6632a1.1,1,"SELECT",'
+    '2024-05-01 09:59:00 UTC,3/7,0,LOG,00000,"duration: 1.250 ms  statement: select *\n'
+    'from orders\nwhere id in (3, 2, 1)",,,,,,,,,"psql",client backend,,0\n'
+    '2024-05-01 10:00:01.000 UTC,"app","shop",4242,"10.0.0.1:5000",6632a1.1,2,"PARSE",'
+    '2024-05-01 09:59:00 UTC,3/8,0,LOG,00000,"duration: 0.010 ms  parse S_1: select 1",,,,,,,,,"psql"\n'
+    '2024-05-01 10:00:02.000 UTC,"app","shop",4242,"10.0.0.1:5000",6632a1.1,3,"SELECT",'
+    '2024-05-01 09:59:00 UTC,3/8,0,LOG,00000,"execute S_1: select a from t where b = ""x""",'
+    '"parameters: $1 = \'5\'",,,,,,,,"psql"\n'
+)
+
+PG_JSON = "\n".join(
+    json.dumps(e)
+    for e in (
+        {"timestamp": "2024-05-01 10:00:00 UTC", "user": "app", "dbname": "shop", "pid": 7,
+         "message": "duration: 2.5 ms  statement: select 1"},
+        {"timestamp": "2024-05-01 10:00:01 UTC", "pid": 7, "message": "connection authorized: user=app"},
+        {"timestamp": "2024-05-01 10:00:02 UTC", "pid": 7, "message": "statement: select 2"},
+    )
+) + "\n"  # fmt: skip
+
+MYSQL_SLOW = """\
+/usr/sbin/mysqld, Version: 8.0.36 (MySQL Community Server - GPL). started with:
+Tcp port: 3306  Unix socket: /var/run/mysqld/mysqld.sock
+Time                 Id Command    Argument
+# Time: 2024-05-01T10:00:00.123456Z
+# User@Host: app[app] @ web1 [10.0.0.2]  Id:    17
+# Query_time: 1.500000  Lock_time: 0.000100 Rows_sent: 3  Rows_examined: 900
+use shop;
+SET timestamp=1714557600;
+SELECT *
+FROM orders
+WHERE id IN (3, 2, 1);
+# Time: 2024-05-01T10:00:05.000000Z
+# User@Host: app[app] @  [10.0.0.3]
+# Query_time: 0.200000  Lock_time: 0.000000 Rows_sent: 1  Rows_examined: 1
+SET timestamp=1714557605;
+select 1;
+"""
+
+PG_STAT = (
+    'userid,dbid,queryid,calls,total_exec_time,query\n10,5,-123,42,12.5,"select *\nfrom t where a = $1"\n'
+)
+
+
+def _write(path: Path, text: str) -> Path:
+    path.write_bytes(text.encode("utf-8"))
+    return path
+
+
+def test_postgres_csv_reassembles_multiline_rows_and_skips_parse(tmp_path: Path):
+    records = list(LogReader(_write(tmp_path / "pg.csv", PG_CSV), "postgres-csv"))
+    assert [r.statement for r in records] == [
+        "select *\nfrom orders\nwhere id in (3, 2, 1)",
+        'select a from t where b = "x"',
+    ]
+    first = records[0].metadata
+    assert first["duration_ms"] == 1.25 and first["database"] == "shop" and first["pid"] == 4242
+    assert first["application"] == "psql" and "detail" not in first
+    assert records[1].metadata["detail"] == "parameters: $1 = '5'"
+
+
+def test_postgres_json_keeps_only_statements(tmp_path: Path):
+    records = list(LogReader(_write(tmp_path / "pg.json", PG_JSON), "postgres-json"))
+    assert [r.statement for r in records] == ["select 1", "select 2"]
+    assert records[0].metadata == {
+        "log_time": "2024-05-01 10:00:00 UTC",
+        "user": "app",
+        "database": "shop",
+        "pid": 7,
+        "duration_ms": 2.5,
+    }
+
+
+def test_mysql_slow_log_entries(tmp_path: Path):
+    records = list(LogReader(_write(tmp_path / "slow.log", MYSQL_SLOW), "mysql-slow"))
+    assert [r.statement for r in records] == ["SELECT *\nFROM orders\nWHERE id IN (3, 2, 1)", "select 1"]
+    first, second = (r.metadata for r in records)
+    assert first["query_time"] == 1.5 and first["rows_examined"] == 900 and first["connection_id"] == 17
+    assert (first["user"], first["host"], first["database"]) == ("app", "web1", "shop")
+    assert first["timestamp"] == 1714557600
+    assert (second["host"], second["database"], second["timestamp"]) == ("10.0.0.3", "shop", 1714557605)
+
+
+def test_mysql_entry_without_semicolon_ends_at_next_header(tmp_path: Path):
+    text = "# Time: 1\nselect 1\n# Time: 2\nselect 2\n"
+    records = list(LogReader(_write(tmp_path / "slow.log", text), "mysql-slow"))
+    assert [(r.statement, r.metadata["time"]) for r in records] == [("select 1", "1"), ("select 2", "2")]
+
+
+def test_mysql_semicolon_inside_a_statement_does_not_split_it(tmp_path: Path):
+    body = "insert into t values ('a;\nb');"
+    proc = "create procedure p() begin\n  select 1;\n  select 2;\nend;"
+    text = f"# Time: 1\n{body}\n# User@Host: app[app] @ web1 []\n{proc}\n# Query_time: 0.1\nselect 3;\n"
+    records = list(LogReader(_write(tmp_path / "slow.log", text), "mysql-slow"))
+    assert [r.statement for r in records] == [body[:-1], proc[:-1], "select 3"]
+
+
+def test_mysql_follow_returns_the_last_entry_when_idle(tmp_path: Path):
+    log = _write(tmp_path / "slow.log", "# Time: 1\nselect 1;\n# Time: 2\nselect\n  2;\n")
+    reader = LogReader(log, "mysql-slow", follow=True, poll_interval=0.01)
+    records = reader._records()
+    assert [next(records).statement for _ in range(2)] == ["select 1", "select\n  2"]
+    assert next(records) is None and reader.offset == log.stat().st_size
+    reader.stop()
+
+
+def test_malformed_lines_are_skipped_and_counted(tmp_path: Path):
+    text = _line("select 1") + '{"message": "statement: sel\n' + "[1, 2]\n" + _line("select 2")
+    reader = LogReader(_write(tmp_path / "pg.json", text), "postgres-json")
+    assert [r.statement for r in reader] == ["select 1", "select 2"]
+    assert reader.skipped == 2
+
+
+def test_csv_rows_after_a_torn_line_are_parsed_or_counted(tmp_path: Path):
+    good = PG_CSV.splitlines(keepends=True)
+    torn = '2024-05-01 10:00:03.000 UTC,"app","sh\n'  # an unbalanced quote
+    text = good[0] + good[1] + good[2] + torn + "".join(good[3:]) + PG_CSV
+    reader = LogReader(_write(tmp_path / "pg.csv", text), "postgres-csv")
+    # The rows buffered behind the torn one are all parsed: the shifted quotes merge some,
+    # and the ones that come out malformed are counted instead of silently dropped
+    assert [r.statement for r in reader] == [
+        "select *\nfrom orders\nwhere id in (3, 2, 1)",
+        'select a from t where b = "x"',
+    ]
+    assert reader.skipped == 2
+
+
+def test_csv_chunk_over_the_size_cap_is_discarded_and_counted(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(PostgresCsvParser, "max_record", 100)
+    text = '2024-05-01,"torn\n' + "x\n" * 200 + PG_CSV
+    reader = LogReader(_write(tmp_path / "pg.csv", text), "postgres-csv")
+    assert [r.statement for r in reader][-1] == 'select a from t where b = "x"'
+    assert reader.skipped > 0
+
+
+def test_pg_stat_statements_dump(tmp_path: Path):
+    [record] = LogReader(_write(tmp_path / "pss.csv", PG_STAT), "pg-stat-statements")
+    assert record.statement == "select *\nfrom t where a = $1"
+    assert record.metadata == {"userid": 10, "dbid": 5, "queryid": -123, "calls": 42, "total_exec_time": 12.5}
+
+
+def test_unknown_format():
+    with pytest.raises(KeyError, match="Unknown log format"):
+        LogReader("x.log", "oracle-audit")
+
+
+def test_checkpoint_resumes_without_reprocessing(tmp_path: Path):
+    log = _write(tmp_path / "slow.log", MYSQL_SLOW)
+    ckpt = tmp_path / "slow.ckpt"
+    reader = LogReader(log, "mysql-slow", checkpoint=ckpt)
+    [first] = next(reader.batches(1))
+    reader.save_checkpoint()
+    assert first.statement.startswith("SELECT *")
+
+    # The offset is past the first entry's ";" line, before the second entry's header
+    resumed = list(LogReader(log, "mysql-slow", checkpoint=ckpt))
+    assert [r.statement for r in resumed] == ["select 1"]
+    assert resumed[0].metadata["time"] == "2024-05-01T10:00:05.000000Z"
+
+    # The current database ("use" is only logged when it changes) is restored too
+    assert resumed[0].metadata["database"] == "shop"
+
+    # A file replaced since the checkpoint is read from the top
+    os.replace(_write(tmp_path / "new.log", MYSQL_SLOW), log)
+    assert len(list(LogReader(log, "mysql-slow", checkpoint=ckpt))) == 2
+
+
+def test_checkpoint_resume_rereads_header(tmp_path: Path):
+    text = PG_STAT + '10,5,7,1,0.5,"select 2"\n'
+    log = _write(tmp_path / "pss.csv", text)
+    reader = LogReader(log, "pg-stat-statements", checkpoint=tmp_path / "ckpt")
+    next(iter(reader))
+    reader.save_checkpoint()
+    [record] = LogReader(log, "pg-stat-statements", checkpoint=tmp_path / "ckpt")
+    assert record.statement == "select 2" and record.metadata["queryid"] == 7
+
+
+def test_save_checkpoint_needs_a_path(tmp_path: Path):
+    with pytest.raises(ValueError, match="without a checkpoint"):
+        LogReader(tmp_path / "x.log", "postgres-json").save_checkpoint()
+
+
+def _line(statement: str) -> str:
+    return json.dumps({"message": f"statement: {statement}"}) + "\n"
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_follow_handles_partial_lines_rotation_and_truncation(tmp_path: Path):
+    log = _write(tmp_path / "pg.json", _line("select 1"))
+    reader = LogReader(log, "postgres-json", follow=True, poll_interval=0.01)
+    seen: list[str] = []
+    thread = threading.Thread(target=lambda: seen.extend(r.statement for r in reader))
+    thread.start()
+    try:
+        _wait_for(lambda: seen == ["select 1"])
+
+        # A line written in two parts is read once it is complete
+        line = _line("select 2")
+        with open(log, "a") as f:
+            f.write(line[:10])
+            f.flush()
+            time.sleep(0.05)
+            f.write(line[10:])
+        _wait_for(lambda: len(seen) == 2)
+
+        # Rotation: the old file is renamed and a new one created
+        log.rename(tmp_path / "pg.json.1")
+        _write(log, _line("select 3"))
+        _wait_for(lambda: len(seen) == 3)
+
+        # Truncation in place (copytruncate): read again from the top
+        _write(log, "")
+        _wait_for(lambda: reader.offset == 0)
+        _write(log, _line("select 4"))
+        _wait_for(lambda: len(seen) == 4)
+    finally:
+        reader.stop()
+        thread.join(5)
+    assert not thread.is_alive()
+    assert seen == ["select 1", "select 2", "select 3", "select 4"]
+
+
+def test_follow_drains_lines_written_just_before_rotation(tmp_path: Path):
+    log = _write(tmp_path / "pg.json", _line("select 1"))
+    reader = LogReader(log, "postgres-json", follow=True, poll_interval=0.01)
+    records = reader._records()
+    assert next(records).statement == "select 1"
+    assert next(records) is None  # at the end of the file
+    with open(log, "a") as f:
+        f.write(_line("select 2") + _line("select 3")[:-1])  # the last one unterminated
+    log.rename(tmp_path / "pg.json.1")
+    _write(log, _line("select 4"))
+    assert [next(records).statement for _ in range(3)] == ["select 2", "select 3", "select 4"]
+    reader.stop()
+    assert next(records) is None
+    assert list(records) == []
+
+
+def test_follow_batches_flush_when_idle(tmp_path: Path):
+    log = _write(tmp_path / "pg.json", _line("select 1") + _line("select 2"))
+    reader = LogReader(log, "postgres-json", follow=True, poll_interval=0.01)
+    batches = reader.batches(100)
+    assert [r.statement for r in next(batches)] == ["select 1", "select 2"]
+    reader.stop()
+    assert list(batches) == []
+
+
+def test_canonicalise_records(tmp_path: Path):
+    records = list(LogReader(_write(tmp_path / "slow.log", MYSQL_SLOW), "mysql-slow"))
+    out = canonicalise_records(records + records)
+    assert [c for _, c, _ in out[:2]] == [
+        "SELECT *\nFROM orders\nWHERE id IN (__NUM__, __NUM__, __NUM__)",
+        "SELECT __NUM__",
+    ]
+    assert out[0][0] == out[2][0] and out[0][2] is records[0].metadata
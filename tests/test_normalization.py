@@ -1,4 +1,5 @@
 from sqlcanon import Canonicalizer, Config
+from sqlcanon.protocols import AstNode
 
 
 def test_idempotent_normalise():
@@ -20,3 +21,19 @@ def test_keyword_case_config_lower():
     c = Canonicalizer()
     out = c.normalise("SELECT A FROM T", Config(keyword_case="lower"))
     assert "select" in out and "from" in out
+
+
+def test_bytes_like_input():
+    c = Canonicalizer()
+    q = "select naïve from t where a in (2,1) and b='é'"
+    data = q.encode("utf-8")
+    expected = c.normalise(q)
+    for sql in (data, bytearray(data), memoryview(data), memoryview(b"--" + data)[2:]):
+        assert c.normalise(sql) == expected
+        assert c.hash(sql) == c.hash(q) and c.hash_int(sql) == c.hash_int(q)
+    assert c.normalise_bytes(data) == expected.encode("utf-8")
+    assert c.hasher.digest_bytes(c.normalise_bytes(memoryview(data))) == c.hash(q)
+    # hash()/hash_int() hash the canonical bytes, and agree with hashing the text
+    assert c.hash(data) == c.hasher.digest(AstNode(expected), Config())
+    assert c.hash_int(data) == c.hasher.digest_int(AstNode(expected), Config())
+    assert c.parameterise(data) == c.parameterise(q)
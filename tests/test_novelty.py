@@ -0,0 +1,104 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from sqlcanon import Canonicalizer
+from sqlcanon.novelty import BloomFilter, NoveltyDetector
+
+_rng = random.Random(3)
+
+
+def _keys(n: int) -> list[int]:
+    return [_rng.getrandbits(64) for _ in range(n)]
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(5000, 0.01)
+    keys = _keys(5000)
+    assert all(bloom.add(k) for k in keys[:10])
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys) and bloom.count > 4900
+    false_positives = sum(k in bloom for k in _keys(20000))
+    assert false_positives / 20000 < 0.02
+    with pytest.raises(ValueError):
+        BloomFilter(10, 1.5)
+
+
+def test_reports_each_shape_once():
+    c = Canonicalizer()
+    detector = NoveltyDetector(capacity=100)
+    statements = ["select 1", "SELECT 2", "select a from t", "select a from t where b = 'x'"]
+    assert [detector.add(c.hash_int(s)) for s in statements] == [True, False, True, True]
+    assert detector.add(c.hash("select a from t")) is False  # hex hashes work too
+    assert c.hash_int("select 3") in detector and len(detector) == 3
+
+
+def test_scalable_mode_grows_and_keeps_error_rate():
+    detector = NoveltyDetector(capacity=1000, error_rate=0.01)
+    keys = _keys(7000)
+    assert sum(detector.add_many(keys)) > 6900  # a few are missed as false positives
+    assert len(detector.filters) == 3
+    assert not any(detector.add_many(keys))
+    missed = 5000 - sum(detector.add_many(_keys(5000)))
+    assert missed / 5000 < 0.02
+
+
+def test_rotating_mode_forgets_after_a_window():
+    now = [0.0]
+    detector = NoveltyDetector(capacity=1000, rotate_every=60, generations=2, clock=lambda: now[0])
+    a, b = _keys(2)
+    assert detector.add(a) and detector.add(b)
+    now[0] = 61
+    assert not detector.add(a)  # still in the previous generation; refreshed into the new one
+    now[0] = 122
+    assert not detector.add(a)
+    assert detector.add(b)  # unseen for two rotations
+
+
+def test_rotating_mode_forgets_after_a_long_idle_gap(tmp_path: Path):
+    now = [0.0]
+    detector = NoveltyDetector(capacity=1000, rotate_every=60, generations=2, clock=lambda: now[0])
+    a, b = _keys(2)
+    assert detector.add(a)
+    now[0] = 10_000
+    assert detector.add(b)
+    assert detector.add(a)  # unseen for far longer than the window
+    assert len(detector._generations) == 2
+    detector.save(tmp_path / "novelty.bin")
+    now[0] = 20_000
+    loaded = NoveltyDetector.load(tmp_path / "novelty.bin", clock=lambda: now[0])
+    assert loaded.add(b)  # the saved window has long passed
+    assert loaded.rotated_at == 19_980
+
+
+def test_rotating_mode_grows_instead_of_rotating_early():
+    now = [0.0]
+    detector = NoveltyDetector(capacity=100, rotate_every=60, generations=2, clock=lambda: now[0])
+    first, *burst = _keys(1000)
+    assert detector.add(first)
+    detector.add_many(burst)  # ten times the capacity within one window
+    now[0] = 61
+    assert not detector.add(first)  # the burst did not rotate it out
+    assert len(detector.filters) > 2
+
+
+def test_save_and_load_round_trip(tmp_path: Path):
+    detector = NoveltyDetector(capacity=500, error_rate=0.001)
+    keys = _keys(1200)
+    detector.add_many(keys)
+    detector.save(tmp_path / "novelty.bin")
+    loaded = NoveltyDetector.load(tmp_path / "novelty.bin")
+    assert [f.bits for f in loaded.filters] == [f.bits for f in detector.filters]
+    assert not any(loaded.add_many(keys)) and len(loaded) == len(detector)
+    rotating = NoveltyDetector(capacity=100, rotate_every=60, clock=lambda: 0.0)
+    rotating.add_many(keys[:300])
+    rotating.save(tmp_path / "rotating.bin")
+    assert len(NoveltyDetector.load(tmp_path / "rotating.bin")._generations) == 1
+    (tmp_path / "bad.bin").write_bytes(b"nope")
+    with pytest.raises(ValueError):
+        NoveltyDetector.load(tmp_path / "bad.bin")
+    (tmp_path / "short.bin").write_bytes((tmp_path / "novelty.bin").read_bytes()[:-10])
+    with pytest.raises(ValueError):
+        NoveltyDetector.load(tmp_path / "short.bin")
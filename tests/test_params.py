@@ -0,0 +1,62 @@
+import pytest
+
+from sqlcanon import Canonicalizer, Config, ExtractedLiteral, bind_params
+
+
+def test_parameterise_extracts_typed_literals_with_offsets():
+    c = Canonicalizer()
+    q = "select * from t where a = 12 and b = 'it''s'"
+    template, params = c.parameterise(q)
+    assert template == "SELECT * FROM t WHERE a = __NUM__ AND b = '__STR__'"
+    assert [(p.kind, p.text) for p in params] == [("num", "12"), ("str", "'it''s'")]
+    assert [q[p.start : p.end] for p in params] == ["12", "'it''s'"]
+    assert [p.value for p in params] == [12, "it's"]
+
+
+def test_parameterise_template_matches_normalise():
+    c = Canonicalizer()
+    q = "select * from t where b=1 and a in (3,2,1) and c='x'"
+    template, _ = c.parameterise(q)
+    assert template == c.normalise(q)
+
+
+def test_parameterise_follows_in_list_permutation():
+    c = Canonicalizer(passes=["normalise_literals", "sort_in_list"])
+    q = "select * from t where a in (7, 'x', 8, 'y')"
+    template, params = c.parameterise(q)
+    assert template == "select * from t where a IN ('__STR__', '__STR__', __NUM__, __NUM__)"
+    assert [p.text for p in params] == ["'x'", "'y'", "7", "8"]
+    assert bind_params(template, params) == "select * from t where a IN ('x', 'y', 7, 8)"
+    # source order is recoverable from the offsets
+    assert [p.text for p in sorted(params, key=lambda p: p.start)] == ["7", "'x'", "8", "'y'"]
+
+
+def test_parameterise_follows_predicate_reordering():
+    c = Canonicalizer()
+    q = "select * from t where c='z' and a in (3, 1) and b=2.5"
+    template, params = c.parameterise(q)
+    assert template == "SELECT * FROM t WHERE a IN (__NUM__, __NUM__) AND b=__NUM__ AND c='__STR__'"
+    assert bind_params(template, params) == "SELECT * FROM t WHERE a IN (3, 1) AND b=2.5 AND c='z'"
+    assert params[2].value == 2.5
+
+
+def test_parameterise_keyword_inside_string_untouched():
+    c = Canonicalizer()
+    template, params = c.parameterise("select 'select from' as x")
+    assert template == "SELECT '__STR__' AS x"
+    assert params == [ExtractedLiteral("str", "'select from'", 7, 20)]
+
+
+def test_parameterise_without_literal_pass_is_empty():
+    c = Canonicalizer()
+    cfg = Config(passes=["case_keywords", "sort_in_list"])
+    template, params = c.parameterise("select * from t where a in (2, 1)", cfg)
+    assert template == "SELECT * FROM t WHERE a IN (1, 2)"
+    assert params == []
+
+
+def test_bind_params_count_mismatch():
+    with pytest.raises(ValueError):
+        bind_params("a = __NUM__ and b = __NUM__", [ExtractedLiteral("num", "1", 0, 1)])
+    with pytest.raises(ValueError):
+        bind_params("a = 1", [ExtractedLiteral("num", "1", 0, 1)])
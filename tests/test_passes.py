@@ -1,6 +1,6 @@
 import re
 
-from sqlcanon import Canonicalizer
+from sqlcanon import Canonicalizer, Config
 
 
 def test_normalise_literals_placeholders():
@@ -44,3 +44,27 @@ def test_normalise_predicates_skips_when_or_present():
     out = c.normalise(q)
     # Should not reorder when OR is present (safety)
     assert out.lower() == q.lower()
+
+
+def test_normalise_identifiers_folds_and_unquotes():
+    c = Canonicalizer(passes=["normalise_identifiers"])
+    q = 'SELECT A, "b", "B", "user", "a b" FROM T WHERE X1 = 0xFF'
+    assert c.normalise(q) == q  # identifier_case = "as_is"
+    lower = Config(identifier_case="lower")
+    assert c.normalise(q, lower) == 'SELECT a, b, "B", "user", "a b" FROM t WHERE x1 = 0xFF'
+    upper = Config(identifier_case="upper")
+    assert c.normalise(q, upper) == 'SELECT A, B, "B", "user", "a b" FROM T WHERE X1 = 0xFF'
+    # Reserved words are not folded as identifiers, whatever the dialect's keyword table holds
+    q = "select distinct A from T where B is not null order by C desc"
+    assert c.normalise(q, upper) == "select distinct A from T where B is not null order by C desc"
+    assert c.normalise(q, lower) == "select distinct a from t where b is not null order by c desc"
+    assert c.normalise("select `Tbl`.`id` from `Tbl`", Config(identifier_case="lower", dialect="mysql")) == (
+        "select `Tbl`.id from `Tbl`"
+    )
+
+
+def test_identifier_case_unifies_hashes():
+    c = Canonicalizer()
+    cfg = Config(identifier_case="lower")
+    assert c.hash("SELECT A FROM T WHERE B = 1", cfg) == c.hash('select "a" from t where b = 2', cfg)
+    assert c.hash("SELECT A FROM T") != c.hash("select a from t")
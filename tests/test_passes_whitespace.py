@@ -0,0 +1,89 @@
+from sqlcanon import Canonicalizer, Config
+
+WS = ["normalise_whitespace", "case_keywords", "normalise_literals"]
+
+
+def test_whitespace_collapses_and_trims():
+    c = Canonicalizer(passes=WS)
+    out = c.normalise("\n  select  a,\n\tb   from t  where x = 1 \n")
+    assert out == "SELECT a, b FROM t WHERE x = __NUM__"
+
+
+def test_whitespace_strips_comments():
+    c = Canonicalizer(passes=WS)
+    q = "select a -- trailing note\nfrom t /* block\ncomment */ where b = 2/*x*/and c = 3 --"
+    assert c.normalise(q) == "SELECT a FROM t WHERE b = __NUM__ AND c = __NUM__"
+
+
+def test_whitespace_hash_ignores_trace_comments():
+    c = Canonicalizer(passes=WS + ["sort_in_list", "normalise_predicates"])
+    q1 = "select * from t where b=1 and a in (2,1) /*traceparent='00-aaa-bbb-01'*/"
+    q2 = "SELECT *\n  FROM t\n WHERE b=1 and a in (1,2) /*traceparent='00-ccc-ddd-01'*/"
+    assert c.hash(q1) == c.hash(q2)
+
+
+def test_whitespace_keeps_hints_by_default():
+    c = Canonicalizer(passes=WS)
+    q = "select /*+ INDEX(t ix_a) */ a /* plain */ from t"
+    assert c.normalise(q) == "SELECT /*+ INDEX(t ix_a) */ a FROM t"
+    assert c.normalise(q, Config(passes=WS, keep_hints=False)) == "SELECT a FROM t"
+
+
+def test_whitespace_leaves_strings_alone():
+    c = Canonicalizer(passes=["normalise_whitespace"])
+    q = "select 'a  -- not a comment /* nor this */' ,  x"
+    assert c.normalise(q) == "select 'a  -- not a comment /* nor this */' , x"
+
+
+def test_whitespace_unterminated_block_comment():
+    c = Canonicalizer(passes=["normalise_whitespace"])
+    assert c.normalise("select 1 /* never closed") == "select 1"
+
+
+def test_whitespace_extracts_sqlcommenter_tags():
+    c = Canonicalizer(passes=WS)
+    q = (
+        "select * from t where a = 1 "
+        "/*action='list%20users',route='%2Fusers',traceparent='00-5bd6-1-01',framework='it\\'s'*/"
+    )
+    out, tags = c.normalise_with_tags(q)
+    assert out == "SELECT * FROM t WHERE a = __NUM__"
+    assert tags == {
+        "action": "list users",
+        "route": "/users",
+        "traceparent": "00-5bd6-1-01",
+        "framework": "it's",
+    }
+
+
+def test_whitespace_ignores_non_sqlcommenter_comments_for_tags():
+    c = Canonicalizer(passes=WS)
+    _, tags = c.normalise_with_tags("select 1 /* just a note = 'x' */ -- k='v'")
+    assert tags == {}
+
+
+def test_whitespace_idempotent():
+    c = Canonicalizer(passes=WS)
+    once = c.normalise("select  a /* c */\nfrom t")
+    assert c.normalise(once) == once
+
+
+def test_literals_in_comments_and_kept_hints_are_scrubbed():
+    q = "select a from t /* user 12345 email='bob@x.com' */ where b = 1 -- id=42"
+    c = Canonicalizer(passes=["case_keywords", "normalise_literals"])
+    assert c.normalise(q) == (
+        "SELECT a FROM t /* user __NUM__ email='__STR__' */ WHERE b = __NUM__ -- id=__NUM__"
+    )
+    c = Canonicalizer(passes=WS)
+    assert c.normalise(q) == "SELECT a FROM t WHERE b = __NUM__"
+    out = c.normalise("select /*+ set(work_mem '64MB') */ 1")
+    assert out == "SELECT /*+ set(work_mem '__STR__') */ __NUM__"
+
+
+def test_tags_read_before_literals_scrub_them():
+    q = "select 1 /*route='%2Fusers'*/"
+    c = Canonicalizer()
+    assert c.normalise_with_tags(q, Config(passes=WS))[1] == {"route": "/users"}
+    # After normalise_literals (fused or not) the values are already scrubbed
+    for passes in (WS[::-1], ["normalise_literals", "sort_in_list", "normalise_whitespace"]):
+        assert c.normalise_with_tags(q, Config(passes=passes))[1] == {"route": "__STR__"}
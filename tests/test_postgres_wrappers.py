@@ -0,0 +1,186 @@
+"""The wrappers against a stand-in Postgres: sqlite3 behind the slice of the
+psycopg / asyncpg API they use, translating placeholders so binding is really checked."""
+
+import asyncio
+import re
+import sqlite3
+
+import pytest
+
+from sqlcanon import Config
+from sqlcanon.integrations.postgres import (
+    AsyncCanonicalConnection,
+    CanonicalConnection,
+    PreparedStatementCache,
+    StatementRewriter,
+)
+
+
+def _db() -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.execute("create table t(a integer, b integer, c text)")
+    db.executemany("insert into t values (?, ?, ?)", [(1, 1, "x"), (2, 1, "y"), (3, 2, "z")])
+    return db
+
+
+class FakePsycopgCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self._rows = []
+
+    def execute(self, query, params=None, prepare=None):
+        if prepare:
+            self.conn.prepared.add(query)
+        if params is None:
+            self.conn.db.executescript(query)
+            return self
+        query = re.sub(r"%\((\w+)\)s", r":\1", query).replace("%s", "?")
+        self._rows = self.conn.db.execute(query, params or ()).fetchall()
+        return self
+
+    def fetchall(self):
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakePsycopgConnection:
+    prepared_max = 100
+
+    def __init__(self):
+        self.db = _db()
+        self.prepared: set[str] = set()
+
+    def cursor(self):
+        return FakePsycopgCursor(self)
+
+
+class FakeAsyncpgStatement:
+    def __init__(self, db, query):
+        self.db = db
+        self.query = re.sub(r"\$(\d+)", r"?\1", query)
+
+    async def fetch(self, *args, timeout=None):
+        return self.db.execute(self.query, args).fetchall()
+
+    async def fetchrow(self, *args, timeout=None):
+        rows = await self.fetch(*args)
+        return rows[0] if rows else None
+
+    async def fetchval(self, *args, column=0, timeout=None):
+        row = await self.fetchrow(*args)
+        return None if row is None else row[column]
+
+    def get_statusmsg(self):
+        return "SELECT"
+
+
+class FakeAsyncpgConnection:
+    def __init__(self):
+        self.db = _db()
+        self.prepared: list[str] = []
+
+    async def prepare(self, query):
+        self.prepared.append(query)
+        return FakeAsyncpgStatement(self.db, query)
+
+    async def execute(self, query, *args, timeout=None):
+        self.db.executescript(query)
+        return "EXECUTE"
+
+
+def test_psycopg_equivalent_statements_share_one_prepared_plan():
+    raw = FakePsycopgConnection()
+    conn = CanonicalConnection(raw, maxsize=8)
+    assert raw.prepared_max == 8
+    cur = conn.cursor()
+    assert cur.execute("select a from t where c = %s and b in (%s, %s)", ("x", 1, 2)).fetchall() == [(1,)]
+    # same shape, predicates and IN list in another order: arguments are permuted to follow
+    assert conn.execute("select a from t where b in (%s, %s) and c = %s", (2, 1, "y")).fetchall() == [(2,)]
+    assert conn.execute("SELECT a FROM t WHERE c = %(c)s", {"c": "z"}).fetchall() == [(3,)]
+    assert raw.prepared == {
+        "SELECT a FROM t WHERE b IN (%s, %s) AND c = %s",
+        "SELECT a FROM t WHERE c = %(c)s",
+    }
+    assert (conn.stats.hits, conn.stats.misses) == (1, 2)
+    assert conn.stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_psycopg_executemany_binds_each_row():
+    conn = CanonicalConnection(FakePsycopgConnection())
+    calls = []
+    cur = conn.cursor()
+    cur._cursor.executemany = lambda q, seq: calls.append((q, seq))
+    cur.executemany("select a from t where c = %s and b = %s", [("p", 4), ("q", 5)])
+    assert calls == [("SELECT a FROM t WHERE b = %s AND c = %s", [[4, "p"], [5, "q"]])]
+
+
+def test_asyncpg_prepared_statements_reused_and_evicted():
+    raw = FakeAsyncpgConnection()
+    conn = AsyncCanonicalConnection(raw, maxsize=1)
+
+    async def run():
+        assert await conn.fetch("select a from t where c = $1 and b = $2", "x", 1) == [(1,)]
+        assert await conn.fetch("select a from t where b = $1 and c = $2", 1, "y") == [(2,)]
+        assert await conn.fetchval("select count(*) from t where a in ($1, $2)", 3, 1) == 2
+        assert await conn.fetchrow("select a from t where a = $1", 9) is None
+        assert await conn.execute("select a from t where c = $2 and b = $1", 2, "z") == "SELECT"
+
+    asyncio.run(run())
+    assert raw.prepared[0] == "SELECT a FROM t WHERE b = $1 AND c = $2"
+    assert len(raw.prepared) == 4  # the last statement was evicted by the two before it
+    assert (conn.stats.hits, conn.stats.misses, conn.stats.evictions) == (1, 4, 3)
+
+
+def test_asyncpg_execute_without_args_runs_script_unprepared():
+    raw = FakeAsyncpgConnection()
+    conn = AsyncCanonicalConnection(raw)
+
+    async def run():
+        return await conn.execute("create table u(x integer); insert into u values (1)")
+
+    assert asyncio.run(run()) == "EXECUTE"
+    assert raw.prepared == [] and raw.db.execute("select x from u").fetchall() == [(1,)]
+
+
+def test_psycopg_execute_without_params_runs_script_unprepared():
+    raw = FakePsycopgConnection()
+    conn = CanonicalConnection(raw)
+    conn.execute("create table u(x integer); insert into u values (1)")
+    assert raw.prepared == set() and raw.db.execute("select x from u").fetchall() == [(1,)]
+    assert conn.stats.misses == 0
+
+
+def test_bind_rejects_argument_count_mismatch():
+    conn = CanonicalConnection(FakePsycopgConnection())
+    with pytest.raises(ValueError, match="2 placeholders but 3 arguments"):
+        conn.execute("select a from t where c = %s and b = %s", ("x", 1, 2))
+    rw = StatementRewriter().rewrite("select a from t where b = $1 and a = $2", "dollar")
+    assert rw.bind((1, 2)) == [2, 1]
+    with pytest.raises(ValueError, match="2 placeholders but 1 arguments"):
+        rw.bind((1,))
+
+
+def test_rewriter_keeps_quoted_placeholders_and_memoises():
+    rw = StatementRewriter(Config(passes=["case_keywords", "normalise_predicates"]))
+    q = "select '%s', $$ $1 $$ from t where b = %s and a like '5%%' and a = %s"
+    out = rw.rewrite(q, "format")
+    assert out.text == "SELECT '%s', $$ $1 $$ FROM t WHERE a = %s AND a like '5%%' AND b = %s"
+    assert out.order == (1, 0)
+    assert out.bind(["b", "a"]) == ["a", "b"]
+    assert (
+        rw.rewrite("select '%s', $$ $1 $$ from t where b = %s and a like '5%%' and a = %s", "format") is out
+    )
+    dup = rw.rewrite("select * from t where b = $1 and a = $2 and c = $1", "dollar")
+    assert dup.text == "SELECT * FROM t WHERE a = $1 AND b = $2 AND c = $2"
+    assert dup.bind(("B", "A")) == ["A", "B"]
+
+
+def test_prepared_statement_cache_bounds():
+    with pytest.raises(ValueError):
+        PreparedStatementCache(0)
+    cache = PreparedStatementCache(1)
+    assert cache.put("a", 1) is None
+    assert cache.put("b", 2) == 1
+    assert len(cache) == 1 and cache.get("b") == 2 and cache.get("a") is None
@@ -0,0 +1,82 @@
+import json
+import os
+from pathlib import Path
+
+from sqlcanon import Canonicalizer, Config
+from sqlcanon.scan import MANIFEST_NAME, scan
+
+
+def _tree(root: Path) -> None:
+    (root / "models" / "staging").mkdir(parents=True)
+    (root / ".venv").mkdir()
+    (root / "models" / "a.sql").write_text("select a from t where x in (2, 1) and y = 1")
+    (root / "models" / "staging" / "b.sql").write_text("SELECT a FROM t WHERE y = 5 AND x IN (1, 2);\n")
+    (root / "models" / "c.sql").write_text("select b from u; select c from v")
+    (root / "models" / "notes.md").write_text("select a from t")
+    (root / ".venv" / "ignored.sql").write_text("select a from t")
+
+
+def test_scan_groups_duplicates_and_reuses_manifest(tmp_path: Path):
+    _tree(tmp_path)
+    first = scan(tmp_path)
+    assert sorted(first.files) == ["models/a.sql", "models/c.sql", "models/staging/b.sql"]
+    assert first.duplicates == [["models/a.sql", "models/staging/b.sql"]]
+    assert (first.read, first.canonicalised) == (3, 3)
+
+    again = scan(tmp_path)
+    assert (again.read, again.canonicalised) == (0, 0)
+    assert again.files == first.files and again.duplicates == first.duplicates
+
+    # Touched (e.g. a fresh checkout): read and hashed, not canonicalised
+    os.utime(tmp_path / "models" / "a.sql", ns=(1, 1))
+    (tmp_path / "models" / "d.sql").write_text("select b from u;\nselect c from v;")
+    (tmp_path / "models" / "c.sql").write_text("select c from v")
+    (tmp_path / "models" / "staging" / "b.sql").unlink()
+    third = scan(tmp_path)
+    assert (third.read, third.canonicalised, third.removed) == (3, 2, 1)
+    assert third.duplicates == []
+    assert third.files["models/d.sql"] != third.files["models/c.sql"]
+
+
+def test_manifest_is_tied_to_config(tmp_path: Path):
+    _tree(tmp_path)
+    manifest = tmp_path / "m.json"
+    scan(tmp_path, manifest=manifest)
+    assert json.loads(manifest.read_text())["files"]
+    assert not (tmp_path / MANIFEST_NAME).exists()
+    exec_cfg = Config(passes=["case_keywords", "sort_in_list", "normalise_predicates"])
+    result = scan(tmp_path, exec_cfg, manifest=manifest)
+    assert result.canonicalised == 3 and result.duplicates == []
+    manifest.write_text("{not json")
+    assert scan(tmp_path, manifest=manifest).canonicalised == 3
+    # So is it to the canonicalizer's own default passes
+    custom = Canonicalizer(passes=["case_keywords"])
+    assert scan(tmp_path, manifest=manifest, canonicalizer=custom).canonicalised == 3
+
+
+def test_unreadable_directory_is_reported_not_fatal(tmp_path: Path, monkeypatch):
+    _tree(tmp_path)
+    real_scandir = os.scandir
+
+    def scandir(path):
+        if Path(path).name == "staging":
+            raise PermissionError(13, "Permission denied", path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", scandir)
+    result = scan(tmp_path)
+    assert sorted(result.files) == ["models/a.sql", "models/c.sql"]
+    assert "Permission denied" in result.errors["models/staging/"]
+    assert result.read == 2
+
+
+def test_parallel_scan_matches_serial(tmp_path: Path, monkeypatch):
+    import sqlcanon.scan as scan_mod
+
+    for i in range(12):
+        (tmp_path / f"q{i}.sql").write_text(f"select * from t{i % 4} where a in ({i}, 1)")
+    monkeypatch.setattr(scan_mod, "PARALLEL_MIN_FILES", 4)
+    parallel = scan(tmp_path, manifest=tmp_path / "p.json", max_workers=2)
+    serial = scan(tmp_path, manifest=tmp_path / "s.json")
+    assert parallel.files == serial.files
+    assert [len(g) for g in serial.duplicates] == [3, 3, 3, 3]
@@ -0,0 +1,163 @@
+import multiprocessing
+import threading
+from pathlib import Path
+
+import pytest
+
+from sqlcanon import Canonicalizer
+from sqlcanon.shapes import ShapeCollisionError, ShapeRegistry, shape_id
+
+SHAPES = [
+    "SELECT * FROM t WHERE a = __NUM__",
+    "SELECT b FROM u WHERE c IN ('__STR__', '__STR__')",
+    "SELECT 'héllo ✓' FROM v",
+]
+
+
+def test_intern_assigns_stable_compact_ids():
+    reg = ShapeRegistry()
+    ids = [reg.intern(s) for s in SHAPES]
+    assert ids == [shape_id(s) for s in SHAPES] == [reg.intern(s) for s in SHAPES]
+    assert all(0 <= i < 2**63 for i in ids) and len(set(ids)) == 3
+    assert [reg[i] for i in ids] == SHAPES
+    assert len(reg) == 3 and reg.unsaved == 3
+    assert reg.lookup(12345) is None and 12345 not in reg and "x" not in reg
+    with pytest.raises(KeyError):
+        reg[12345]
+    c = Canonicalizer()
+    assert reg.intern(c.normalise("select * from t where a=1")) == reg.intern(
+        c.normalise("SELECT * FROM t WHERE a=2")
+    )
+
+
+def test_save_maps_file_and_reopens(tmp_path: Path):
+    path = tmp_path / "shapes.bin"
+    with ShapeRegistry(path) as reg:
+        ids = [reg.intern(s) for s in SHAPES]
+        reg.save()
+        assert reg.unsaved == 0 and [reg[i] for i in ids] == SHAPES
+    with ShapeRegistry(path) as reopened:
+        assert [reopened.lookup(i) for i in ids] == SHAPES
+        assert sorted(reopened.items()) == sorted(zip(ids, SHAPES))
+        extra = reopened.intern("SELECT 1")
+        assert reopened.unsaved == 1 and len(reopened) == 4
+        reopened.save()
+        assert ShapeRegistry(path)[extra] == "SELECT 1"
+
+
+def _worker(path: str, text: str) -> None:
+    reg = ShapeRegistry(path)
+    reg.intern(text)
+    reg.save()
+    reg.close()
+
+
+def test_processes_share_file_and_saves_merge(tmp_path: Path):
+    path = tmp_path / "shapes.bin"
+    reg = ShapeRegistry(path)
+    reg.intern(SHAPES[0])
+    reg.save()
+    for text in SHAPES[1:]:
+        p = multiprocessing.get_context("spawn").Process(target=_worker, args=(str(path), text))
+        p.start()
+        p.join()
+    assert reg.lookup(shape_id(SHAPES[2])) is None  # not remapped yet
+    assert reg.refresh() and not reg.refresh()
+    assert reg[shape_id(SHAPES[2])] == SHAPES[2]
+    # a save merges what is on disk instead of overwriting it
+    stale = ShapeRegistry()
+    stale.path = path
+    stale.intern("SELECT 2")
+    stale.save()
+    assert len(ShapeRegistry(path)) == 4
+
+
+def _saver(path: str, prefix: str, start, count: int) -> None:
+    start.wait()
+    for i in range(count):
+        reg = ShapeRegistry(path)
+        reg.intern(f"SELECT {prefix}{i}")
+        reg.save()
+        reg.close()
+
+
+def test_concurrent_saves_keep_every_shape(tmp_path: Path):
+    path = str(tmp_path / "shapes.bin")
+    ctx = multiprocessing.get_context("spawn")
+    start = ctx.Event()
+    procs = [ctx.Process(target=_saver, args=(path, prefix, start, 25)) for prefix in "ab"]
+    for p in procs:
+        p.start()
+    start.set()
+    for p in procs:
+        p.join()
+    assert len(ShapeRegistry(path)) == 50
+
+
+def test_lookups_survive_saves_from_another_thread(tmp_path: Path):
+    reg = ShapeRegistry(tmp_path / "shapes.bin")
+    ids = [reg.intern(s) for s in SHAPES]
+    reg.save()
+    errors = []
+    done = threading.Event()
+
+    def read():
+        try:
+            while not done.is_set():
+                assert [reg.lookup(i) for i in ids] == SHAPES
+                assert len(dict(reg.items())) >= 3
+        except Exception as exc:  # e.g. "mmap closed"
+            errors.append(exc)
+
+    readers = [threading.Thread(target=read) for _ in range(2)]
+    for t in readers:
+        t.start()
+    for i in range(50):
+        reg.intern(f"SELECT {i}")
+        reg.save()
+    done.set()
+    for t in readers:
+        t.join()
+    assert errors == []
+    assert len(reg) == 53 and reg.unsaved == 0
+    reg.intern("SELECT x")
+    reg.intern(SHAPES[0])
+    assert len(reg) == 54
+
+
+def test_export_and_merge_between_nodes(tmp_path: Path):
+    node_a, node_b = ShapeRegistry(), ShapeRegistry(tmp_path / "b.bin")
+    node_a.intern(SHAPES[0])
+    node_a.intern(SHAPES[1])
+    node_b.intern(SHAPES[1])
+    node_b.intern(SHAPES[2])
+    node_a.export(tmp_path / "a.bin")
+    assert node_b.merge(tmp_path / "a.bin") == 1
+    assert node_b.merge(node_a) == 0
+    node_b.save(tmp_path / "copy.bin")
+    assert sorted(t for _, t in ShapeRegistry(tmp_path / "copy.bin").items()) == sorted(SHAPES)
+
+
+def test_errors(tmp_path: Path):
+    reg = ShapeRegistry()
+    sid = reg.intern("SELECT 1")
+    reg._pending[sid] = "SELECT 2"  # simulate a hash collision
+    with pytest.raises(ShapeCollisionError):
+        reg.intern("SELECT 1")
+    other = ShapeRegistry()
+    other.intern("SELECT 1")
+    with pytest.raises(ShapeCollisionError):
+        reg.merge(other)
+    with pytest.raises(ValueError):
+        reg.save()
+    bad = tmp_path / "bad.bin"
+    bad.write_bytes(b"not a registry at all")
+    with pytest.raises(ValueError):
+        ShapeRegistry(bad)
+    good = tmp_path / "good.bin"
+    reg.export(good)
+    data = good.read_bytes()
+    for cut in (4, 20, len(data) - 1):
+        bad.write_bytes(data[:cut])
+        with pytest.raises(ValueError):
+            dict(ShapeRegistry(bad).items())
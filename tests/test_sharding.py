@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from sqlcanon import Canonicalizer
+from sqlcanon.cache import HashRing, JumpHashRouter, MemoryBackend, QueryRouter, ResultCache, jump_hash
+
+_rng = random.Random(7)
+KEYS = [_rng.getrandbits(64) for _ in range(20000)]
+
+
+def test_hash_int_matches_hex_hash():
+    c = Canonicalizer()
+    sql = "select a from t where b in (2, 1)"
+    assert c.hash_int(sql) == int(c.hash(sql)[:16], 16)
+    assert c.hash_int(sql) == c.hash_int("SELECT a FROM t WHERE b IN (1,2)")
+
+
+def test_jump_hash_moves_keys_only_to_new_bucket():
+    for buckets in (1, 2, 5, 9):
+        before = [jump_hash(k, buckets) for k in KEYS[:2000]]
+        after = [jump_hash(k, buckets + 1) for k in KEYS[:2000]]
+        assert all(a == b or a == buckets for a, b in zip(after, before))
+        assert all(0 <= b < buckets for b in before)
+    with pytest.raises(ValueError):
+        jump_hash(1, 0)
+
+
+@pytest.mark.parametrize("make", [HashRing, JumpHashRouter], ids=["ring", "jump"])
+def test_routers_balance_and_move_little_on_add(make):
+    router = make([f"node-{i}" for i in range(4)])
+    before = router.route_many(KEYS)
+    assert before == [router.route(k) for k in KEYS]
+    counts = {n: before.count(n) for n in router.nodes}
+    assert min(counts.values()) > len(KEYS) / 4 * 0.75
+    router.add("node-4")
+    after = router.route_many(KEYS)
+    moved = [(a, b) for a, b in zip(before, after) if a != b]
+    assert all(b == "node-4" for _, b in moved)
+    assert 0.1 < len(moved) / len(KEYS) < 0.3  # about 1/5
+    router.remove("node-4")
+    assert router.route_many(KEYS) == before
+
+
+def test_ring_remove_and_weights():
+    ring = HashRing({"a": 1.0, "b": 1.0, "c": 2.0})
+    routed = ring.route_many(KEYS)
+    assert routed.count("c") > routed.count("a") * 1.5
+    ring.remove("b")
+    after = ring.route_many(KEYS)
+    assert all(x == y for x, y in zip(routed, after) if x != "b")
+    keys = KEYS[:100]
+    assert HashRing(["a", "b", "c"]).route_many(keys) == HashRing(["c", "b", "a"]).route_many(keys)
+    with pytest.raises(LookupError):
+        HashRing().route(1)
+    with pytest.raises(ValueError):
+        ring.add("d", weight=0)
+    with pytest.raises(ValueError):
+        JumpHashRouter(["a", "b"]).remove("a")
+    with pytest.raises(LookupError):
+        JumpHashRouter().route_many([1])
+
+
+def test_ring_key_on_a_point_belongs_to_that_point():
+    ring = HashRing(["a", "b", "c"], vnodes=4)
+    points, owners = ring._ring
+    for i, point in enumerate(points):
+        assert ring.route(point) == owners[i]
+        assert ring.route_many([point - 1, point + 1]) == [owners[i], owners[(i + 1) % len(points)]]
+
+
+def test_query_router_sends_equivalent_statements_to_one_simulated_node():
+    nodes = {f"node-{i}": ResultCache(MemoryBackend()) for i in range(3)}
+    router = QueryRouter(HashRing(list(nodes)))
+    variants = [
+        "select * from t where a = 1 and b in (3, 2)",
+        "SELECT * FROM t WHERE b IN (2,3) AND a = 1",
+    ]
+    assert router.route(variants[0]) == router.route(variants[1])
+    calls = []
+    for sql in variants:
+        node = nodes[router.route(sql)]
+        node.get_or_compute(sql, None, lambda: calls.append(sql) or ["row"])
+    assert len(calls) == 1
+
+    batch = [f"select * from t{i} where a = 1" for i in range(60)] + variants
+    groups = router.partition(batch)
+    assert sorted(i for idx in groups.values() for i in idx) == list(range(len(batch)))
+    assert len(groups) == 3
+    assert any(len(batch) - 2 in idx and len(batch) - 1 in idx for idx in groups.values())
@@ -0,0 +1,96 @@
+import gc
+
+import pytest
+
+sa = pytest.importorskip("sqlalchemy")
+
+from sqlcanon import Canonicalizer, Config  # noqa: E402
+from sqlcanon.integrations import sqlalchemy as sc  # noqa: E402
+
+EXEC_SAFE = Config(passes=["case_keywords"])
+
+
+@pytest.fixture
+def engine():
+    eng = sa.create_engine("sqlite+pysqlite:///:memory:")
+    with eng.begin() as conn:
+        conn.execute(sa.text("create table t(a integer, b integer)"))
+        conn.execute(sa.text("insert into t values (1, 1), (2, 1), (3, 2)"))
+    yield eng
+    sc.uninstrument(eng)
+    eng.dispose()
+
+
+def test_hook_memoises_per_statement_and_reports_stats(engine):
+    cache = sc.instrument(engine)
+    q = sa.text("select a from t where b = :b and a in (3, 2, 1)")
+    with engine.connect() as conn:
+        for b in (1, 2, 1):
+            conn.execute(q, {"b": b}).fetchall()
+        entry = conn.info[sc.INFO_KEY]
+    c = Canonicalizer()
+    assert entry.text == c.normalise("select a from t where b = ? and a in (3, 2, 1)")
+    assert entry.hash == c.hash("select a from t where b = ? and a in (3, 2, 1)")
+    stats = sc.get_stats(engine)
+    assert stats is cache.stats
+    assert (stats.misses, stats.hits) == (1, 2)
+    assert stats.hit_rate == pytest.approx(2 / 3)
+    assert stats.seconds_saved > 0
+
+
+def test_rewrite_executes_canonical_text(engine):
+    sc.instrument(engine, EXEC_SAFE, rewrite=True)
+    seen = []
+    sa.event.listen(engine, "after_cursor_execute", lambda *a: seen.append(a[2]))
+    with engine.connect() as conn:
+        rows = conn.execute(sa.text("select a from t where b = 1 order by a")).fetchall()
+    assert rows == [(1,), (2,)]
+    assert seen == ["SELECT a FROM t WHERE b = 1 ORDER BY a"]
+
+
+def test_rewrite_leaves_keyword_named_bind_parameters_alone(engine):
+    # SQLAlchemy compiles bindparam("order") to %(order)s on pyformat drivers (psycopg, pymssql)
+    cache = sc.instrument(engine, EXEC_SAFE, rewrite=True)
+    entry = cache.lookup("select a from t where b = %(order)s and a > %(limit)s")
+    assert entry.text == "SELECT a FROM t WHERE b = %(order)s AND a > %(limit)s"
+
+
+def test_rewrite_rejects_unsafe_profiles(engine):
+    with pytest.raises(ValueError, match="normalise_literals"):
+        sc.instrument(engine, Config(passes=["normalize_literals"]), rewrite=True)
+    # sqlite uses "?" placeholders, so reordering predicates would misbind them
+    with pytest.raises(ValueError, match="positional"):
+        sc.instrument(engine, Config(passes=["normalise_predicates"]), rewrite=True)
+    assert sc.get_stats(engine) is None
+
+
+def test_cache_is_bounded_lru():
+    cache = sc.StatementCache(Canonicalizer(), Config(), maxsize=2)
+    for q in ("select 1", "select 2", "select 1", "select 3"):
+        cache.lookup(q)
+    assert len(cache) == 2
+    assert cache.stats.evictions == 1
+    cache.lookup("select 1")  # kept: most recently used before "select 3"
+    assert cache.stats.hits == 2
+    with pytest.raises(ValueError):
+        sc.StatementCache(Canonicalizer(), Config(), maxsize=0)
+
+
+def test_uninstrument_and_engine_lifetime():
+    eng = sa.create_engine("sqlite+pysqlite:///:memory:")
+    first = sc.instrument(eng)
+    cache = sc.instrument(eng)  # replaces, does not stack
+    with eng.connect() as conn:
+        conn.execute(sa.text("select 1")).fetchall()
+    assert (first.stats.misses, cache.stats.misses) == (0, 1)
+    sc.uninstrument(eng)
+    assert sc.get_stats(eng) is None
+    with eng.connect() as conn:
+        conn.execute(sa.text("select 2")).fetchall()
+    assert cache.stats.misses == 1
+    sc.instrument(eng)
+    n = len(sc._ENGINES)
+    eng.dispose()
+    del eng, conn
+    gc.collect()
+    assert len(sc._ENGINES) == n - 1